@@ -0,0 +1,383 @@
+"""
+Benchmark suite for the core_database data-access layer.
+
+Builds a synthetic database at a configurable scale, times every CRUD
+function and the common read patterns against file-backed and in-memory
+SQLite, and writes the results as JSON so runs can be compared between
+commits:
+
+    python -m benchmarks.bench_core_database --scale 100000 --output after.json
+    python -m benchmarks.bench_core_database --scale 100000 --compare before.json
+
+`--compare` exits with status 1 if any benchmark's median got slower than
+`--threshold` times the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import sqlalchemy
+from sqlalchemy.orm import sessionmaker
+
+from src.core_database import crud, models
+from src.core_database.coverage import get_coverage, get_uncovered_syllabus_points
+from src.core_database.database import Base, DatabaseConfig, create_db_engine
+from src.core_database.exam_generator import generate_mock_exam
+from src.core_database.question_bank import QuestionBank
+from src.core_database.scheduler import get_due_questions
+from src.core_database.search import search_syllabus_points
+from src.core_database.weaknesses import get_student_weaknesses
+
+SUBJECTS = ["9231", "9609", "9618", "9700", "9701", "9702", "9706", "9708", "9709", "9990"]
+TOPICS = ["integration", "vectors", "probability", "kinematics", "equilibrium", "algorithms", "demand", "enzymes", "circuits", "ledgers"]
+INSERT_CHUNK_SIZE = 10000
+
+def _sizes(scale: int) -> dict:
+    """Row counts per table for a scale, where `scale` is the number of questions."""
+    return {
+        "questions": scale,
+        "resources": max(10, scale // 20),
+        "students": max(10, scale // 100),
+        "syllabus_points": max(10, scale // 100),
+        "learning_packs": max(10, scale // 50),
+        "exam_attempts": max(10, scale // 20),
+        "answers_per_attempt": 5,
+        "mock_exams": max(10, scale // 50),
+        "questions_per_mock_exam": min(10, scale),
+    }
+
+def _syllabus_code(i: int) -> str:
+    return f"{SUBJECTS[i % len(SUBJECTS)]}/{i}"
+
+def _insert_chunked(connection, table, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == INSERT_CHUNK_SIZE:
+            connection.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        connection.execute(table.insert(), chunk)
+
+def generate_dataset(engine, scale: int, seed: int = 0) -> dict:
+    """
+    Fill an empty database with synthetic resources, questions, students, attempts and mock exams.
+
+    Args:
+        engine: The engine of the database to fill.
+        scale: The number of questions; the other tables are sized from it.
+        seed: The random seed, so datasets are reproducible.
+
+    Returns:
+        The row counts per table.
+    """
+    rng = random.Random(seed)
+    sizes = _sizes(scale)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        _insert_chunked(connection, models.Student.__table__, (
+            {"id": i, "username": f"student{i}"} for i in range(1, sizes["students"] + 1)
+        ))
+        _insert_chunked(connection, models.Resource.__table__, (
+            {
+                "id": i,
+                "subject": SUBJECTS[i % len(SUBJECTS)],
+                "year": 2005 + i % 20,
+                "paper": 1 + i % 6,
+                "variant": 1 + i % 3,
+                "type": "Past Paper",
+                "path": f"/archive/{i}.pdf",
+            }
+            for i in range(1, sizes["resources"] + 1)
+        ))
+        _insert_chunked(connection, models.SyllabusPoint.__table__, (
+            {
+                "id": i,
+                "subject": SUBJECTS[i % len(SUBJECTS)],
+                "code": _syllabus_code(i),
+                "description": f"{TOPICS[i % len(TOPICS)]} and {TOPICS[i * 7 % len(TOPICS)]}, syllabus point {i}",
+            }
+            for i in range(1, sizes["syllabus_points"] + 1)
+        ))
+        _insert_chunked(connection, models.Question.__table__, (
+            {
+                "id": i,
+                "resource_id": rng.randint(1, sizes["resources"]),
+                "question_number": str(1 + i % 12),
+                "max_marks": rng.randint(1, 12),
+            }
+            for i in range(1, sizes["questions"] + 1)
+        ))
+        _insert_chunked(connection, models.LearningPack.__table__, (
+            {"id": i, "student_id": rng.randint(1, sizes["students"])}
+            for i in range(1, sizes["learning_packs"] + 1)
+        ))
+        _insert_chunked(connection, models.learning_pack_syllabus, (
+            {"learning_pack_id": pack_id, "syllabus_point_id": point_id}
+            for pack_id in range(1, sizes["learning_packs"] + 1)
+            for point_id in rng.sample(range(1, sizes["syllabus_points"] + 1), 5)
+        ))
+        _insert_chunked(connection, models.learning_pack_resources, (
+            {"learning_pack_id": pack_id, "resource_id": resource_id}
+            for pack_id in range(1, sizes["learning_packs"] + 1)
+            for resource_id in rng.sample(range(1, sizes["resources"] + 1), 3)
+        ))
+        _insert_chunked(connection, models.ExamAttempt.__table__, (
+            {"id": i, "student_id": rng.randint(1, sizes["students"]), "score": 0}
+            for i in range(1, sizes["exam_attempts"] + 1)
+        ))
+        _insert_chunked(connection, models.AttemptedQuestion.__table__, (
+            {
+                "exam_attempt_id": attempt_id,
+                "question_id": rng.randint(1, sizes["questions"]),
+                "score": rng.randint(0, 6),
+                "diagnosed_weakness": f"weakness{rng.randint(1, 40)}",
+            }
+            for attempt_id in range(1, sizes["exam_attempts"] + 1)
+            for _ in range(sizes["answers_per_attempt"])
+        ))
+        _insert_chunked(connection, models.MockExam.__table__, (
+            {"id": i, "student_id": rng.randint(1, sizes["students"]), "subject": SUBJECTS[i % len(SUBJECTS)]}
+            for i in range(1, sizes["mock_exams"] + 1)
+        ))
+        _insert_chunked(connection, models.mock_exam_questions, (
+            {"mock_exam_id": exam_id, "question_id": question_id}
+            for exam_id in range(1, sizes["mock_exams"] + 1)
+            for question_id in rng.sample(range(1, sizes["questions"] + 1), sizes["questions_per_mock_exam"])
+        ))
+    return sizes
+
+def _benchmarks(sizes: dict, rng: random.Random) -> dict:
+    """
+    Return the benchmark callables, each taking `(db, iteration)`.
+    """
+    def random_id(table):
+        return rng.randint(1, sizes[table])
+
+    def create_pack(db, i):
+        ids = [random_id("syllabus_points") for _ in range(5)]
+        return crud.create_learning_pack_with_syllabus(db, random_id("students"), ids)
+
+    banks = []
+
+    def generate_from_bank(db, i):
+        if not banks:
+            banks.append(QuestionBank.load(db))
+        return generate_mock_exam(
+            db, random_id("students"), rng.choice(SUBJECTS), max_marks=60, year_from=2005, rng=rng, bank=banks[0]
+        )
+
+    def read_pack_graph(db, i):
+        pack = db.get(models.LearningPack, random_id("learning_packs"))
+        return len(pack.syllabus_points) + len(pack.resources)
+
+    def submission(i):
+        return {
+            "student_id": random_id("students"),
+            "answers": [
+                {"question_id": random_id("questions"), "score": rng.randint(0, 6), "diagnosed_weakness": "bench"}
+                for _ in range(10)
+            ],
+        }
+
+    return {
+        "get_resource_by_path": lambda db, i: crud.get_resource_by_path(db, f"/archive/{random_id('resources')}.pdf"),
+        "create_resource": lambda db, i: crud.create_resource(db, {"subject": "9709", "path": f"/bench/new/{i}.pdf"}),
+        "upsert_resources_1000": lambda db, i: crud.upsert_resources(
+            db, ({"subject": "9709", "path": f"/bench/upsert/{i}/{n}.pdf"} for n in range(1000))
+        ),
+        "get_student_by_username": lambda db, i: crud.get_student_by_username(db, f"student{random_id('students')}"),
+        "create_student": lambda db, i: crud.create_student(db, f"bench{i}"),
+        "get_syllabus_point_by_code": lambda db, i: crud.get_syllabus_point_by_code(
+            db, _syllabus_code(random_id("syllabus_points"))
+        ),
+        "create_syllabus_point": lambda db, i: crud.create_syllabus_point(
+            db, {"subject": "9709", "code": f"bench/{i}", "description": "Benchmark point"}
+        ),
+        "create_learning_pack_with_syllabus": create_pack,
+        "create_mock_exam": lambda db, i: crud.create_mock_exam(
+            db, random_id("students"), "9709", [random_id("questions") for _ in range(10)]
+        ),
+        "submit_exam_attempt": lambda db, i: crud.submit_exam_attempt(db, submission(i)),
+        "submit_exam_attempts_100": lambda db, i: crud.submit_exam_attempts(db, [submission(i) for _ in range(100)]),
+        "generate_mock_exam": lambda db, i: generate_mock_exam(
+            db, random_id("students"), rng.choice(SUBJECTS), max_marks=60, year_from=2005, rng=rng
+        ),
+        "generate_mock_exam_question_bank": generate_from_bank,
+        "get_student_weaknesses": lambda db, i: get_student_weaknesses(db, random_id("students"), limit=10),
+        "get_due_questions": lambda db, i: get_due_questions(db, random_id("students"), rng.choice(SUBJECTS), limit=20),
+        "get_uncovered_syllabus_points": lambda db, i: get_uncovered_syllabus_points(
+            db, random_id("students"), rng.choice(SUBJECTS), limit=20
+        ),
+        "get_coverage": lambda db, i: get_coverage(db, random_id("students")),
+        "search_syllabus_points": lambda db, i: search_syllabus_points(
+            db, rng.choice(TOPICS), subject=rng.choice(SUBJECTS), limit=20
+        ),
+        "read_learning_pack_graph": read_pack_graph,
+        "list_learning_packs_for_student": lambda db, i: crud.list_learning_packs_for_student(
+            db, random_id("students"), limit=50
+        ),
+        "list_learning_packs_for_student_lightweight": lambda db, i: crud.list_learning_packs_for_student(
+            db, random_id("students"), limit=50, lightweight=True
+        ),
+        "get_mock_exam_with_questions": lambda db, i: crud.get_mock_exam_with_questions(db, random_id("mock_exams")),
+        "get_mock_exam_with_questions_lightweight": lambda db, i: crud.get_mock_exam_with_questions(
+            db, random_id("mock_exams"), lightweight=True
+        ),
+        "list_exam_attempts_for_student": lambda db, i: db.query(models.ExamAttempt)
+            .filter(models.ExamAttempt.student_id == random_id("students"))
+            .order_by(models.ExamAttempt.submitted_at.desc())
+            .limit(20)
+            .all(),
+    }
+
+def _stats(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": samples[0] * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+    }
+
+def run_backend(url: str, scale: int, repeat: int, seed: int = 0, only=None) -> dict:
+    """
+    Build a dataset at `url` and time every benchmark against it.
+
+    Args:
+        url: The database URL.
+        scale: The dataset scale, see `generate_dataset`.
+        repeat: The number of timed runs per benchmark.
+        seed: The random seed.
+        only: Benchmark names to run; all if omitted.
+
+    Returns:
+        A dictionary with the dataset sizes, build time and per-benchmark stats.
+    """
+    engine = create_db_engine(DatabaseConfig(url=url))
+    started = time.perf_counter()
+    sizes = generate_dataset(engine, scale, seed)
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    results = {}
+    for name, benchmark in _benchmarks(sizes, rng).items():
+        if only and name not in only:
+            continue
+        samples = []
+        with SessionLocal() as db:
+            benchmark(db, -1) # warm-up
+            for i in range(repeat):
+                db.expunge_all()
+                started = time.perf_counter()
+                benchmark(db, i)
+                samples.append(time.perf_counter() - started)
+        results[name] = _stats(samples)
+    engine.dispose()
+    return {"sizes": sizes, "build_seconds": build_seconds, "benchmarks": results}
+
+def run_benchmarks(scale: int = 10000, repeat: int = 20, backends=("file", "memory"), seed: int = 0, only=None) -> dict:
+    """
+    Run the suite against each backend.
+
+    Returns:
+        A JSON-serialisable dictionary of run metadata and results per backend.
+    """
+    report = {"meta": _metadata(scale, repeat, seed), "results": {}}
+    for backend in backends:
+        if backend == "memory":
+            report["results"][backend] = run_backend("sqlite:///:memory:", scale, repeat, seed, only)
+        else:
+            with tempfile.TemporaryDirectory() as directory:
+                url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+                report["results"][backend] = run_backend(url, scale, repeat, seed, only)
+    return report
+
+def _metadata(scale: int, repeat: int, seed: int) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "scale": scale,
+        "repeat": repeat,
+        "seed": seed,
+    }
+
+def compare_reports(baseline: dict, current: dict, threshold: float = 1.25) -> list:
+    """
+    Compare median timings of two reports.
+
+    Args:
+        baseline: The earlier report.
+        current: The new report.
+        threshold: The slowdown ratio counted as a regression.
+
+    Returns:
+        A list of `(backend, benchmark, baseline_ms, current_ms, ratio, regressed)`
+        tuples for every benchmark present in both reports, where `regressed`
+        is whether `ratio` exceeds `threshold`.
+    """
+    rows = []
+    for backend, result in current["results"].items():
+        base = baseline["results"].get(backend, {}).get("benchmarks", {})
+        for name, stats in result["benchmarks"].items():
+            if name in base:
+                before, after = base[name]["median_ms"], stats["median_ms"]
+                ratio = after / before if before else float("inf")
+                rows.append((backend, name, before, after, ratio, ratio > threshold))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the core_database data-access layer.")
+    parser.add_argument("--scale", type=int, default=10000, help="Number of questions; other tables scale with it.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per benchmark.")
+    parser.add_argument("--backend", action="append", choices=["file", "memory"], help="Backends to run (default: both).")
+    parser.add_argument("--only", action="append", help="Only run this benchmark (repeatable).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against.")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio that counts as a regression.")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.scale, args.repeat, tuple(args.backend or ("file", "memory")), args.seed, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    for backend, result in report["results"].items():
+        print(f"{backend}: dataset built in {result['build_seconds']:.1f}s {result['sizes']}")
+        for name, stats in result["benchmarks"].items():
+            print(f"  {name:<36} median {stats['median_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        for backend, name, before, after, ratio, regressed in compare_reports(baseline, report, args.threshold):
+            flag = "REGRESSION" if regressed else ""
+            regressions += regressed
+            print(f"{backend:<7} {name:<36} {before:9.3f} -> {after:9.3f} ms  x{ratio:5.2f} {flag}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Cold-start benchmark for short-lived core_database processes.
+
+Cron runs and worker processes do one or two lookups and exit, so their cost
+is dominated by interpreter start-up, imports and the first query. Each run
+starts a fresh interpreter that imports `crud`, opens a session on the
+default engine and calls `crud.get_resource_by_path` once, against a
+temporary database, and reports:
+
+- "import_ms": importing `src.core_database.crud`, from inside the process;
+- "first_call_ms": the first session and lookup, including creating the
+  default engine, configuring the ORM mappers and connecting;
+- "process_ms": the whole process as seen from outside.
+
+`python -X importtime` breaks the import down per module; the slowest ones
+are listed with `--top`.
+
+    python -m benchmarks.bench_startup --repeat 10 --budget-ms 1000
+
+exits with status 1 if the median "process_ms" is over the budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_BUDGET_MS = 1000.0
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_COLD_CALL = """
+import json, time
+started = time.perf_counter()
+from src.core_database import crud
+imported = time.perf_counter()
+from src.core_database.database import SessionLocal
+with SessionLocal() as db:
+    crud.get_resource_by_path(db, "/missing.pdf")
+called = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_call_ms": (called - imported) * 1000}))
+"""
+
+def _environment(url: str) -> dict:
+    return {**os.environ, "ALEVEL_DB_URL": url, "PYTHONPATH": ROOT}
+
+def import_times(module: str = "src.core_database.crud", url: str = "sqlite:///:memory:") -> dict:
+    """
+    Run `python -X importtime -c "import <module>"` and parse its report.
+
+    Args:
+        module: The module to import.
+        url: The database URL in the child's environment.
+
+    Returns:
+        A mapping of module name to `(self_ms, cumulative_ms)`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, cwd=ROOT, env=_environment(url),
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own) / 1000, int(cumulative) / 1000)
+    return times
+
+def cold_call(url: str) -> dict:
+    """
+    Time one fresh process importing crud and looking up a resource.
+
+    Args:
+        url: The database URL, which must already have the tables.
+
+    Returns:
+        A dictionary with "import_ms", "first_call_ms" and "process_ms".
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _COLD_CALL], capture_output=True, text=True, check=True, cwd=ROOT, env=_environment(url),
+    )
+    process_ms = (time.perf_counter() - started) * 1000
+    return {**json.loads(result.stdout), "process_ms": process_ms}
+
+def run_startup_benchmark(repeat: int = 10) -> dict:
+    """
+    Time `repeat` cold starts and the import breakdown against a temporary database.
+
+    Returns:
+        A dictionary with the median of each phase under "median", every
+        sample under "runs" and the import times per module under "imports".
+    """
+    from src.core_database import models # registers the tables on Base.metadata
+    from src.core_database.database import Base, DatabaseConfig, create_db_engine
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'startup.db')}"
+        engine = create_db_engine(DatabaseConfig(url=url))
+        Base.metadata.create_all(engine)
+        engine.dispose()
+        runs = [cold_call(url) for _ in range(repeat)]
+        imports = import_times(url=url)
+    return {
+        "median": {phase: statistics.median(run[phase] for run in runs) for phase in runs[0]},
+        "runs": runs,
+        "imports": imports,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of a core_database process.")
+    parser.add_argument("--repeat", type=int, default=10, help="Cold starts to time.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Budget for the median process time.")
+    parser.add_argument("--top", type=int, default=10, help="List this many slowest modules by own import time.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    args = parser.parse_args(argv)
+
+    report = run_startup_benchmark(args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    median = report["median"]
+    print(
+        f"import {median['import_ms']:.1f} ms, first call {median['first_call_ms']:.1f} ms, "
+        f"process {median['process_ms']:.1f} ms (median of {args.repeat})"
+    )
+    for name, (own, cumulative) in sorted(report["imports"].items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {name:<48} self {own:8.1f} ms   cumulative {cumulative:8.1f} ms")
+    if median["process_ms"] > args.budget_ms:
+        print(f"Over budget: {median['process_ms']:.1f} ms > {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
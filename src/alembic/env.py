@@ -1,8 +1,5 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
-from sqlalchemy import pool
-
 from alembic import context
 
 # this is the Alembic Config object, which provides
@@ -17,8 +14,25 @@ if config.config_file_name is not None:
 # add your model's MetaData object here
 # for 'autogenerate' support
 from src.core_database.models import Base
+from src.core_database.database import DatabaseConfig, create_db_engine
 target_metadata = Base.metadata
 
+# ALEVEL_DB_* environment variables override sqlalchemy.url from the .ini file,
+# so migrations run against the same database and pragmas as the application.
+db_config = DatabaseConfig.from_env(url=config.get_main_option("sqlalchemy.url"), pool="null")
+
+
+def include_name(name, type_, parent_names):
+    """Leave the FTS5 index and its shadow tables (created by raw DDL) out of autogenerate."""
+    if type_ == "table":
+        return not name.startswith("syllabus_points_fts")
+    return True
+
+# render_as_batch makes autogenerate emit `op.batch_alter_table` for ALTERs,
+# which SQLite can only apply by rebuilding the table. For large tables use
+# src.core_database.migrations.rebuild_table, which copies in chunks with
+# progress and builds the indexes after the copy.
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -37,10 +51,11 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url,
+        url=db_config.url,
         target_metadata=target_metadata,
+        include_name=include_name,
+        render_as_batch=True,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -56,15 +71,13 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    connectable = create_db_engine(db_config)
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_name=include_name,
+            render_as_batch=True,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,39 @@
+"""Add scan directories manifest
+
+Revision ID: 3c1d7a9e5b20
+Revises: be91760bc414
+Create Date: 2026-10-18 09:12:41.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d7a9e5b20'
+down_revision: Union[str, Sequence[str], None] = 'be91760bc414'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scan_directories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(), nullable=True),
+    sa.Column('mtime_ns', sa.BigInteger(), nullable=True),
+    sa.Column('inode', sa.BigInteger(), nullable=True),
+    sa.Column('entries', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scan_directories_id'), 'scan_directories', ['id'], unique=False)
+    op.create_index(op.f('ix_scan_directories_path'), 'scan_directories', ['path'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scan_directories_path'), table_name='scan_directories')
+    op.drop_index(op.f('ix_scan_directories_id'), table_name='scan_directories')
+    op.drop_table('scan_directories')
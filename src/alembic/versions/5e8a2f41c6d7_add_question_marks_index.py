@@ -0,0 +1,28 @@
+"""Add question marks index
+
+Revision ID: 5e8a2f41c6d7
+Revises: 3c1d7a9e5b20
+Create Date: 2026-10-18 10:03:17.554120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a2f41c6d7'
+down_revision: Union[str, Sequence[str], None] = '3c1d7a9e5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_questions_resource_id_max_marks', 'questions', ['resource_id', 'max_marks'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_questions_resource_id_max_marks', table_name='questions')
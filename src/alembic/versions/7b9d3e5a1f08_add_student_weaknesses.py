@@ -0,0 +1,82 @@
+"""Add student weaknesses aggregate
+
+Revision ID: 7b9d3e5a1f08
+Revises: 5e8a2f41c6d7
+Create Date: 2026-10-18 10:41:52.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b9d3e5a1f08'
+down_revision: Union[str, Sequence[str], None] = '5e8a2f41c6d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('student_weaknesses',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('weakness', sa.String(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('scored_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Float(), nullable=False),
+    sa.Column('last_seen', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'subject', 'weakness')
+    )
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS attempted_questions_weakness_ai
+    AFTER INSERT ON attempted_questions
+    WHEN NEW.diagnosed_weakness IS NOT NULL
+    BEGIN
+        INSERT INTO student_weaknesses (student_id, subject, weakness, attempt_count, scored_count, score_sum, last_seen)
+        SELECT exam_attempts.student_id,
+               COALESCE(mock_exams.subject, resources.subject, ''),
+               NEW.diagnosed_weakness,
+               1,
+               NEW.score IS NOT NULL,
+               COALESCE(NEW.score, 0),
+               COALESCE(exam_attempts.submitted_at, CURRENT_TIMESTAMP)
+        FROM exam_attempts
+        LEFT JOIN mock_exams ON mock_exams.id = exam_attempts.mock_exam_id
+        LEFT JOIN questions ON questions.id = NEW.question_id
+        LEFT JOIN resources ON resources.id = questions.resource_id
+        WHERE exam_attempts.id = NEW.exam_attempt_id
+        ON CONFLICT (student_id, subject, weakness) DO UPDATE SET
+            attempt_count = attempt_count + 1,
+            scored_count = scored_count + excluded.scored_count,
+            score_sum = score_sum + excluded.score_sum,
+            last_seen = MAX(last_seen, excluded.last_seen);
+    END
+    """)
+    # Backfill from the attempts recorded so far.
+    op.execute("""
+    INSERT INTO student_weaknesses (student_id, subject, weakness, attempt_count, scored_count, score_sum, last_seen)
+    SELECT exam_attempts.student_id,
+           COALESCE(mock_exams.subject, resources.subject, ''),
+           attempted_questions.diagnosed_weakness,
+           COUNT(*),
+           COUNT(attempted_questions.score),
+           COALESCE(SUM(attempted_questions.score), 0),
+           MAX(COALESCE(exam_attempts.submitted_at, CURRENT_TIMESTAMP))
+    FROM attempted_questions
+    JOIN exam_attempts ON exam_attempts.id = attempted_questions.exam_attempt_id
+    LEFT JOIN mock_exams ON mock_exams.id = exam_attempts.mock_exam_id
+    LEFT JOIN questions ON questions.id = attempted_questions.question_id
+    LEFT JOIN resources ON resources.id = questions.resource_id
+    WHERE attempted_questions.diagnosed_weakness IS NOT NULL
+    GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS attempted_questions_weakness_ai")
+    op.drop_table('student_weaknesses')
@@ -0,0 +1,67 @@
+"""Add join table keys and foreign key indexes
+
+Revision ID: 9c2e6b8d4a13
+Revises: 7b9d3e5a1f08
+Create Date: 2026-10-18 11:20:06.318452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2e6b8d4a13'
+down_revision: Union[str, Sequence[str], None] = '7b9d3e5a1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# join table -> (left column, right column)
+JOIN_TABLES = {
+    'learning_pack_syllabus': ('learning_pack_id', 'syllabus_point_id'),
+    'learning_pack_resources': ('learning_pack_id', 'resource_id'),
+    'mock_exam_questions': ('mock_exam_id', 'question_id'),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, (left, right) in JOIN_TABLES.items():
+        # The new primary key rejects the NULL and duplicate links the old tables allowed.
+        op.execute(f"DELETE FROM {table} WHERE {left} IS NULL OR {right} IS NULL")
+        op.execute(
+            f"DELETE FROM {table} WHERE rowid NOT IN "
+            f"(SELECT MIN(rowid) FROM {table} GROUP BY {left}, {right})"
+        )
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            batch_op.alter_column(left, existing_type=sa.Integer(), nullable=False)
+            batch_op.alter_column(right, existing_type=sa.Integer(), nullable=False)
+            batch_op.create_primary_key(f'pk_{table}', [left, right])
+        op.create_index(op.f(f'ix_{table}_{right}'), table, [right], unique=False)
+
+    op.create_index('ix_resources_subject_year_paper_variant', 'resources', ['subject', 'year', 'paper', 'variant'], unique=False)
+    op.create_index('ix_learning_packs_student_id_created_at', 'learning_packs', ['student_id', 'created_at'], unique=False)
+    op.create_index('ix_mock_exams_student_id_created_at', 'mock_exams', ['student_id', 'created_at'], unique=False)
+    op.create_index('ix_exam_attempts_student_id_submitted_at', 'exam_attempts', ['student_id', 'submitted_at'], unique=False)
+    op.create_index(op.f('ix_exam_attempts_mock_exam_id'), 'exam_attempts', ['mock_exam_id'], unique=False)
+    op.create_index(op.f('ix_attempted_questions_exam_attempt_id'), 'attempted_questions', ['exam_attempt_id'], unique=False)
+    op.create_index(op.f('ix_attempted_questions_question_id'), 'attempted_questions', ['question_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_attempted_questions_question_id'), table_name='attempted_questions')
+    op.drop_index(op.f('ix_attempted_questions_exam_attempt_id'), table_name='attempted_questions')
+    op.drop_index(op.f('ix_exam_attempts_mock_exam_id'), table_name='exam_attempts')
+    op.drop_index('ix_exam_attempts_student_id_submitted_at', table_name='exam_attempts')
+    op.drop_index('ix_mock_exams_student_id_created_at', table_name='mock_exams')
+    op.drop_index('ix_learning_packs_student_id_created_at', table_name='learning_packs')
+    op.drop_index('ix_resources_subject_year_paper_variant', table_name='resources')
+
+    for table, (left, right) in JOIN_TABLES.items():
+        op.drop_index(op.f(f'ix_{table}_{right}'), table_name=table)
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            batch_op.drop_constraint(f'pk_{table}', type_='primary')
+            batch_op.alter_column(left, existing_type=sa.Integer(), nullable=True)
+            batch_op.alter_column(right, existing_type=sa.Integer(), nullable=True)
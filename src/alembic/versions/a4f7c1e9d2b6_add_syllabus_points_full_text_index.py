@@ -0,0 +1,55 @@
+"""Add syllabus points full-text index
+
+Revision ID: a4f7c1e9d2b6
+Revises: 9c2e6b8d4a13
+Create Date: 2026-10-18 14:06:31.529814
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f7c1e9d2b6'
+down_revision: Union[str, Sequence[str], None] = '9c2e6b8d4a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS syllabus_points_fts USING fts5(
+        code, description, content='syllabus_points', content_rowid='id', tokenize='porter unicode61'
+    )
+    """)
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS syllabus_points_fts_ai AFTER INSERT ON syllabus_points BEGIN
+        INSERT INTO syllabus_points_fts (rowid, code, description) VALUES (NEW.id, NEW.code, NEW.description);
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS syllabus_points_fts_ad AFTER DELETE ON syllabus_points BEGIN
+        INSERT INTO syllabus_points_fts (syllabus_points_fts, rowid, code, description)
+        VALUES ('delete', OLD.id, OLD.code, OLD.description);
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS syllabus_points_fts_au AFTER UPDATE OF code, description ON syllabus_points BEGIN
+        INSERT INTO syllabus_points_fts (syllabus_points_fts, rowid, code, description)
+        VALUES ('delete', OLD.id, OLD.code, OLD.description);
+        INSERT INTO syllabus_points_fts (rowid, code, description) VALUES (NEW.id, NEW.code, NEW.description);
+    END
+    """)
+    # Index the syllabus points loaded so far.
+    op.execute("INSERT INTO syllabus_points_fts (syllabus_points_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS syllabus_points_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS syllabus_points_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS syllabus_points_fts_ai")
+    op.execute("DROP TABLE IF EXISTS syllabus_points_fts")
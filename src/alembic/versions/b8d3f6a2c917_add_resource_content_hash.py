@@ -0,0 +1,37 @@
+"""Add resource content hash
+
+Revision ID: b8d3f6a2c917
+Revises: a4f7c1e9d2b6
+Create Date: 2026-10-18 14:52:08.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d3f6a2c917'
+down_revision: Union[str, Sequence[str], None] = 'a4f7c1e9d2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('resources', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('hashed_size', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('hashed_mtime_ns', sa.BigInteger(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_resources_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_resources_content_hash'), table_name='resources')
+    # ALTER TABLE ... DROP COLUMN (SQLite 3.35+) instead of a batch rebuild:
+    # renaming the rebuilt table fails on triggers that reference resources.
+    op.execute('ALTER TABLE resources DROP COLUMN hashed_mtime_ns')
+    op.execute('ALTER TABLE resources DROP COLUMN hashed_size')
+    op.execute('ALTER TABLE resources DROP COLUMN content_hash')
@@ -0,0 +1,115 @@
+"""Add spaced-repetition review states
+
+Revision ID: c5a9e2d7f4b1
+Revises: b8d3f6a2c917
+Create Date: 2026-10-18 15:27:44.106952
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e2d7f4b1'
+down_revision: Union[str, Sequence[str], None] = 'b8d3f6a2c917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UPSERT = """
+INSERT INTO review_states (student_id, question_id, subject, ease, interval_days, repetitions, last_quality, last_reviewed_at, due_at)
+SELECT student_id, question_id, subject,
+       MAX(1.3, 2.6 - (5 - quality) * (0.08 + (5 - quality) * 0.02)),
+       1,
+       quality >= 3,
+       quality,
+       reviewed_at,
+       datetime(reviewed_at, '+1 days')
+FROM ({source}) AS reviews
+WHERE true
+ORDER BY {order}
+ON CONFLICT (student_id, question_id) DO UPDATE SET
+    ease = MAX(1.3, ease + 0.1 - (5 - excluded.last_quality) * (0.08 + (5 - excluded.last_quality) * 0.02)),
+    repetitions = CASE WHEN excluded.last_quality >= 3 THEN repetitions + 1 ELSE 0 END,
+    interval_days = CASE
+        WHEN excluded.last_quality < 3 OR repetitions = 0 THEN 1
+        WHEN repetitions = 1 THEN 6
+        ELSE ROUND(interval_days * ease)
+    END,
+    last_quality = excluded.last_quality,
+    last_reviewed_at = excluded.last_reviewed_at,
+    due_at = datetime(excluded.last_reviewed_at, '+' || CASE
+        WHEN excluded.last_quality < 3 OR repetitions = 0 THEN 1
+        WHEN repetitions = 1 THEN 6
+        ELSE ROUND(interval_days * ease)
+    END || ' days')
+WHERE excluded.last_reviewed_at >= review_states.last_reviewed_at"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('review_states',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('ease', sa.Float(), nullable=False),
+    sa.Column('interval_days', sa.Float(), nullable=False),
+    sa.Column('repetitions', sa.Integer(), nullable=False),
+    sa.Column('last_quality', sa.Integer(), nullable=True),
+    sa.Column('last_reviewed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('due_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'question_id')
+    )
+    with op.batch_alter_table('review_states', schema=None) as batch_op:
+        batch_op.create_index('ix_review_states_student_id_subject_due_at', ['student_id', 'subject', 'due_at'], unique=False)
+
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS attempted_questions_review_ai
+    AFTER INSERT ON attempted_questions
+    WHEN NEW.score IS NOT NULL AND NEW.question_id IS NOT NULL
+    BEGIN
+    """ + UPSERT.format(
+        source="""
+        SELECT exam_attempts.student_id AS student_id,
+               questions.id AS question_id,
+               COALESCE(resources.subject, '') AS subject,
+               MIN(5, MAX(0, CAST(ROUND(5.0 * NEW.score / questions.max_marks) AS INTEGER))) AS quality,
+               COALESCE(exam_attempts.submitted_at, CURRENT_TIMESTAMP) AS reviewed_at
+        FROM exam_attempts
+        JOIN questions ON questions.id = NEW.question_id AND questions.max_marks > 0
+        LEFT JOIN resources ON resources.id = questions.resource_id
+        WHERE exam_attempts.id = NEW.exam_attempt_id
+        """,
+        order="reviewed_at",
+    ) + """;
+    END
+    """)
+    # Replay the attempts recorded so far in submission order.
+    op.execute(UPSERT.format(
+        source="""
+        SELECT exam_attempts.student_id AS student_id,
+               questions.id AS question_id,
+               COALESCE(resources.subject, '') AS subject,
+               MIN(5, MAX(0, CAST(ROUND(5.0 * attempted_questions.score / questions.max_marks) AS INTEGER))) AS quality,
+               COALESCE(exam_attempts.submitted_at, CURRENT_TIMESTAMP) AS reviewed_at,
+               attempted_questions.id AS answer_id
+        FROM attempted_questions
+        JOIN exam_attempts ON exam_attempts.id = attempted_questions.exam_attempt_id
+        JOIN questions ON questions.id = attempted_questions.question_id AND questions.max_marks > 0
+        LEFT JOIN resources ON resources.id = questions.resource_id
+        WHERE attempted_questions.score IS NOT NULL
+        """,
+        order="reviewed_at, answer_id",
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS attempted_questions_review_ai")
+    with op.batch_alter_table('review_states', schema=None) as batch_op:
+        batch_op.drop_index('ix_review_states_student_id_subject_due_at')
+
+    op.drop_table('review_states')
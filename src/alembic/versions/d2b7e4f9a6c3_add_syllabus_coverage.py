@@ -0,0 +1,90 @@
+"""Add per-student syllabus coverage
+
+Revision ID: d2b7e4f9a6c3
+Revises: c5a9e2d7f4b1
+Create Date: 2026-10-18 16:08:31.472519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b7e4f9a6c3'
+down_revision: Union[str, Sequence[str], None] = 'c5a9e2d7f4b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('syllabus_coverage',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('syllabus_point_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('pack_count', sa.Integer(), nullable=False),
+    sa.Column('first_covered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.ForeignKeyConstraint(['syllabus_point_id'], ['syllabus_points.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'syllabus_point_id')
+    )
+    with op.batch_alter_table('syllabus_coverage', schema=None) as batch_op:
+        batch_op.create_index('ix_syllabus_coverage_student_id_subject', ['student_id', 'subject'], unique=False)
+
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS learning_pack_syllabus_coverage_ai
+    AFTER INSERT ON learning_pack_syllabus
+    BEGIN
+        INSERT INTO syllabus_coverage (student_id, syllabus_point_id, subject, pack_count, first_covered_at)
+        SELECT learning_packs.student_id,
+               NEW.syllabus_point_id,
+               COALESCE(syllabus_points.subject, ''),
+               1,
+               COALESCE(learning_packs.created_at, CURRENT_TIMESTAMP)
+        FROM learning_packs
+        JOIN syllabus_points ON syllabus_points.id = NEW.syllabus_point_id
+        WHERE learning_packs.id = NEW.learning_pack_id AND learning_packs.student_id IS NOT NULL
+        ON CONFLICT (student_id, syllabus_point_id) DO UPDATE SET
+            pack_count = pack_count + 1,
+            first_covered_at = MIN(first_covered_at, excluded.first_covered_at);
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS learning_pack_syllabus_coverage_ad
+    AFTER DELETE ON learning_pack_syllabus
+    BEGIN
+        UPDATE syllabus_coverage SET pack_count = pack_count - 1
+        WHERE syllabus_point_id = OLD.syllabus_point_id
+          AND student_id = (SELECT student_id FROM learning_packs WHERE id = OLD.learning_pack_id);
+        DELETE FROM syllabus_coverage
+        WHERE syllabus_point_id = OLD.syllabus_point_id
+          AND student_id = (SELECT student_id FROM learning_packs WHERE id = OLD.learning_pack_id)
+          AND pack_count <= 0;
+    END
+    """)
+    # Backfill from the learning packs created so far.
+    op.execute("""
+    INSERT INTO syllabus_coverage (student_id, syllabus_point_id, subject, pack_count, first_covered_at)
+    SELECT learning_packs.student_id,
+           syllabus_points.id,
+           COALESCE(syllabus_points.subject, ''),
+           count(*),
+           MIN(COALESCE(learning_packs.created_at, CURRENT_TIMESTAMP))
+    FROM learning_pack_syllabus
+    JOIN learning_packs ON learning_packs.id = learning_pack_syllabus.learning_pack_id
+    JOIN syllabus_points ON syllabus_points.id = learning_pack_syllabus.syllabus_point_id
+    WHERE learning_packs.student_id IS NOT NULL
+    GROUP BY learning_packs.student_id, syllabus_points.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS learning_pack_syllabus_coverage_ad")
+    op.execute("DROP TRIGGER IF EXISTS learning_pack_syllabus_coverage_ai")
+    with op.batch_alter_table('syllabus_coverage', schema=None) as batch_op:
+        batch_op.drop_index('ix_syllabus_coverage_student_id_subject')
+
+    op.drop_table('syllabus_coverage')
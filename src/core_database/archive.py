@@ -0,0 +1,262 @@
+"""
+Archival of old exam attempts into an attached SQLite database.
+
+`exam_attempts` and `attempted_questions` only grow, and every hot index
+carries the rows of cohorts that have long left. `archive_attempts` moves
+the attempts submitted before a cutoff, or belonging to students with no
+attempt since a date, together with their answers, into tables of the same
+shape in a separate database file attached as `archive`. Set
+`DatabaseConfig.archive_path` (`ALEVEL_DB_ARCHIVE_PATH`) and every pooled
+connection attaches it and creates the archive tables if needed.
+
+Each chunk is copied into the archive and committed before it is deleted
+from the live tables, so a crash in between leaves rows in both databases
+rather than in neither; the next run ignores the copies already archived and
+finishes the delete, and reads through the archive skip archived rows that
+are still live. The newest attempt and the attempt owning the newest answer
+always stay live, so SQLite never hands an archived id to a new row.
+
+The aggregates maintained by triggers (`student_weaknesses`,
+`review_states`) are not touched by moving rows, and their rebuilds read the
+archive as well whenever it is attached, as does `exam_generator` when it
+excludes the questions a student already attempted. Other reads only see
+live rows unless they ask for the archive: `with_archive` returns an entity
+over the `UNION ALL` of both tables for use in any query, and
+`list_exam_attempts` takes `include_archive`.
+
+Run `python -m src.core_database.archive --before 2024-09-01` to archive
+from the command line.
+"""
+import argparse
+import functools
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from sqlalchemy import Column, Index, MetaData, Table, exists, func, or_, select, union_all
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.schema import CreateIndex, CreateTable
+from . import crud, models
+
+ARCHIVE_SCHEMA = "archive"
+ARCHIVE_CHUNK_SIZE = crud.IN_CLAUSE_CHUNK_SIZE
+
+def _archive_table(table: Table, metadata: MetaData, *indexes) -> Table:
+    """Copy a table's columns into the archive schema, without foreign keys."""
+    archived = Table(
+        table.name, metadata,
+        *(Column(column.name, column.type, primary_key=column.primary_key) for column in table.columns),
+        schema=ARCHIVE_SCHEMA,
+    )
+    for columns in indexes:
+        Index(f"ix_{table.name}_{'_'.join(columns)}", *(archived.c[name] for name in columns))
+    return archived
+
+archive_metadata = MetaData()
+archived_exam_attempts = _archive_table(
+    models.ExamAttempt.__table__, archive_metadata, ("student_id", "submitted_at"),
+)
+archived_attempted_questions = _archive_table(
+    models.AttemptedQuestion.__table__, archive_metadata, ("exam_attempt_id",), ("question_id",),
+)
+ARCHIVED_TABLES = {
+    models.ExamAttempt.__table__: archived_exam_attempts,
+    models.AttemptedQuestion.__table__: archived_attempted_questions,
+}
+
+@functools.cache
+def _archive_ddl() -> list:
+    """Return the statements creating the archive tables, compiled on first use."""
+    return [
+        str(ddl.compile(dialect=sqlite.dialect()))
+        for table in archive_metadata.sorted_tables
+        for ddl in (CreateTable(table, if_not_exists=True), *(CreateIndex(index, if_not_exists=True) for index in table.indexes))
+    ]
+
+def attach_archive(dbapi_connection, path: str, read_only: bool = False):
+    """
+    Attach the archive database to a raw SQLite connection and create its tables.
+
+    Called from the engine's connect hook when `DatabaseConfig.archive_path`
+    is set.
+
+    Args:
+        dbapi_connection: The raw sqlite3 connection.
+        path: The archive database file.
+        read_only: Attach the file read-only (the connection must accept URI
+            filenames) and leave the tables alone.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        if read_only:
+            # A URI filename: `?`, `#` and `%` in the path must be escaped.
+            cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (f"file:{quote(os.path.abspath(path))}?mode=ro",))
+        else:
+            cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+            for ddl in _archive_ddl():
+                cursor.execute(ddl)
+    finally:
+        cursor.close()
+
+def archive_attached(db: Session) -> bool:
+    """Return whether the session's connection has the archive database attached."""
+    databases = db.connection().exec_driver_sql("PRAGMA database_list").all()
+    return any(name == ARCHIVE_SCHEMA for _, name, _ in databases)
+
+def _union(table: Table):
+    """Select the live rows of a table followed by its archived rows that are not live."""
+    archived = ARCHIVED_TABLES[table]
+    return union_all(
+        select(*table.columns),
+        select(*archived.columns).where(~exists().where(table.c.id == archived.c.id)),
+    )
+
+def with_archive(model):
+    """
+    Return an entity reading `ExamAttempt` or `AttemptedQuestion` rows from both the live and archive tables.
+
+    Use it in place of the model in any query; the objects it loads are
+    read-only copies, since writes would target the live table.
+
+    Args:
+        model: `models.ExamAttempt` or `models.AttemptedQuestion`.
+
+    Returns:
+        An aliased entity over the `UNION ALL` of both tables.
+    """
+    table = model.__table__
+    return aliased(model, _union(table).subquery(f"{table.name}_with_archive"))
+
+def union_sql(db: Session, table_name: str) -> str:
+    """
+    Return SQL selecting a table's live and, if attached, archived rows, for textual queries.
+
+    Args:
+        db: The database session.
+        table_name: "exam_attempts" or "attempted_questions".
+
+    Returns:
+        A SELECT statement, or the table name when no archive is attached.
+    """
+    if not archive_attached(db):
+        return table_name
+    table = models.Base.metadata.tables[table_name]
+    return f"({_union(table).compile(dialect=db.get_bind().dialect)})"
+
+def list_exam_attempts(db: Session, student_id: int, include_archive: bool = False, limit: int = None):
+    """
+    List a student's exam attempts, newest first.
+
+    Args:
+        db: The database session.
+        student_id: The ID of the student.
+        include_archive: Also return archived attempts; needs the archive attached.
+        limit: The maximum number of attempts to return.
+
+    Returns:
+        A list of ExamAttempt objects.
+    """
+    attempt = with_archive(models.ExamAttempt) if include_archive else models.ExamAttempt
+    query = (
+        db.query(attempt)
+        .filter(attempt.student_id == student_id)
+        .order_by(attempt.submitted_at.desc(), attempt.id.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def archive_attempts(db: Session, before: datetime = None, inactive_since: datetime = None, chunk_size: int = ARCHIVE_CHUNK_SIZE):
+    """
+    Move old attempts and their answers from the live tables into the archive.
+
+    Args:
+        db: The database session; its connection must have the archive attached.
+        before: Archive attempts submitted before this time.
+        inactive_since: Archive every attempt of students with no attempt
+            submitted at or after this time.
+        chunk_size: The number of attempts moved per transaction.
+
+    Returns:
+        A dictionary with the number of "attempts" and "answers" archived.
+
+    Raises:
+        ValueError: If neither cutoff is given or no archive is attached.
+    """
+    if before is None and inactive_since is None:
+        raise ValueError("Pass `before` and/or `inactive_since` to choose the attempts to archive")
+    if not archive_attached(db):
+        raise ValueError("No archive database is attached; set DatabaseConfig.archive_path")
+    attempts, answers = models.ExamAttempt.__table__, models.AttemptedQuestion.__table__
+    conditions = []
+    # SQLite stores naive UTC timestamps.
+    if before is not None:
+        if before.tzinfo is not None:
+            before = before.astimezone(timezone.utc).replace(tzinfo=None)
+        conditions.append(attempts.c.submitted_at < before)
+    if inactive_since is not None:
+        if inactive_since.tzinfo is not None:
+            inactive_since = inactive_since.astimezone(timezone.utc).replace(tzinfo=None)
+        active = select(attempts.c.student_id).where(
+            attempts.c.submitted_at >= inactive_since, attempts.c.student_id.isnot(None)
+        )
+        conditions.append(attempts.c.student_id.not_in(active))
+    keep = [
+        db.execute(select(func.max(attempts.c.id))).scalar(),
+        db.execute(select(answers.c.exam_attempt_id).order_by(answers.c.id.desc()).limit(1)).scalar(),
+    ]
+    candidates = (
+        select(attempts.c.id)
+        .where(or_(*conditions), attempts.c.id.not_in([attempt_id for attempt_id in keep if attempt_id is not None]))
+        .order_by(attempts.c.id)
+        .limit(chunk_size)
+    )
+
+    counts = {"attempts": 0, "answers": 0}
+    after = 0
+    while True:
+        ids = db.execute(candidates.where(attempts.c.id > after)).scalars().all()
+        if not ids:
+            break
+        after = ids[-1]
+        for table, key in ((attempts, attempts.c.id), (answers, answers.c.exam_attempt_id)):
+            db.execute(
+                sqlite_insert(ARCHIVED_TABLES[table])
+                .from_select([column.name for column in table.columns], select(*table.columns).where(key.in_(ids)))
+                .prefix_with("OR IGNORE")
+            )
+        db.commit()
+        counts["answers"] += db.execute(answers.delete().where(answers.c.exam_attempt_id.in_(ids))).rowcount
+        counts["attempts"] += db.execute(attempts.delete().where(attempts.c.id.in_(ids))).rowcount
+        db.commit()
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old exam attempts into the archive database.")
+    parser.add_argument("--before", type=datetime.fromisoformat, help="Archive attempts submitted before this ISO time.")
+    parser.add_argument("--inactive-since", type=datetime.fromisoformat, help="Archive students with no attempt since this ISO time.")
+    parser.add_argument("--archive-path", help="The archive database file; ALEVEL_DB_ARCHIVE_PATH if omitted.")
+    parser.add_argument("--chunk-size", type=int, default=ARCHIVE_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    if args.before is None and args.inactive_since is None:
+        parser.error("pass --before and/or --inactive-since")
+
+    from .database import DatabaseConfig, create_db_engine
+
+    config = DatabaseConfig.from_env()
+    if args.archive_path:
+        config.archive_path = args.archive_path
+    if not config.archive_path:
+        parser.error("pass --archive-path or set ALEVEL_DB_ARCHIVE_PATH")
+    engine = create_db_engine(config)
+    try:
+        with Session(engine) as db:
+            counts = archive_attempts(db, before=args.before, inactive_since=args.inactive_since, chunk_size=args.chunk_size)
+    finally:
+        engine.dispose()
+    print(f"Archived {counts['attempts']} attempts with {counts['answers']} answers to {config.archive_path}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Asyncio versions of the basic lookups and writes in `crud.py`, for use with
+an `AsyncSession` bound to `database.create_async_db_engine()`.
+
+Only the resource, student and syllabus point lookups, their creates, the
+resource upsert, and the learning pack and mock exam creates have async
+versions; everything else in `crud.py` (exam attempt submission, syllabus
+upserts, keyset pack listing, ...) is blocking only. Each function here
+behaves like its counterpart in `crud.py` and shares the same models.
+Relationships are loaded before the object is returned, since an
+`AsyncSession` cannot lazy-load them later.
+"""
+from itertools import islice
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import cache, crud, models
+
+# Resource CRUD
+async def get_resource_by_path(db: AsyncSession, path: str):
+    """
+    Get a resource by its file path.
+
+    Args:
+        db: The async database session.
+        path: The file path of the resource.
+
+    Returns:
+        The resource object if found, otherwise None.
+    """
+    cached = cache.get_cached(db.sync_session, "resource_by_path", path)
+    if cached is not None:
+        return cached
+    result = await db.execute(select(models.Resource).where(models.Resource.path == path).limit(1))
+    db_resource = result.scalars().first()
+    cache.store(db.sync_session, "resource_by_path", path, db_resource)
+    return db_resource
+
+async def create_resource(db: AsyncSession, resource: dict):
+    """
+    Create a new resource.
+
+    Args:
+        db: The async database session.
+        resource: A dictionary containing the resource's data.
+
+    Returns:
+        The newly created resource object.
+    """
+    db_resource = models.Resource(**crud.as_dict(resource))
+    db.add(db_resource)
+    await db.commit()
+    await db.refresh(db_resource)
+    return db_resource
+
+async def upsert_resources(db: AsyncSession, resources: Iterable, chunk_size: int = crud.RESOURCE_UPSERT_CHUNK_SIZE):
+    """
+    Insert or update many resources, keyed on their file path.
+
+    See `crud.upsert_resources`.
+
+    Args:
+        db: The async database session.
+        resources: An iterable of resource dictionaries (or pydantic-like objects).
+        chunk_size: The number of rows written per transaction.
+
+    Returns:
+        A dictionary with the number of "inserted" and "updated" rows.
+    """
+    stmt = crud.resource_upsert_statement()
+    counts = {"inserted": 0, "updated": 0}
+    iterator = iter(resources)
+    while True:
+        batch = crud.resource_upsert_rows(islice(iterator, chunk_size))
+        if not batch:
+            break
+        existing = (
+            await db.execute(
+                select(func.count(models.Resource.id)).where(models.Resource.path.in_(list(batch)))
+            )
+        ).scalar()
+        await db.execute(stmt, list(batch.values()))
+        await db.commit()
+        cache.invalidate("resource_by_path", *batch)
+        counts["updated"] += existing
+        counts["inserted"] += len(batch) - existing
+    return counts
+
+# Student CRUD
+async def get_student_by_username(db: AsyncSession, username: str):
+    """
+    Get a student by their username.
+
+    Args:
+        db: The async database session.
+        username: The student's username.
+
+    Returns:
+        The student object if found, otherwise None.
+    """
+    cached = cache.get_cached(db.sync_session, "student_by_username", username)
+    if cached is not None:
+        return cached
+    result = await db.execute(select(models.Student).where(models.Student.username == username).limit(1))
+    db_student = result.scalars().first()
+    cache.store(db.sync_session, "student_by_username", username, db_student)
+    return db_student
+
+async def create_student(db: AsyncSession, username: str):
+    """
+    Create a new student.
+
+    Args:
+        db: The async database session.
+        username: The student's username.
+
+    Returns:
+        The newly created student object.
+    """
+    db_student = models.Student(username=username)
+    db.add(db_student)
+    await db.commit()
+    await db.refresh(db_student)
+    return db_student
+
+# SyllabusPoint CRUD
+async def get_syllabus_point_by_code(db: AsyncSession, code: str):
+    """
+    Get a syllabus point by its code.
+
+    Args:
+        db: The async database session.
+        code: The syllabus point's code, e.g. "9706/1.1".
+
+    Returns:
+        The syllabus point object if found, otherwise None.
+    """
+    cached = cache.get_cached(db.sync_session, "syllabus_point_by_code", code)
+    if cached is not None:
+        return cached
+    result = await db.execute(select(models.SyllabusPoint).where(models.SyllabusPoint.code == code).limit(1))
+    db_syllabus_point = result.scalars().first()
+    cache.store(db.sync_session, "syllabus_point_by_code", code, db_syllabus_point)
+    return db_syllabus_point
+
+async def create_syllabus_point(db: AsyncSession, syllabus_point: dict):
+    """
+    Create a new syllabus point.
+
+    Args:
+        db: The async database session.
+        syllabus_point: A dictionary containing the syllabus point's data.
+
+    Returns:
+        The newly created syllabus point object.
+    """
+    db_syllabus_point = models.SyllabusPoint(**syllabus_point)
+    db.add(db_syllabus_point)
+    await db.commit()
+    await db.refresh(db_syllabus_point)
+    return db_syllabus_point
+
+# LearningPack CRUD
+async def create_learning_pack_with_syllabus(db: AsyncSession, student_id: int, syllabus_point_ids: list[int]):
+    """
+    Create a new learning pack and associate it with syllabus points.
+
+    Args:
+        db: The async database session.
+        student_id: The ID of the student.
+        syllabus_point_ids: A list of IDs of the syllabus points to associate.
+
+    Returns:
+        The newly created learning pack object, with `syllabus_points` loaded.
+    """
+    syllabus_points = (
+        await db.execute(select(models.SyllabusPoint).where(models.SyllabusPoint.id.in_(syllabus_point_ids)))
+    ).scalars().all()
+    db_learning_pack = models.LearningPack(student_id=student_id, syllabus_points=list(syllabus_points))
+    db.add(db_learning_pack)
+    await db.commit()
+    await db.refresh(db_learning_pack, attribute_names=["id", "student_id", "created_at", "syllabus_points"])
+    return db_learning_pack
+
+# MockExam CRUD
+async def create_mock_exam(db: AsyncSession, student_id: int, subject: str, question_ids: list[int]):
+    """
+    Create a new mock exam and associate it with questions.
+
+    Args:
+        db: The async database session.
+        student_id: The ID of the student.
+        subject: The subject of the mock exam.
+        question_ids: A list of IDs of the questions to include.
+
+    Returns:
+        The newly created mock exam object, with `questions` loaded.
+    """
+    questions = (
+        await db.execute(select(models.Question).where(models.Question.id.in_(question_ids)))
+    ).scalars().all()
+    db_mock_exam = models.MockExam(student_id=student_id, subject=subject, questions=list(questions))
+    db.add(db_mock_exam)
+    await db.commit()
+    await db.refresh(db_mock_exam, attribute_names=["id", "student_id", "subject", "created_at", "questions"])
+    return db_mock_exam
@@ -0,0 +1,258 @@
+"""
+Opt-in read-through cache for hot single-row lookups.
+
+Caching is off until `enable_cache()` is called. Each lookup (resources by
+path, students by username, syllabus points by code) gets its own bounded LRU
+with a TTL. Entries hold the row's column values, not ORM objects, and are
+merged into the caller's session on a hit, so a cached row behaves like one
+loaded by that session without a round-trip. A hit never replaces an object
+the session already holds, and a session with unflushed changes to a
+lookup's model reads from the database.
+
+Writes made through the ORM invalidate the affected keys when they are
+flushed and again when the transaction ends; the bulk statements in
+`crud.py` invalidate their keys explicitly.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from . import models
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 300.0 # seconds
+
+# lookup name -> (model, key attribute)
+LOOKUPS = {
+    "resource_by_path": (models.Resource, "path"),
+    "student_by_username": (models.Student, "username"),
+    "syllabus_point_by_code": (models.SyllabusPoint, "code"),
+}
+
+_MISSING = object()
+
+class LRUCache:
+    """A thread-safe LRU mapping with a per-entry time-to-live."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for `key`, or `default` if it is missing or expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store `value` under `key`, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop `key` from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Return the hit, miss and eviction counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+            }
+
+_caches = {}
+
+def enable_cache(maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL):
+    """
+    Turn on caching for every lookup in `LOOKUPS`, replacing any existing caches.
+
+    Args:
+        maxsize: The maximum number of entries per lookup.
+        ttl: How long an entry stays valid, in seconds.
+    """
+    _caches.update({name: LRUCache(maxsize, ttl) for name in LOOKUPS})
+    for identifier, listener in _LISTENERS:
+        if not event.contains(Session, identifier, listener):
+            event.listen(Session, identifier, listener)
+
+def disable_cache():
+    """Turn caching off and drop every cached entry."""
+    _caches.clear()
+    for identifier, listener in _LISTENERS:
+        if event.contains(Session, identifier, listener):
+            event.remove(Session, identifier, listener)
+
+def is_enabled(name: str) -> bool:
+    """Return whether the lookup `name` is being cached."""
+    return name in _caches
+
+def cache_stats() -> dict:
+    """
+    Return the counters of every enabled lookup cache.
+
+    Returns:
+        A dictionary mapping lookup name to its `LRUCache.stats()`.
+    """
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+def invalidate(name: str, *keys):
+    """
+    Drop cached entries for a lookup.
+
+    Args:
+        name: The lookup name, e.g. "resource_by_path".
+        *keys: The lookup keys to drop.
+    """
+    cache = _caches.get(name)
+    if cache is not None:
+        for key in keys:
+            cache.invalidate(key)
+
+def _pending_keys(db: Session) -> set:
+    """Return the `(lookup name, key)` pairs flushed but not yet committed in `db`."""
+    return db.info.setdefault("cache_pending_keys", set())
+
+def _has_pending_changes(db: Session, model) -> bool:
+    """Return whether `db` holds new, modified or deleted objects of `model` not yet flushed."""
+    return any(isinstance(instance, model) for instance in (*db.new, *db.dirty, *db.deleted))
+
+def _bypass(db: Session, name: str, key) -> bool:
+    """
+    Return whether a lookup must go to the database instead of the cache.
+
+    A session's own uncommitted writes must win over the shared cache: the
+    session factories use `autoflush=False`, so an unflushed change is only
+    visible through the session, and a flushed one only inside its transaction.
+    """
+    model, _ = LOOKUPS[name]
+    return (name, key) in db.info.get("cache_pending_keys", ()) or _has_pending_changes(db, model)
+
+def get_cached(db: Session, name: str, key):
+    """
+    Return the cached row for `key` as an instance attached to `db`, or None on a miss.
+
+    If `db` already holds the row in its identity map that instance is
+    returned unchanged; otherwise the cached values are merged in with
+    `load=False`, which runs no SQL. Sessions with uncommitted changes to the
+    lookup's model always miss.
+
+    Args:
+        db: The (sync) database session; pass `AsyncSession.sync_session`
+            for an async one.
+        name: The lookup name.
+        key: The lookup key.
+    """
+    cache = _caches.get(name)
+    if cache is None or _bypass(db, name, key):
+        return None
+    values = cache.get(key)
+    if values is None:
+        return None
+    model, _ = LOOKUPS[name]
+    mapper = inspect(model)
+    identity = mapper.identity_key_from_primary_key(
+        [values[mapper.get_property_by_column(column).key] for column in mapper.primary_key]
+    )
+    instance = db.identity_map.get(identity)
+    if instance is not None:
+        return instance
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return db.merge(instance, load=False)
+
+def store(db: Session, name: str, key, instance):
+    """Cache the column values of an `instance` freshly loaded by `db` under `key`."""
+    cache = _caches.get(name)
+    if cache is not None and instance is not None and not _bypass(db, name, key):
+        cache.set(key, {attr.key: getattr(instance, attr.key) for attr in inspect(type(instance)).column_attrs})
+
+def invalidate_on_commit(db: Session, name: str, *keys):
+    """
+    Drop cached entries for a lookup now and again when `db` commits or rolls back.
+
+    For bulk statements that bypass the ORM flush but are committed later;
+    until then `db` reads these keys from the database.
+
+    Args:
+        db: The database session that will commit the write.
+        name: The lookup name, e.g. "resource_by_path".
+        *keys: The lookup keys to drop.
+    """
+    if name in _caches:
+        invalidate(name, *keys)
+        _pending_keys(db).update((name, key) for key in keys)
+
+def read_through(db: Session, name: str, key, loader):
+    """
+    Return the cached row for `key`, or call `loader()` and cache its result.
+
+    Args:
+        db: The database session the result is attached to.
+        name: The lookup name.
+        key: The lookup key.
+        loader: A callable running the uncached query.
+
+    Returns:
+        The instance, attached to `db`, or None if `loader()` found nothing.
+    """
+    if name not in _caches:
+        return loader()
+    cached = get_cached(db, name, key)
+    if cached is not None:
+        return cached
+    instance = loader()
+    store(db, name, key, instance)
+    return instance
+
+def _invalidate_flushed(session, flush_context):
+    """
+    Drop the cached keys, old and new, of every flushed row a lookup covers.
+
+    Another session can still cache the old row before this transaction
+    commits, so the keys are remembered and dropped again by
+    `_invalidate_pending` once it ends.
+    """
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        for name, (model, attr) in LOOKUPS.items():
+            if isinstance(instance, model):
+                history = inspect(instance).attrs[attr].history
+                invalidate_on_commit(session, name, getattr(instance, attr), *history.deleted)
+
+def _invalidate_pending(session):
+    """Drop the keys written by the transaction that just committed or rolled back."""
+    for name, key in session.info.pop("cache_pending_keys", ()):
+        invalidate(name, key)
+
+_LISTENERS = (
+    ("after_flush", _invalidate_flushed),
+    ("after_commit", _invalidate_pending),
+    ("after_rollback", _invalidate_pending),
+)
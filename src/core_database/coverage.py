@@ -0,0 +1,145 @@
+"""
+Per-student syllabus coverage.
+
+`syllabus_coverage` holds one row per student and syllabus point covered by
+at least one of the student's learning packs, with the number of packs
+covering it. The `learning_pack_syllabus_coverage_ai` and `_ad` triggers (see
+`models.py`) keep it up to date as `crud.create_learning_pack_with_syllabus`
+and any other code path link or unlink points, so planners never load packs
+and compute set differences themselves:
+
+- `get_uncovered_syllabus_points` walks the subject's points through the
+  `syllabus_points.subject` index and probes the coverage primary key for
+  each one.
+- `get_coverage` counts covered points from the `(student_id, subject)`
+  index and the subject totals from the `syllabus_points.subject` index.
+
+Coverage rows keep the subject a point had when it was covered;
+`rebuild_coverage` recomputes them from `learning_pack_syllabus`, e.g. after
+moving points between subjects or importing data with the triggers missing.
+
+Run `python -m src.core_database.coverage rebuild` to rebuild from the
+command line.
+"""
+import argparse
+
+from sqlalchemy import exists, func, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from . import models
+
+def get_uncovered_syllabus_points(db: Session, student_id: int, subject: str, limit: int = None):
+    """
+    Get the syllabus points of a subject that none of a student's learning packs cover.
+
+    Args:
+        db: The database session.
+        student_id: The ID of the student.
+        subject: The subject of the syllabus points.
+        limit: The maximum number of points to return.
+
+    Returns:
+        A list of SyllabusPoint objects ordered by id.
+    """
+    covered = exists().where(
+        models.SyllabusCoverage.student_id == student_id,
+        models.SyllabusCoverage.syllabus_point_id == models.SyllabusPoint.id,
+    )
+    query = (
+        db.query(models.SyllabusPoint)
+        .filter(models.SyllabusPoint.subject == subject, ~covered)
+        .order_by(models.SyllabusPoint.id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def get_coverage(db: Session, student_id: int, subject: str = None) -> dict:
+    """
+    Get the share of each subject's syllabus points a student has covered.
+
+    Args:
+        db: The database session.
+        student_id: The ID of the student.
+        subject: Only report this subject.
+
+    Returns:
+        A mapping of subject to a dictionary with the "covered" and "total"
+        number of points and the "percent" covered (None for a subject with
+        no points). Points without a subject are reported under "".
+    """
+    totals = db.query(models.SyllabusPoint.subject, func.count()).group_by(models.SyllabusPoint.subject)
+    covered = (
+        db.query(models.SyllabusCoverage.subject, func.count())
+        .filter(models.SyllabusCoverage.student_id == student_id)
+        .group_by(models.SyllabusCoverage.subject)
+    )
+    if subject is not None:
+        totals = totals.filter(models.SyllabusPoint.subject == subject)
+        covered = covered.filter(models.SyllabusCoverage.subject == subject)
+
+    report = {}
+    for point_subject, total in totals:
+        report.setdefault(point_subject or "", {"covered": 0, "total": 0})["total"] += total
+    for point_subject, count in covered:
+        report.setdefault(point_subject, {"covered": 0, "total": 0})["covered"] = count
+    for stats in report.values():
+        stats["percent"] = 100.0 * stats["covered"] / stats["total"] if stats["total"] else None
+    return report
+
+def rebuild_coverage(db: Session, student_id: int = None):
+    """
+    Recompute the coverage rows from `learning_pack_syllabus`.
+
+    Args:
+        db: The database session.
+        student_id: Only rebuild this student's rows; all students if omitted.
+
+    Returns:
+        The number of coverage rows written.
+    """
+    select_rows = (
+        db.query(
+            models.LearningPack.student_id,
+            models.SyllabusPoint.id,
+            func.coalesce(models.SyllabusPoint.subject, literal("")),
+            func.count(),
+            func.min(func.coalesce(models.LearningPack.created_at, func.current_timestamp())),
+        )
+        .select_from(models.learning_pack_syllabus)
+        .join(models.LearningPack, models.LearningPack.id == models.learning_pack_syllabus.c.learning_pack_id)
+        .join(models.SyllabusPoint, models.SyllabusPoint.id == models.learning_pack_syllabus.c.syllabus_point_id)
+        .filter(models.LearningPack.student_id.isnot(None))
+        .group_by(models.LearningPack.student_id, models.SyllabusPoint.id)
+    )
+    delete = db.query(models.SyllabusCoverage)
+    if student_id is not None:
+        select_rows = select_rows.filter(models.LearningPack.student_id == student_id)
+        delete = delete.filter(models.SyllabusCoverage.student_id == student_id)
+
+    delete.delete(synchronize_session=False)
+    table = models.SyllabusCoverage.__table__
+    result = db.execute(
+        sqlite_insert(table).from_select(
+            ["student_id", "syllabus_point_id", "subject", "pack_count", "first_covered_at"],
+            select_rows.statement,
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the per-student syllabus coverage.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Recompute the coverage from learning_pack_syllabus.")
+    rebuild.add_argument("--student-id", type=int, help="Only rebuild this student.")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        rows = rebuild_coverage(db, student_id=args.student_id)
+    print(f"Rebuilt {rows} syllabus coverage rows.")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,32 @@
-from sqlalchemy.orm import Session
-from . import models
+from itertools import islice
+from typing import Iterable
+
+from sqlalchemy import DateTime, bindparam, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, selectinload
+from . import cache, models, rows
+
+RESOURCE_UPSERT_CHUNK_SIZE = 500
+SYLLABUS_UPSERT_CHUNK_SIZE = 500
+# Stay below SQLite's limit on bound variables in one IN (...) list.
+IN_CLAUSE_CHUNK_SIZE = 500
+_RESOURCE_UPSERT_COLUMNS = ("subject", "year", "paper", "variant", "type", "path")
+
+def as_dict(data) -> dict:
+    """
+    Return the field mapping for a dict or a pydantic-like object.
+
+    Args:
+        data: A mapping, or an object exposing `model_dump()` or `dict()`.
+
+    Returns:
+        A plain dictionary of field values.
+    """
+    if isinstance(data, dict):
+        return data
+    if hasattr(data, "model_dump"):
+        return data.model_dump()
+    return data.dict()
 
 # Resource CRUD
 def get_resource_by_path(db: Session, path: str):
@@ -13,7 +40,10 @@ def get_resource_by_path(db: Session, path: str):
     Returns:
         The resource object if found, otherwise None.
     """
-    return db.query(models.Resource).filter(models.Resource.path == path).first()
+    return cache.read_through(
+        db, "resource_by_path", path,
+        lambda: db.query(models.Resource).filter(models.Resource.path == path).first(),
+    )
 
 def create_resource(db: Session, resource: dict):
     """
@@ -26,12 +56,85 @@ def create_resource(db: Session, resource: dict):
     Returns:
         The newly created resource object.
     """
-    db_resource = models.Resource(**resource)
+    db_resource = models.Resource(**as_dict(resource))
     db.add(db_resource)
     db.commit()
     db.refresh(db_resource)
     return db_resource
 
+def upsert_resources(db: Session, resources: Iterable, chunk_size: int = RESOURCE_UPSERT_CHUNK_SIZE, commit: bool = True):
+    """
+    Insert or update many resources, keyed on their file path.
+
+    Rows are written with `INSERT ... ON CONFLICT(path) DO UPDATE` in chunks
+    of `chunk_size`, committing once per chunk, so memory use does not grow
+    with the size of the input. Existing rows keep any column the new data
+    leaves as None and always get a fresh `last_seen` timestamp.
+
+    Args:
+        db: The database session.
+        resources: An iterable of resource dictionaries (or pydantic-like objects).
+        chunk_size: The number of rows written per transaction.
+        commit: Whether to commit each chunk; if False every chunk is left
+            in the caller's transaction.
+
+    Returns:
+        A dictionary with the number of "inserted" and "updated" rows.
+    """
+    stmt = resource_upsert_statement()
+    counts = {"inserted": 0, "updated": 0}
+    iterator = iter(resources)
+    while True:
+        batch = resource_upsert_rows(islice(iterator, chunk_size))
+        if not batch:
+            break
+        existing = (
+            db.query(func.count(models.Resource.id))
+            .filter(models.Resource.path.in_(list(batch)))
+            .scalar()
+        )
+        db.execute(stmt, list(batch.values()))
+        if commit:
+            db.commit()
+            cache.invalidate("resource_by_path", *batch)
+        else:
+            cache.invalidate_on_commit(db, "resource_by_path", *batch)
+        counts["updated"] += existing
+        counts["inserted"] += len(batch) - existing
+    return counts
+
+def resource_upsert_statement():
+    """
+    Build the `INSERT ... ON CONFLICT(path) DO UPDATE` statement for resources.
+
+    Shared by `upsert_resources` and `async_crud.upsert_resources`.
+    """
+    table = models.Resource.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.path],
+        set_={
+            **{
+                name: func.coalesce(stmt.excluded[name], table.c[name])
+                for name in _RESOURCE_UPSERT_COLUMNS
+                if name != "path"
+            },
+            "last_seen": func.now(),
+        },
+    )
+
+def resource_upsert_rows(chunk) -> dict:
+    """
+    Normalise a chunk of resources into upsert parameter rows keyed by path.
+
+    Later duplicates of a path within a chunk win, as they would one row at a time.
+    """
+    batch = {}
+    for resource in chunk:
+        data = as_dict(resource)
+        batch[data["path"]] = {name: data.get(name) for name in _RESOURCE_UPSERT_COLUMNS}
+    return batch
+
 # Student CRUD
 def get_student_by_username(db: Session, username: str):
     """
@@ -44,7 +147,10 @@ def get_student_by_username(db: Session, username: str):
     Returns:
         The student object if found, otherwise None.
     """
-    return db.query(models.Student).filter(models.Student.username == username).first()
+    return cache.read_through(
+        db, "student_by_username", username,
+        lambda: db.query(models.Student).filter(models.Student.username == username).first(),
+    )
 
 def create_student(db: Session, username: str):
     """
@@ -64,6 +170,22 @@ def create_student(db: Session, username: str):
     return db_student
 
 # SyllabusPoint CRUD
+def get_syllabus_point_by_code(db: Session, code: str):
+    """
+    Get a syllabus point by its code.
+
+    Args:
+        db: The database session.
+        code: The syllabus point's code, e.g. "9706/1.1".
+
+    Returns:
+        The syllabus point object if found, otherwise None.
+    """
+    return cache.read_through(
+        db, "syllabus_point_by_code", code,
+        lambda: db.query(models.SyllabusPoint).filter(models.SyllabusPoint.code == code).first(),
+    )
+
 def create_syllabus_point(db: Session, syllabus_point: dict):
     """
     Create a new syllabus point.
@@ -81,11 +203,75 @@ def create_syllabus_point(db: Session, syllabus_point: dict):
     db.refresh(db_syllabus_point)
     return db_syllabus_point
 
+def upsert_syllabus_points(db: Session, syllabus_points: Iterable, chunk_size: int = SYLLABUS_UPSERT_CHUNK_SIZE):
+    """
+    Insert or update many syllabus points, keyed on their code.
+
+    Rows are written with `INSERT ... ON CONFLICT(code) DO UPDATE` in chunks
+    of `chunk_size`, committing once per chunk. Rows whose subject and
+    description are unchanged are not rewritten, so re-running a load is
+    cheap and leaves the search index alone.
+
+    Args:
+        db: The database session.
+        syllabus_points: An iterable of syllabus point dictionaries (or
+            pydantic-like objects) with "subject", "code" and "description".
+        chunk_size: The number of rows written per transaction.
+
+    Returns:
+        A dictionary with the number of "inserted", "updated" and "unchanged"
+        rows, and under "changed" a `(code, old, new)` tuple for every
+        existing point whose description changed.
+    """
+    table = models.SyllabusPoint.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.code],
+        set_={"subject": stmt.excluded.subject, "description": stmt.excluded.description},
+        where=or_(
+            table.c.subject.is_distinct_from(stmt.excluded.subject),
+            table.c.description.is_distinct_from(stmt.excluded.description),
+        ),
+    )
+    report = {"inserted": 0, "updated": 0, "unchanged": 0, "changed": []}
+    iterator = iter(syllabus_points)
+    while True:
+        batch = {}
+        for syllabus_point in islice(iterator, chunk_size):
+            data = as_dict(syllabus_point)
+            batch[data["code"]] = {name: data.get(name) for name in ("subject", "code", "description")}
+        if not batch:
+            break
+        existing = {
+            code: (subject, description)
+            for code, subject, description in db.query(
+                models.SyllabusPoint.code, models.SyllabusPoint.subject, models.SyllabusPoint.description
+            ).filter(models.SyllabusPoint.code.in_(list(batch)))
+        }
+        db.execute(stmt, list(batch.values()))
+        db.commit()
+        cache.invalidate("syllabus_point_by_code", *batch)
+        for code, row in batch.items():
+            if code not in existing:
+                report["inserted"] += 1
+                continue
+            old_subject, old_description = existing[code]
+            if (old_subject, old_description) == (row["subject"], row["description"]):
+                report["unchanged"] += 1
+                continue
+            report["updated"] += 1
+            if old_description != row["description"]:
+                report["changed"].append((code, old_description, row["description"]))
+    return report
+
 # LearningPack CRUD
 def create_learning_pack_with_syllabus(db: Session, student_id: int, syllabus_point_ids: list[int]):
     """
     Create a new learning pack and associate it with syllabus points.
 
+    The student's syllabus coverage (see `coverage.py`) is updated by a
+    trigger in the same transaction.
+
     Args:
         db: The database session.
         student_id: The ID of the student.
@@ -102,7 +288,102 @@ def create_learning_pack_with_syllabus(db: Session, student_id: int, syllabus_po
     db.refresh(db_learning_pack)
     return db_learning_pack
 
+def _row_columns(model, row_type) -> list:
+    """Return the model's columns matching the fields of a `rows` tuple, in order."""
+    return [getattr(model, name) for name in row_type._fields]
+
+def list_learning_packs_for_student(db: Session, student_id: int, limit: int = 50, after: tuple = None, lightweight: bool = False):
+    """
+    List a student's learning packs, newest first, with their syllabus points
+    and resources loaded in a fixed number of queries.
+
+    Pages are fetched by keyset: pass the `(created_at, id)` of the last pack
+    of one page as `after` to get the next.
+
+    Args:
+        db: The database session.
+        student_id: The ID of the student.
+        limit: The maximum number of packs to return.
+        after: The `(created_at, id)` of the pack to continue after.
+        lightweight: Return `rows.LearningPackRow` tuples instead of ORM objects.
+
+    Returns:
+        A list of learning pack objects, or of LearningPackRow tuples.
+    """
+    query = db.query(models.LearningPack).filter(models.LearningPack.student_id == student_id)
+    if after is not None:
+        query = query.filter(tuple_(models.LearningPack.created_at, models.LearningPack.id) < tuple_(*after))
+    query = query.order_by(models.LearningPack.created_at.desc(), models.LearningPack.id.desc()).limit(limit)
+    if not lightweight:
+        return query.options(
+            selectinload(models.LearningPack.syllabus_points),
+            selectinload(models.LearningPack.resources),
+        ).all()
+
+    packs = query.with_entities(
+        models.LearningPack.id, models.LearningPack.student_id, models.LearningPack.created_at
+    ).all()
+    pack_ids = [pack.id for pack in packs]
+    syllabus_points = {pack_id: [] for pack_id in pack_ids}
+    resources = {pack_id: [] for pack_id in pack_ids}
+    if pack_ids:
+        link = models.learning_pack_syllabus
+        for pack_id, *columns in (
+            db.query(link.c.learning_pack_id, *_row_columns(models.SyllabusPoint, rows.SyllabusPointRow))
+            .join(models.SyllabusPoint, models.SyllabusPoint.id == link.c.syllabus_point_id)
+            .filter(link.c.learning_pack_id.in_(pack_ids))
+        ):
+            syllabus_points[pack_id].append(rows.SyllabusPointRow(*columns))
+        link = models.learning_pack_resources
+        for pack_id, *columns in (
+            db.query(link.c.learning_pack_id, *_row_columns(models.Resource, rows.ResourceRow))
+            .join(models.Resource, models.Resource.id == link.c.resource_id)
+            .filter(link.c.learning_pack_id.in_(pack_ids))
+        ):
+            resources[pack_id].append(rows.ResourceRow(*columns))
+    return [
+        rows.LearningPackRow(pack.id, pack.student_id, pack.created_at, syllabus_points[pack.id], resources[pack.id])
+        for pack in packs
+    ]
+
 # MockExam CRUD
+def get_mock_exam_with_questions(db: Session, mock_exam_id: int, lightweight: bool = False):
+    """
+    Get a mock exam with its questions loaded, in two queries.
+
+    Args:
+        db: The database session.
+        mock_exam_id: The ID of the mock exam.
+        lightweight: Return a `rows.MockExamRow` tuple instead of an ORM object.
+
+    Returns:
+        The mock exam object or MockExamRow if found, otherwise None.
+    """
+    if not lightweight:
+        return (
+            db.query(models.MockExam)
+            .options(selectinload(models.MockExam.questions))
+            .filter(models.MockExam.id == mock_exam_id)
+            .first()
+        )
+
+    exam = (
+        db.query(models.MockExam.id, models.MockExam.student_id, models.MockExam.subject, models.MockExam.created_at)
+        .filter(models.MockExam.id == mock_exam_id)
+        .first()
+    )
+    if exam is None:
+        return None
+    link = models.mock_exam_questions
+    questions = [
+        rows.QuestionRow(*columns) for columns in
+        db.query(*_row_columns(models.Question, rows.QuestionRow))
+        .join(link, link.c.question_id == models.Question.id)
+        .filter(link.c.mock_exam_id == mock_exam_id)
+        .order_by(models.Question.id)
+    ]
+    return rows.MockExamRow(*exam, questions)
+
 def create_mock_exam(db: Session, student_id: int, subject: str, question_ids: list[int]):
     """
     Create a new mock exam and associate it with questions.
@@ -123,3 +404,91 @@ def create_mock_exam(db: Session, student_id: int, subject: str, question_ids: l
     db.commit()
     db.refresh(db_mock_exam)
     return db_mock_exam
+
+# ExamAttempt CRUD
+def _insert_exam_attempts(db: Session, submissions: list) -> list:
+    """
+    Insert attempts and their answers without committing, then total each
+    attempt's score from its answers in the database.
+
+    Returns:
+        The IDs of the new attempts, in the order of `submissions`.
+    """
+    attempts = models.ExamAttempt.__table__
+    answers = models.AttemptedQuestion.__table__
+    attempt_rows = [
+        {
+            "student_id": submission["student_id"],
+            "mock_exam_id": submission.get("mock_exam_id"),
+            "submitted_at": submission.get("submitted_at"),
+        }
+        for submission in submissions
+    ]
+    stmt = insert(attempts).values(
+        student_id=bindparam("student_id"),
+        mock_exam_id=bindparam("mock_exam_id"),
+        submitted_at=func.coalesce(
+            bindparam("submitted_at", type_=DateTime(timezone=True)), func.current_timestamp()
+        ),
+    ).returning(attempts.c.id, sort_by_parameter_order=True)
+    attempt_ids = db.execute(stmt, attempt_rows).scalars().all()
+
+    answer_rows = [
+        {
+            "exam_attempt_id": attempt_id,
+            "question_id": answer.get("question_id"),
+            "score": answer.get("score"),
+            "diagnosed_weakness": answer.get("diagnosed_weakness"),
+        }
+        for attempt_id, submission in zip(attempt_ids, submissions)
+        for answer in submission.get("answers", ())
+    ]
+    if answer_rows:
+        db.execute(insert(answers), answer_rows)
+
+    total = (
+        select(func.sum(answers.c.score))
+        .where(answers.c.exam_attempt_id == attempts.c.id)
+        .scalar_subquery()
+    )
+    for start in range(0, len(attempt_ids), IN_CLAUSE_CHUNK_SIZE):
+        chunk = attempt_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+        db.execute(update(attempts).where(attempts.c.id.in_(chunk)).values(score=total))
+    return attempt_ids
+
+def submit_exam_attempt(db: Session, submission: dict):
+    """
+    Record a student's exam attempt and all of its answers in one transaction.
+
+    Args:
+        db: The database session.
+        submission: A dictionary with `student_id`, optional `mock_exam_id` and
+            `submitted_at`, and `answers`: a list of dictionaries with
+            `question_id`, `score` and `diagnosed_weakness`.
+
+    Returns:
+        The newly created exam attempt object, with `score` set to the sum of
+        the answers' scores.
+    """
+    (attempt_id,) = _insert_exam_attempts(db, [submission])
+    db.commit()
+    return db.get(models.ExamAttempt, attempt_id)
+
+def submit_exam_attempts(db: Session, submissions: list):
+    """
+    Record many exam attempts in one transaction, e.g. an end-of-term import
+    of paper-based results.
+
+    Args:
+        db: The database session.
+        submissions: A list of submission dictionaries, as for `submit_exam_attempt`.
+
+    Returns:
+        The IDs of the new exam attempts, in the order of `submissions`.
+    """
+    submissions = list(submissions)
+    if not submissions:
+        return []
+    attempt_ids = _insert_exam_attempts(db, submissions)
+    db.commit()
+    return attempt_ids
@@ -1,12 +1,372 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+import contextlib
+import os
+import threading
+from dataclasses import dataclass, fields
+from urllib.parse import quote
+
+from sqlalchemy import TextClause, create_engine, event, pool
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./alevel.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ENV_PREFIX = "ALEVEL_DB_"
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_POOLS = {"queue", "null", "static"}
+
+@dataclass
+class DatabaseConfig:
+    """
+    Connection URL and tuning for the database engine.
+
+    Every field can be set from the environment as `ALEVEL_DB_<FIELD>`, e.g.
+    `ALEVEL_DB_URL` or `ALEVEL_DB_BUSY_TIMEOUT`.
+
+    The default profile suits many reader threads and one writer: WAL lets
+    readers run alongside the writer, `busy_timeout` makes a second writer wait
+    for the lock instead of failing with "database is locked", and the
+    connection pool keeps one connection per concurrent worker. Writer
+    processes can set `begin_immediate` so they take the write lock when the
+    transaction starts rather than failing on a read-to-write lock upgrade.
+
+    `archive_path` attaches the archive database of old exam attempts to
+    every connection, see `archive.py`.
+    """
+    url: str = SQLALCHEMY_DATABASE_URL
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    cache_size: int = -64000 # negative values are KiB, i.e. 64 MiB
+    mmap_size: int = 268435456
+    busy_timeout: int = 5000 # milliseconds
+    begin_immediate: bool = False
+    pool: str = "queue" # "queue", "null" or "static"
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30
+    archive_path: str = None
+
+    def __post_init__(self):
+        self.journal_mode = self.journal_mode.upper()
+        self.synchronous = self.synchronous.upper()
+        if self.journal_mode not in _JOURNAL_MODES:
+            raise ValueError(f"Unknown journal_mode: {self.journal_mode}")
+        if self.synchronous not in _SYNCHRONOUS_MODES:
+            raise ValueError(f"Unknown synchronous mode: {self.synchronous}")
+        if self.pool not in _POOLS:
+            raise ValueError(f"Unknown pool: {self.pool}")
+
+    @classmethod
+    def from_env(cls, environ=None, **defaults):
+        """
+        Build a config from `ALEVEL_DB_*` environment variables.
+
+        Args:
+            environ: The environment mapping; defaults to `os.environ`.
+            **defaults: Values used for fields not set in the environment.
+
+        Returns:
+            A new DatabaseConfig.
+        """
+        environ = os.environ if environ is None else environ
+        values = dict(defaults)
+        for field in fields(cls):
+            raw = environ.get(ENV_PREFIX + field.name.upper())
+            if raw is None:
+                continue
+            if field.type is bool:
+                values[field.name] = raw.strip().lower() in ("1", "true", "yes", "on")
+            elif field.type in (int, float):
+                values[field.name] = field.type(raw)
+            else:
+                values[field.name] = raw
+        return cls(**values)
+
+def _is_memory_url(url: str) -> bool:
+    database = make_url(url).database
+    return database in (None, "", ":memory:") or database.startswith("file::memory:")
+
+def _pool_kwargs(config: DatabaseConfig) -> dict:
+    """
+    Return the pool arguments for `create_engine` for a config.
+
+    In-memory SQLite always gets a StaticPool: every thread has to share the
+    one connection holding the database.
+    """
+    if config.url.startswith("sqlite") and _is_memory_url(config.url):
+        return {"poolclass": pool.StaticPool}
+    if config.pool == "null":
+        return {"poolclass": pool.NullPool}
+    if config.pool == "static":
+        return {"poolclass": pool.StaticPool}
+    return {
+        "pool_size": config.pool_size,
+        "max_overflow": config.max_overflow,
+        "pool_timeout": config.pool_timeout,
+    }
+
+def apply_sqlite_pragmas(dbapi_connection, config: DatabaseConfig, read_only: bool = False):
+    """
+    Apply the journal mode and tuning pragmas to a new SQLite connection.
+
+    Args:
+        dbapi_connection: The raw sqlite3 connection.
+        config: The database config to apply.
+        read_only: Skip the pragmas that need write access and set `query_only`.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        if read_only:
+            cursor.execute("PRAGMA query_only=1")
+        else:
+            cursor.execute(f"PRAGMA journal_mode={config.journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={config.synchronous}")
+        cursor.execute(f"PRAGMA cache_size={int(config.cache_size)}")
+        cursor.execute(f"PRAGMA mmap_size={int(config.mmap_size)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.busy_timeout)}")
+    finally:
+        cursor.close()
+
+def create_db_engine(config: DatabaseConfig = None):
+    """
+    Create an engine from a config, applying the SQLite pragmas on every connection.
+
+    Args:
+        config: The database config; read from the environment if omitted.
+
+    Returns:
+        A new SQLAlchemy engine.
+    """
+    config = DatabaseConfig.from_env() if config is None else config
+    kwargs = _pool_kwargs(config)
+    if config.url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    engine = create_engine(config.url, **kwargs)
+    if engine.dialect.name == "sqlite":
+        _install_sqlite_hooks(engine, config)
+    return engine
+
+def _install_sqlite_hooks(engine, config: DatabaseConfig):
+    """
+    Apply the pragmas, archive attachment and `begin_immediate` to every new connection of a sync engine.
+
+    Shared by `create_db_engine` and, through its `sync_engine`, `create_async_db_engine`.
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, config)
+        if config.archive_path:
+            from .archive import attach_archive
+            attach_archive(dbapi_connection, config.archive_path)
+        if config.begin_immediate:
+            # Let SQLAlchemy emit BEGIN itself, see the "begin" hook below.
+            dbapi_connection.isolation_level = None
+
+    if config.begin_immediate:
+        @event.listens_for(engine, "begin")
+        def _on_begin(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+def create_async_db_engine(config: DatabaseConfig = None):
+    """
+    Create an asyncio engine for the same database, using the aiosqlite driver.
+
+    The pragmas, the archive attachment and `begin_immediate` are applied
+    through the underlying sync engine's events, exactly as for
+    `create_db_engine`.
+
+    Args:
+        config: The database config; read from the environment if omitted.
+
+    Returns:
+        A new SQLAlchemy AsyncEngine.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    config = DatabaseConfig.from_env() if config is None else config
+    url = make_url(config.url)
+    if url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    async_engine = create_async_engine(url, **_pool_kwargs(config))
+    if async_engine.dialect.name == "sqlite":
+        _install_sqlite_hooks(async_engine.sync_engine, config)
+    return async_engine
+
+def read_only_url(url: str) -> str:
+    """
+    Turn a file SQLite URL into a `mode=ro` URI URL for the same file.
+
+    Args:
+        url: The database URL.
+
+    Returns:
+        The read-only URL.
+
+    Raises:
+        ValueError: If the URL is not a file SQLite database.
+    """
+    parsed = make_url(url)
+    if not url.startswith("sqlite") or _is_memory_url(url):
+        raise ValueError(f"Read-only connections need a file SQLite database, not {url!r}")
+    path = quote(os.path.abspath(parsed.database))
+    return f"{parsed.drivername}:///file:{path}?mode=ro&uri=true"
+
+def create_read_only_engine(config: DatabaseConfig = None):
+    """
+    Create an engine of read-only (`mode=ro`) connections to the database file.
+
+    In WAL mode these read the latest committed data without blocking, or
+    being blocked by, the writer.
+
+    Args:
+        config: The database config; read from the environment if omitted.
+
+    Returns:
+        A new SQLAlchemy engine.
+    """
+    config = DatabaseConfig.from_env() if config is None else config
+    engine = create_engine(
+        read_only_url(config.url), connect_args={"check_same_thread": False}, **_pool_kwargs(config)
+    )
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, config, read_only=True)
+        if config.archive_path:
+            from .archive import attach_archive
+            attach_archive(dbapi_connection, config.archive_path, read_only=True)
+
+    return engine
+
+class RoutingSession(Session):
+    """
+    A session that sends reads to a read-only engine and writes to the primary.
+
+    SELECTs go to `read_bind`. Flushes, INSERT/UPDATE/DELETE and textual
+    statements other than SELECT go to the primary bind. Once a transaction
+    has written, every later statement in it also goes to the primary, so the
+    session reads its own uncommitted writes; committed writes are visible to
+    the read-only connections straight away. `use_primary` forces the primary
+    explicitly.
+    """
+
+    def __init__(self, *args, read_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_bind = read_bind
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self.read_bind is None or self.wrote or self.info.get("use_primary"):
+            return primary
+        # A bare `connection()` call may be used for anything.
+        if clause is None and mapper is None:
+            return primary
+        if self._flushing or getattr(clause, "is_dml", False) or (
+            isinstance(clause, TextClause) and not clause.text.lstrip().upper().startswith("SELECT")
+        ):
+            self.wrote = True
+            return primary
+        return self.read_bind
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.wrote = False
+
+@contextlib.contextmanager
+def use_primary(db: Session):
+    """
+    Send every statement of a session to the primary inside the block.
+
+    Args:
+        db: The database session.
+    """
+    previous = db.info.get("use_primary", False)
+    db.info["use_primary"] = True
+    try:
+        yield db
+    finally:
+        db.info["use_primary"] = previous
+
+def create_routing_sessionmaker(config: DatabaseConfig = None, primary=None):
+    """
+    Create a session factory whose sessions route reads to read-only connections.
+
+    Args:
+        config: The database config; read from the environment if omitted.
+        primary: The engine for writes; a new one from `config` if omitted.
+
+    Returns:
+        A sessionmaker of RoutingSession.
+    """
+    config = DatabaseConfig.from_env() if config is None else config
+    primary = create_db_engine(config) if primary is None else primary
+    return sessionmaker(
+        class_=RoutingSession, autocommit=False, autoflush=False,
+        bind=primary, read_bind=create_read_only_engine(config),
+    )
 
 Base = declarative_base()
+
+# The default engine and session factory are created on first use, so
+# importing the package (models, crud, a CLI's argument parsing) never reads
+# the environment or touches the database file.
+_default_config = None
+_engine = None
+_session_local = None
+_default_lock = threading.Lock()
+
+def configure(config: DatabaseConfig = None, eager: bool = False):
+    """
+    Set up the default `engine` and `SessionLocal`.
+
+    Without this they are created from the environment on first use. Call it
+    before first use to pass a config explicitly; long-running processes can
+    pass `eager=True` to pay the set-up cost at startup (e.g. before forking
+    workers) rather than on their first request.
+
+    Args:
+        config: The database config; read from the environment if omitted.
+        eager: Create the engine, configure the ORM mappers and open a
+            connection now.
+
+    Raises:
+        RuntimeError: If the default engine has already been created.
+    """
+    global _default_config
+    with _default_lock:
+        if _engine is not None:
+            raise RuntimeError("The default engine has already been created")
+        _default_config = config
+    if eager:
+        from sqlalchemy.orm import configure_mappers
+        from . import models # registers the mappers
+
+        configure_mappers()
+        get_engine().connect().close()
+
+def get_engine():
+    """Return the default engine, creating it on first use."""
+    global _engine, _session_local
+    if _engine is None:
+        with _default_lock:
+            if _engine is None:
+                engine = create_db_engine(_default_config)
+                _session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                _engine = engine
+    return _engine
+
+def get_sessionmaker():
+    """Return the default session factory, creating the engine on first use."""
+    get_engine()
+    return _session_local
+
+def __getattr__(name):
+    # `from .database import engine, SessionLocal` keeps working, lazily.
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
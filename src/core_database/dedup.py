@@ -0,0 +1,258 @@
+"""
+Resource deduplication by file content.
+
+The same past paper is often mirrored under several directories, so several
+`Resource` rows point at identical files. `hash_resources` stores the SHA-256
+of every resource file in `Resource.content_hash`, together with the file's
+size and mtime at that moment; later runs only re-hash files whose size or
+mtime changed. Files are read through `mmap` in fixed-size chunks on a thread
+pool (hashlib releases the GIL while hashing large buffers).
+
+`merge_resources` then points the questions and learning packs of duplicate
+resources at one canonical resource and deletes the duplicates, and
+`merge_duplicate_resources` does this for every group of equal hashes, keeping
+the oldest resource. A `full=True` scan re-adds mirrored files as new
+resources; the next merge folds them in again.
+
+Run `python -m src.core_database.dedup hash` and then
+`python -m src.core_database.dedup merge` from the command line.
+"""
+import argparse
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import bindparam, func, literal, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from . import cache, crud, models
+
+HASH_CHUNK_SIZE = 1 << 20 # 1 MiB
+HASH_BATCH_SIZE = 1000
+HASH_WORKERS = 8
+
+def hash_file(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    Compute the SHA-256 of a file through a read-only memory map.
+
+    Args:
+        path: The file to hash.
+        chunk_size: The number of bytes passed to the hash at a time.
+
+    Returns:
+        The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0: # empty files cannot be mapped
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for start in range(0, size, chunk_size):
+                    digest.update(view[start:start + chunk_size])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+def _hash_if_changed(args):
+    """
+    Hash one resource file unless its size and mtime match the stored ones.
+
+    Runs in a worker thread.
+
+    Args:
+        args: A `(id, path, content_hash, hashed_size, hashed_mtime_ns, full, chunk_size)` tuple.
+
+    Returns:
+        A `(status, row)` tuple, where status is "hashed", "skipped" or
+        "missing" and row the update parameters for a hashed file.
+    """
+    resource_id, path, content_hash, hashed_size, hashed_mtime_ns, full, chunk_size = args
+    try:
+        st = os.stat(path)
+        if not full and content_hash is not None and (st.st_size, st.st_mtime_ns) == (hashed_size, hashed_mtime_ns):
+            return "skipped", None
+        content_hash = hash_file(path, chunk_size)
+    except (FileNotFoundError, IsADirectoryError, PermissionError):
+        return "missing", None
+    return "hashed", {
+        "resource_id": resource_id,
+        "content_hash": content_hash,
+        "hashed_size": st.st_size,
+        "hashed_mtime_ns": st.st_mtime_ns,
+    }
+
+def hash_resources(
+    db: Session,
+    workers: int = HASH_WORKERS,
+    full: bool = False,
+    batch_size: int = HASH_BATCH_SIZE,
+    chunk_size: int = HASH_CHUNK_SIZE,
+):
+    """
+    Store the content hash of every resource file whose size or mtime changed.
+
+    Args:
+        db: The database session.
+        workers: The number of threads reading and hashing files.
+        full: If True, re-hash every file.
+        batch_size: The number of resources hashed and written per transaction.
+        chunk_size: The number of bytes passed to the hash at a time.
+
+    Returns:
+        A dictionary with the number of resources "hashed", "skipped" as
+        unchanged and "missing" from disk.
+    """
+    table = models.Resource.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("resource_id"))
+        .values(
+            content_hash=bindparam("content_hash"),
+            hashed_size=bindparam("hashed_size"),
+            hashed_mtime_ns=bindparam("hashed_mtime_ns"),
+        )
+    )
+    summary = {"hashed": 0, "skipped": 0, "missing": 0}
+    after = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = db.execute(
+                select(table.c.id, table.c.path, table.c.content_hash, table.c.hashed_size, table.c.hashed_mtime_ns)
+                .where(table.c.id > after)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            after = batch[-1].id
+            rows = []
+            for status, row in executor.map(_hash_if_changed, [(*resource, full, chunk_size) for resource in batch]):
+                summary[status] += 1
+                if row is not None:
+                    rows.append(row)
+            if rows:
+                db.execute(stmt, rows)
+            db.commit()
+    return summary
+
+def find_duplicate_resources(db: Session) -> dict:
+    """
+    Find resources whose files have the same content.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        A mapping of content hash to the ids of its resources, oldest first,
+        for every hash shared by more than one resource.
+    """
+    duplicated = (
+        select(models.Resource.content_hash)
+        .where(models.Resource.content_hash.isnot(None))
+        .group_by(models.Resource.content_hash)
+        .having(func.count() > 1)
+    )
+    groups = {}
+    for content_hash, resource_id in db.execute(
+        select(models.Resource.content_hash, models.Resource.id)
+        .where(models.Resource.content_hash.in_(duplicated))
+        .order_by(models.Resource.content_hash, models.Resource.id)
+    ):
+        groups.setdefault(content_hash, []).append(resource_id)
+    return groups
+
+def merge_resources(db: Session, canonical_id: int, duplicate_ids: list[int], commit: bool = True):
+    """
+    Point everything that references duplicate resources at a canonical one and delete the duplicates.
+
+    Args:
+        db: The database session.
+        canonical_id: The ID of the resource to keep.
+        duplicate_ids: The IDs of the resources to merge into it.
+        commit: Whether to commit the transaction.
+
+    Returns:
+        A dictionary with the number of "questions" and "learning_packs"
+        re-pointed and the number of "resources" deleted.
+    """
+    duplicate_ids = [resource_id for resource_id in duplicate_ids if resource_id != canonical_id]
+    counts = {"questions": 0, "learning_packs": 0, "resources": 0}
+    if not duplicate_ids:
+        return counts
+    links = models.learning_pack_resources
+    counts["questions"] = db.execute(
+        update(models.Question.__table__)
+        .where(models.Question.resource_id.in_(duplicate_ids))
+        .values(resource_id=canonical_id)
+    ).rowcount
+    # A pack holding both copies keeps one link; the composite key drops the second.
+    counts["learning_packs"] = db.execute(
+        sqlite_insert(links)
+        .from_select(
+            ["learning_pack_id", "resource_id"],
+            select(links.c.learning_pack_id, literal(canonical_id))
+            .where(links.c.resource_id.in_(duplicate_ids))
+            .distinct(),
+        )
+        .on_conflict_do_nothing()
+    ).rowcount
+    db.execute(links.delete().where(links.c.resource_id.in_(duplicate_ids)))
+    paths = db.execute(select(models.Resource.path).where(models.Resource.id.in_(duplicate_ids))).scalars().all()
+    counts["resources"] = db.execute(
+        models.Resource.__table__.delete().where(models.Resource.id.in_(duplicate_ids))
+    ).rowcount
+    if commit:
+        db.commit()
+    cache.invalidate("resource_by_path", *paths)
+    return counts
+
+def merge_duplicate_resources(db: Session):
+    """
+    Merge every group of resources with the same content hash into its oldest resource.
+
+    Each group is merged in its own transaction.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        A dictionary with the number of duplicate "groups" and the totals of
+        `merge_resources`.
+    """
+    totals = {"groups": 0, "questions": 0, "learning_packs": 0, "resources": 0}
+    for canonical_id, *duplicate_ids in find_duplicate_resources(db).values():
+        for start in range(0, len(duplicate_ids), crud.IN_CLAUSE_CHUNK_SIZE):
+            counts = merge_resources(db, canonical_id, duplicate_ids[start:start + crud.IN_CLAUSE_CHUNK_SIZE])
+            for name, count in counts.items():
+                totals[name] += count
+        totals["groups"] += 1
+    return totals
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and merge resources with identical files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    hash_parser = subparsers.add_parser("hash", help="Hash resource files whose size or mtime changed.")
+    hash_parser.add_argument("--workers", type=int, default=HASH_WORKERS, help="The number of hashing threads.")
+    hash_parser.add_argument("--full", action="store_true", help="Re-hash every file.")
+    subparsers.add_parser("merge", help="Merge resources with the same content hash.")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        if args.command == "hash":
+            summary = hash_resources(db, workers=args.workers, full=args.full)
+            print(f"Hashed {summary['hashed']} files, skipped {summary['skipped']} unchanged, {summary['missing']} missing.")
+        else:
+            totals = merge_duplicate_resources(db)
+            print(
+                f"Merged {totals['resources']} duplicate resources in {totals['groups']} groups; re-pointed "
+                f"{totals['questions']} questions and {totals['learning_packs']} learning pack links."
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Mock exam generation that picks questions inside the database.
+
+Instead of loading, counting or ranking every eligible `Question` of a
+subject, generation runs in three steps:
+
+1. The subject's papers in the year range are drawn in random order from
+   the `resources` index. Their questions are read a few papers at a time
+   through the `(resource_id, max_marks)` index, minus the questions the
+   student attempted recently, until some mix of them adds up to the target
+   and every mark value seen has enough candidates to fill it on its own
+   (`max_marks // value`).
+2. A bounded subset-sum over those few distinct mark values decides how many
+   questions of each value make up the target total.
+3. That many question ids per mark value are sampled from the candidates.
+
+Only as many papers are read as the target needs, so the cost does not grow
+with the number of questions. Questions are drawn from randomly chosen
+papers rather than uniformly from the whole subject; with papers of similar
+size the difference is negligible.
+
+The result is persisted with `crud.create_mock_exam` in a single transaction.
+
+Given a `QuestionBank`, steps 1 and 3 run on its in-memory arrays instead and
+only the student's recent attempts are read from the database.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from . import crud, models
+from .archive import archive_attached, with_archive
+
+if TYPE_CHECKING: # NumPy is only imported when a bank is used
+    from .question_bank import QuestionBank
+
+# Papers read by the first candidate query; each further query reads twice as many.
+PAPER_BATCH_SIZE = 16
+# Papers drawn at random in SQL before falling back to reading every paper id.
+PAPER_SAMPLE_SIZE = 128
+
+def _eligible_resources(subject: str, year_from, year_to):
+    """
+    Build the select of the ids of the subject's resources in the year range.
+    """
+    query = select(models.Resource.id).where(models.Resource.subject == subject)
+    if year_from is not None:
+        query = query.where(models.Resource.year >= year_from)
+    if year_to is not None:
+        query = query.where(models.Resource.year <= year_to)
+    return query
+
+def _shuffled_resource_ids(db: Session, eligible, rng: random.Random):
+    """
+    Yield the ids selected by `eligible` in random order.
+
+    The first `PAPER_SAMPLE_SIZE` are drawn by SQLite, which usually covers a
+    whole exam without reading every id of the subject; the rest are only
+    read if needed.
+    """
+    sample = db.execute(eligible.order_by(func.random()).limit(PAPER_SAMPLE_SIZE)).scalars().all()
+    yield from sample
+    if len(sample) == PAPER_SAMPLE_SIZE:
+        rest = db.execute(eligible.where(models.Resource.id.not_in(sample))).scalars().all()
+        rng.shuffle(rest)
+        yield from rest
+
+def _candidate_questions(db: Session, resource_ids, max_marks: int, excluded: set, rng: random.Random) -> dict:
+    """
+    Collect eligible question ids per mark value from the resources, in the given order.
+
+    Stops once `_select_mark_counts` reaches `max_marks` with the candidates
+    and every mark value found has at least `max_marks // value` of them,
+    enough for any mix it can choose, or once the resources run out.
+
+    Returns:
+        A mapping of mark value to a list of question ids.
+    """
+    candidates = {}
+    resource_ids = iter(resource_ids)
+    batch_size = PAPER_BATCH_SIZE
+    while batch := list(islice(resource_ids, batch_size)):
+        batch_size = min(batch_size * 2, crud.IN_CLAUSE_CHUNK_SIZE)
+        for question_id, marks in db.execute(
+            select(models.Question.id, models.Question.max_marks)
+            .where(models.Question.resource_id.in_(batch))
+            .where(models.Question.max_marks > 0, models.Question.max_marks <= max_marks)
+        ):
+            if question_id not in excluded:
+                candidates.setdefault(marks, []).append(question_id)
+        available = {marks: len(ids) for marks, ids in candidates.items()}
+        if all(count >= max_marks // marks for marks, count in available.items()):
+            counts = _select_mark_counts(available, max_marks, rng)
+            if sum(marks * count for marks, count in counts.items()) == max_marks:
+                break
+    return candidates
+
+def _attempted_question_ids(db: Session, student_id: int, exclude_days: int) -> set:
+    """
+    Return the ids of the questions the student attempted in the last `exclude_days` days.
+
+    None means ever and 0 returns an empty set. Archived attempts count too
+    when the archive is attached; the student's attempt ids are read first so
+    the answers are looked up by index in both halves of the archive union.
+    """
+    if exclude_days == 0:
+        return set()
+    attempt, answer = models.ExamAttempt, models.AttemptedQuestion
+    if archive_attached(db):
+        attempt, answer = with_archive(attempt), with_archive(answer)
+    attempts = select(attempt.id).where(attempt.student_id == student_id)
+    if exclude_days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=exclude_days)
+        attempts = attempts.where(attempt.submitted_at >= since)
+    attempt_ids = db.execute(attempts).scalars().all()
+
+    question_ids = set()
+    for start in range(0, len(attempt_ids), crud.IN_CLAUSE_CHUNK_SIZE):
+        chunk = attempt_ids[start:start + crud.IN_CLAUSE_CHUNK_SIZE]
+        question_ids.update(db.execute(select(answer.question_id).where(answer.exam_attempt_id.in_(chunk))).scalars())
+    question_ids.discard(None)
+    return question_ids
+
+def _select_mark_counts(available: dict, target: int, rng: random.Random) -> dict:
+    """
+    Choose how many questions of each mark value to use.
+
+    Solves a bounded subset-sum over the mark values, splitting each value's
+    count into powers of two so the table stays small. The values are visited
+    in random order so repeated calls give different mixes.
+
+    Args:
+        available: A mapping of mark value to the number of eligible questions.
+        target: The total number of marks wanted.
+        rng: The random generator.
+
+    Returns:
+        A mapping of mark value to question count whose marks sum to the
+        largest reachable total not above `target`.
+    """
+    items = []
+    for marks, count in available.items():
+        count = min(count, target // marks)
+        size = 1
+        while count > 0:
+            take = min(size, count)
+            items.append((marks, take))
+            count -= take
+            size *= 2
+    rng.shuffle(items)
+
+    # reachable[total] = (previous total, item index) of the first way found to reach it
+    reachable = {0: None}
+    for index, (marks, take) in enumerate(items):
+        weight = marks * take
+        for total in sorted(reachable, reverse=True):
+            new_total = total + weight
+            if new_total <= target and new_total not in reachable:
+                reachable[new_total] = (total, index)
+        if target in reachable:
+            break
+
+    counts = {}
+    total = max(reachable)
+    while reachable[total] is not None:
+        total, index = reachable[total]
+        marks, take = items[index]
+        counts[marks] = counts.get(marks, 0) + take
+    return counts
+
+def generate_mock_exam(
+    db: Session,
+    student_id: int,
+    subject: str,
+    max_marks: int,
+    year_from: int = None,
+    year_to: int = None,
+    exclude_days: int = None,
+    rng: random.Random = None,
+    bank: "QuestionBank" = None,
+):
+    """
+    Generate and save a mock exam whose questions add up to `max_marks`.
+
+    Args:
+        db: The database session.
+        student_id: The ID of the student.
+        subject: The subject of the mock exam.
+        max_marks: The target total of the questions' `max_marks`.
+        year_from: The earliest paper year to use, inclusive.
+        year_to: The latest paper year to use, inclusive.
+        exclude_days: Skip questions the student attempted in this many past
+            days. None skips every question they have ever attempted; 0
+            disables the exclusion.
+        rng: The random generator used to vary the mark mix.
+        bank: A loaded QuestionBank to pick the questions from instead of
+            querying the questions table.
+
+    Returns:
+        The newly created mock exam object. Its total falls short of
+        `max_marks` only if no combination of the eligible questions of every
+        paper in the year range adds up to it.
+
+    Raises:
+        ValueError: If no eligible questions exist.
+    """
+    rng = rng or random.Random()
+    if bank is not None:
+        return _generate_from_bank(db, bank, student_id, subject, max_marks, year_from, year_to, exclude_days, rng)
+    excluded = _attempted_question_ids(db, student_id, exclude_days)
+    resource_ids = _shuffled_resource_ids(db, _eligible_resources(subject, year_from, year_to), rng)
+    candidates = _candidate_questions(db, resource_ids, max_marks, excluded, rng)
+    counts = _select_mark_counts({marks: len(ids) for marks, ids in candidates.items()}, max_marks, rng)
+    if not counts:
+        raise ValueError(f"No eligible questions for subject {subject!r} and student {student_id}")
+
+    question_ids = [
+        question_id
+        for marks, count in counts.items()
+        for question_id in rng.sample(candidates[marks], count)
+    ]
+    return crud.create_mock_exam(db, student_id=student_id, subject=subject, question_ids=question_ids)
+
+def _generate_from_bank(db: Session, bank: "QuestionBank", student_id: int, subject: str, max_marks: int, year_from, year_to, exclude_days, rng: random.Random):
+    """
+    `generate_mock_exam` with the counting and sampling done on a QuestionBank.
+    """
+    filters = {"subject": subject, "year_from": year_from, "year_to": year_to, "min_marks": 1, "max_marks": max_marks}
+    if exclude_days != 0:
+        filters["exclude_ids"] = list(_attempted_question_ids(db, student_id, exclude_days))
+    counts = _select_mark_counts(bank.count_by_marks(**filters), max_marks, rng)
+    if not counts:
+        raise ValueError(f"No eligible questions for subject {subject!r} and student {student_id}")
+
+    import numpy as np
+
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+    del filters["min_marks"], filters["max_marks"]
+    question_ids = [
+        int(question_id)
+        for marks, count in counts.items()
+        for question_id in bank.sample(count, np_rng, marks=marks, **filters)
+    ]
+    return crud.create_mock_exam(db, student_id=student_id, subject=subject, question_ids=question_ids)
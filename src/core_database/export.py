@@ -0,0 +1,238 @@
+"""
+Streaming export of student history to columnar files for analytics.
+
+`export_history` reads each table in `yield_per` batches and writes every
+batch straight to a Parquet or Arrow IPC file, so memory stays bounded
+however large the tables are. Files are laid out as
+
+    <output_dir>/<table>/[subject=<subject>/]part-<until>.<parquet|arrow>
+
+Partitioning by subject uses the subject of the mock exam, syllabus point or
+resource a row belongs to; `students` and `learning_packs` have no subject and
+are never partitioned. An export covers the rows created before `until`
+(attempts by `submitted_at`, everything else by `created_at`). Passing the
+previous run's `until` as `since` exports only what was added in between, so
+analytics can append increments to its snapshot instead of reading the live
+database.
+
+Run `python -m src.core_database.export OUTPUT_DIR` to export from the
+command line. Needs `pyarrow`.
+"""
+import argparse
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from sqlalchemy import DateTime, Float, Integer, and_, func, or_, select
+from sqlalchemy.orm import Session
+from . import models
+
+EXPORT_BATCH_SIZE = 10000
+EXPORT_TABLES = (
+    "students",
+    "mock_exams",
+    "mock_exam_questions",
+    "exam_attempts",
+    "attempted_questions",
+    "learning_packs",
+    "learning_pack_syllabus",
+    "learning_pack_resources",
+)
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Exporting needs pyarrow; install it with `pip install pyarrow`.") from e
+    return pyarrow
+
+def _sources(name: str):
+    """
+    Describe how to read one exported table.
+
+    Returns:
+        A tuple of the table, the FROM clause, and the subject, timestamp and
+        student columns used to partition and filter it (subject may be None).
+    """
+    students = models.Student.__table__
+    mock_exams = models.MockExam.__table__
+    exam_attempts = models.ExamAttempt.__table__
+    attempted_questions = models.AttemptedQuestion.__table__
+    learning_packs = models.LearningPack.__table__
+    if name == "students":
+        return students, students, None, students.c.created_at, students.c.id
+    if name == "mock_exams":
+        return mock_exams, mock_exams, mock_exams.c.subject, mock_exams.c.created_at, mock_exams.c.student_id
+    if name == "mock_exam_questions":
+        table = models.mock_exam_questions
+        source = table.join(mock_exams, mock_exams.c.id == table.c.mock_exam_id)
+        return table, source, mock_exams.c.subject, mock_exams.c.created_at, mock_exams.c.student_id
+    if name == "exam_attempts":
+        source = exam_attempts.outerjoin(mock_exams, mock_exams.c.id == exam_attempts.c.mock_exam_id)
+        return exam_attempts, source, mock_exams.c.subject, exam_attempts.c.submitted_at, exam_attempts.c.student_id
+    if name == "attempted_questions":
+        source = (
+            attempted_questions
+            .join(exam_attempts, exam_attempts.c.id == attempted_questions.c.exam_attempt_id)
+            .outerjoin(mock_exams, mock_exams.c.id == exam_attempts.c.mock_exam_id)
+        )
+        return attempted_questions, source, mock_exams.c.subject, exam_attempts.c.submitted_at, exam_attempts.c.student_id
+    if name == "learning_packs":
+        return learning_packs, learning_packs, None, learning_packs.c.created_at, learning_packs.c.student_id
+    if name == "learning_pack_syllabus":
+        table, syllabus_points = models.learning_pack_syllabus, models.SyllabusPoint.__table__
+        source = (
+            table
+            .join(learning_packs, learning_packs.c.id == table.c.learning_pack_id)
+            .join(syllabus_points, syllabus_points.c.id == table.c.syllabus_point_id)
+        )
+        return table, source, syllabus_points.c.subject, learning_packs.c.created_at, learning_packs.c.student_id
+    if name == "learning_pack_resources":
+        table, resources = models.learning_pack_resources, models.Resource.__table__
+        source = (
+            table
+            .join(learning_packs, learning_packs.c.id == table.c.learning_pack_id)
+            .join(resources, resources.c.id == table.c.resource_id)
+        )
+        return table, source, resources.c.subject, learning_packs.c.created_at, learning_packs.c.student_id
+    raise ValueError(f"Unknown export table {name!r}; expected one of {EXPORT_TABLES}")
+
+def _arrow_schema(pa, table):
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+def _open_writer(pa, format: str, path: str, schema):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if format == "parquet":
+        return pa.parquet.ParquetWriter(path, schema)
+    return pa.ipc.new_file(path, schema)
+
+def export_history(
+    db: Session,
+    output_dir: str,
+    format: str = "parquet",
+    partition_by: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    student_id: int = None,
+    tables=EXPORT_TABLES,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    """
+    Export student history tables to Parquet or Arrow IPC files.
+
+    Args:
+        db: The database session.
+        output_dir: The directory to write the files under.
+        format: "parquet" or "arrow" (Arrow IPC file format).
+        partition_by: "subject" to write one file per subject, or None.
+        since: Only export rows created at or after this time; pass the
+            previous export's `until` for an incremental export.
+        until: Only export rows created before this time; defaults to the
+            start of the current second, so rows still being written are left
+            for the next export.
+        student_id: Only export this student's history.
+        tables: The names of the tables to export.
+        batch_size: The number of rows fetched and written per batch.
+
+    Returns:
+        A dictionary with the `until` time used and, under "tables", the
+        number of rows and the files written per table.
+
+    Raises:
+        ValueError: If the format, partitioning or a table name is unknown.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {format!r}; expected one of {tuple(EXPORT_FORMATS)}")
+    if partition_by not in (None, "subject"):
+        raise ValueError(f"Unknown partitioning {partition_by!r}; expected 'subject' or None")
+    pa = _pyarrow()
+    if until is None:
+        until = datetime.now(timezone.utc).replace(microsecond=0)
+    # SQLite stores naive UTC timestamps.
+    if until.tzinfo is not None:
+        until = until.astimezone(timezone.utc).replace(tzinfo=None)
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    part = f"part-{until:%Y%m%dT%H%M%S}{EXPORT_FORMATS[format]}"
+
+    report = {"until": until, "tables": {}}
+    for name in tables:
+        table, source, subject, timestamp, student = _sources(name)
+        if partition_by is None:
+            subject = None
+        columns = list(table.columns)
+        stmt = select(*columns, *([subject.label("_partition")] if subject is not None else [])).select_from(source)
+        # SQLite compares timestamps as text, and CURRENT_TIMESTAMP defaults
+        # lack the fractional seconds of bound values, so normalise both sides.
+        created = func.datetime(timestamp)
+        if since is None:
+            stmt = stmt.where(or_(timestamp.is_(None), created < func.datetime(until)))
+        else:
+            stmt = stmt.where(and_(created >= func.datetime(since), created < func.datetime(until)))
+        if student_id is not None:
+            stmt = stmt.where(student == student_id)
+
+        schema = _arrow_schema(pa, table)
+        writers, paths, rows_written = {}, [], 0
+        try:
+            result = db.execute(stmt.execution_options(yield_per=batch_size))
+            for rows in result.partitions():
+                groups = {}
+                for row in rows:
+                    groups.setdefault(row[-1] if subject is not None else None, []).append(row[:len(columns)])
+                for key, group in groups.items():
+                    writer = writers.get(key)
+                    if writer is None:
+                        directory = os.path.join(output_dir, name)
+                        if subject is not None:
+                            directory = os.path.join(directory, "subject=" + (NULL_PARTITION if key is None else quote(key, safe="")))
+                        paths.append(os.path.join(directory, part))
+                        writer = writers[key] = _open_writer(pa, format, paths[-1], schema)
+                    arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*group), schema)]
+                    writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                    rows_written += len(group)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        report["tables"][name] = {"rows": rows_written, "files": sorted(paths)}
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export student history to Parquet or Arrow IPC files.")
+    parser.add_argument("output_dir", help="The directory to write the files under.")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--partition-by", choices=["subject"], help="Write one file per subject.")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only export rows created at or after this ISO time.")
+    parser.add_argument("--student-id", type=int, help="Only export this student's history.")
+    parser.add_argument("--table", action="append", choices=list(EXPORT_TABLES), help="Export only this table (repeatable).")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        report = export_history(
+            db, args.output_dir, format=args.format, partition_by=args.partition_by, since=args.since,
+            student_id=args.student_id, tables=args.table or EXPORT_TABLES, batch_size=args.batch_size,
+        )
+    for name, stats in report["tables"].items():
+        print(f"{name}: {stats['rows']} rows in {len(stats['files'])} files")
+    print(f"Exported rows created before {report['until'].isoformat()}; pass it as --since for the next increment.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Opt-in query instrumentation for the database engine.
+
+Nothing is recorded until `enable_instrumentation()` attaches the listeners,
+so a disabled instrumentation costs nothing. Once enabled it records:
+
+- a latency histogram per statement fingerprint (the SQL with literals and
+  IN-lists collapsed), from `before_cursor_execute`/`after_cursor_execute`;
+- the number of ORM queries each session runs against the engine, including
+  lazy loads, with a warning when one statement repeats often enough in a
+  session to look like an N+1 pattern;
+- a log line for every slow query with its parameters and the
+  `core_database` function that issued it.
+
+Read the numbers with `snapshot()` or as Prometheus text with
+`prometheus_text()`.
+"""
+import functools
+import logging
+import re
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DEFAULT_SLOW_QUERY_THRESHOLD = 0.1 # seconds
+DEFAULT_N_PLUS_ONE_THRESHOLD = 20
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\?\.\.\.\))(?:\s*,\s*\(\?\.\.\.\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Normalise a SQL statement so executions of the same query share a key.
+
+    Args:
+        statement: The SQL text.
+
+    Returns:
+        The statement with literals replaced by `?`, parameter lists
+        collapsed to `(?...)` and whitespace squeezed.
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PARAMETER_LIST.sub("(?...)", statement)
+    statement = _VALUES_LIST.sub(r"\1", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+def _calling_function() -> str:
+    """Return `module.function` of the innermost named core_database function that ran the query."""
+    skipped = (__name__, f"{__package__}.cache")
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        name = frame.f_code.co_name
+        if module.startswith(__package__) and module not in skipped and not name.startswith("<"):
+            return f"{module}.{name}"
+        frame = frame.f_back
+    return None
+
+class _Histogram:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+class QueryInstrumentation:
+    """Latency, per-session query counts and slow-query logging for one engine."""
+
+    def __init__(self, engine, slow_query_threshold: float = DEFAULT_SLOW_QUERY_THRESHOLD, n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD):
+        self.engine = engine
+        self.slow_query_threshold = slow_query_threshold
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_queries = 0
+        self.session_queries = 0
+        self.n_plus_one_warnings = 0
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def install(self):
+        """
+        Attach the engine and session listeners.
+
+        The session listener sees every session in the process and ignores
+        statements that are not sent to this engine.
+        """
+        for identifier, listener in self._engine_listeners():
+            event.listen(self.engine, identifier, listener)
+        event.listen(Session, "do_orm_execute", self._do_orm_execute)
+
+    def uninstall(self):
+        """Detach every listener; recorded numbers are kept."""
+        for identifier, listener in self._engine_listeners():
+            event.remove(self.engine, identifier, listener)
+        event.remove(Session, "do_orm_execute", self._do_orm_execute)
+
+    def _engine_listeners(self):
+        return (
+            ("before_cursor_execute", self._before_cursor_execute),
+            ("after_cursor_execute", self._after_cursor_execute),
+            ("handle_error", self._handle_error),
+        )
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Keyed by cursor, so a statement that fails cannot shift the timings of later ones.
+        conn.info.setdefault("query_start_times", {})[id(cursor)] = time.perf_counter()
+
+    def _handle_error(self, exception_context):
+        cursor = getattr(exception_context.execution_context, "cursor", None)
+        if exception_context.connection is not None and cursor is not None:
+            exception_context.connection.info.get("query_start_times", {}).pop(id(cursor), None)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_times"].pop(id(cursor))
+        key = fingerprint(statement)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(elapsed)
+        if elapsed >= self.slow_query_threshold:
+            with self._lock:
+                self.slow_queries += 1
+            logger.warning(
+                "Slow query (%.1f ms) from %s: %s; parameters: %r",
+                elapsed * 1000, _calling_function(), statement, parameters,
+            )
+
+    def _do_orm_execute(self, orm_execute_state):
+        session = orm_execute_state.session
+        bind = session.get_bind(**orm_execute_state.bind_arguments)
+        if getattr(bind, "engine", bind) is not self.engine:
+            return
+        session.info["query_count"] = session.info.get("query_count", 0) + 1
+        counts = session.info.setdefault("query_fingerprints", {})
+        key = fingerprint(str(orm_execute_state.statement))
+        counts[key] = counts.get(key, 0) + 1
+        with self._lock:
+            self.session_queries += 1
+        if counts[key] == self.n_plus_one_threshold:
+            with self._lock:
+                self.n_plus_one_warnings += 1
+            logger.warning(
+                "Possible N+1: %s ran %d times in one session (%s) from %s",
+                key, counts[key],
+                "relationship load" if orm_execute_state.is_relationship_load else "query",
+                _calling_function(),
+            )
+
+    def snapshot(self) -> dict:
+        """
+        Return a copy of the recorded numbers.
+
+        Returns:
+            A dictionary with the slow query, session query and N+1 warning
+            counters and, under "statements", each fingerprint's count, total
+            and max seconds and cumulative bucket counts.
+        """
+        with self._lock:
+            statements = {}
+            for key, histogram in self._histograms.items():
+                cumulative, buckets = 0, {}
+                for bound, count in zip((*BUCKETS, float("inf")), histogram.buckets):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                statements[key] = {
+                    "count": histogram.count,
+                    "total_seconds": histogram.total,
+                    "max_seconds": histogram.max,
+                    "buckets": buckets,
+                }
+            return {
+                "slow_queries": self.slow_queries,
+                "session_queries": self.session_queries,
+                "n_plus_one_warnings": self.n_plus_one_warnings,
+                "statements": statements,
+            }
+
+    def prometheus_text(self) -> str:
+        """Return the recorded numbers in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP core_database_query_duration_seconds Query latency by statement fingerprint.",
+            "# TYPE core_database_query_duration_seconds histogram",
+        ]
+        for key, stats in snapshot["statements"].items():
+            label = key.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            for bound, count in stats["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'core_database_query_duration_seconds_bucket{{statement="{label}",le="{le}"}} {count}')
+            lines.append(f'core_database_query_duration_seconds_sum{{statement="{label}"}} {stats["total_seconds"]}')
+            lines.append(f'core_database_query_duration_seconds_count{{statement="{label}"}} {stats["count"]}')
+        for name, help_text in (
+            ("slow_queries", "Queries slower than the slow query threshold."),
+            ("session_queries", "ORM queries run through sessions."),
+            ("n_plus_one_warnings", "Statements repeated often enough in one session to look like N+1."),
+        ):
+            lines.append(f"# HELP core_database_{name}_total {help_text}")
+            lines.append(f"# TYPE core_database_{name}_total counter")
+            lines.append(f"core_database_{name}_total {snapshot[name]}")
+        return "\n".join(lines) + "\n"
+
+_instrumentation = None
+
+def enable_instrumentation(engine=None, slow_query_threshold: float = DEFAULT_SLOW_QUERY_THRESHOLD, n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD):
+    """
+    Start recording queries on an engine, replacing any earlier instrumentation.
+
+    Args:
+        engine: The engine to instrument; the default `database.engine` if omitted.
+        slow_query_threshold: Queries taking at least this many seconds are logged.
+        n_plus_one_threshold: Warn when one statement runs this many times in a session.
+
+    Returns:
+        The active QueryInstrumentation.
+    """
+    global _instrumentation
+    if engine is None:
+        from .database import engine
+    disable_instrumentation()
+    _instrumentation = QueryInstrumentation(engine, slow_query_threshold, n_plus_one_threshold)
+    _instrumentation.install()
+    return _instrumentation
+
+def disable_instrumentation():
+    """Stop recording queries and drop the recorded numbers."""
+    global _instrumentation
+    if _instrumentation is not None:
+        _instrumentation.uninstall()
+        _instrumentation = None
+
+def snapshot() -> dict:
+    """Return `QueryInstrumentation.snapshot()` of the active instrumentation, or None."""
+    return _instrumentation.snapshot() if _instrumentation is not None else None
+
+def prometheus_text() -> str:
+    """Return the active instrumentation's numbers as Prometheus text, or "" if disabled."""
+    return _instrumentation.prometheus_text() if _instrumentation is not None else ""
@@ -0,0 +1,264 @@
+"""
+Helpers for Alembic revisions that rebuild large SQLite tables.
+
+SQLite cannot alter most column definitions in place, so a schema change means
+creating a new table, copying the rows across and swapping the names.
+Alembic's batch mode does this with one `INSERT ... SELECT` while the indexes
+already exist on the new table, which gives no progress and no way to tell
+how long it will take. `rebuild_table` instead:
+
+1. creates the new table without its secondary indexes,
+2. copies the rows in rowid ranges of `chunk_size`, reporting progress,
+3. drops the old table and renames the new one into place,
+4. creates the indexes and re-creates the old table's triggers.
+
+It can be used from a revision's `upgrade()`:
+
+    from src.core_database.migrations import rebuild_table
+
+    def upgrade() -> None:
+        rebuild_table(op.get_bind(), "resources", columns=[...])
+
+Both need a live connection, so they do not work in `--sql` (offline) mode.
+
+`estimate_rebuild` times the same steps on a sample of rows and extrapolates to
+the whole table, without changing the schema. Run
+`python -m src.core_database.migrations estimate TABLE` for an estimate of
+rebuilding a table as it is.
+
+Foreign keys are not checked during the swap; this relies on SQLite's default
+`PRAGMA foreign_keys=OFF`, which the engine keeps.
+"""
+import argparse
+import logging
+import time
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_CHUNK_SIZE = 50000
+ESTIMATE_SAMPLE_SIZE = 50000
+
+def _plan(connection, table_name: str, columns, copy_from, indexes, new_name: str):
+    """
+    Build the new table and the copy expressions for a rebuild.
+
+    Returns:
+        A `(new_table, copy_columns, copy_expressions, indexes)` tuple.
+    """
+    # Reflecting the old table also reflects the tables its foreign keys refer
+    # to, which the new table's foreign keys need in the same MetaData.
+    metadata = sa.MetaData()
+    old = sa.Table(table_name, metadata, autoload_with=connection)
+    if columns is None:
+        new_table = old.to_metadata(metadata, name=new_name)
+        for index in list(new_table.indexes):
+            new_table.indexes.discard(index)
+    else:
+        new_table = sa.Table(new_name, metadata, *columns)
+    for foreign_key in new_table.foreign_keys:
+        referred = foreign_key.target_fullname.split(".")[0]
+        if referred not in metadata.tables:
+            sa.Table(referred, metadata, autoload_with=connection)
+    if indexes is None:
+        indexes = [
+            index for index in sa.inspect(connection).get_indexes(table_name)
+            if all(name in new_table.c for name in index["column_names"])
+        ]
+    copy_from = dict(copy_from or {})
+    for column in new_table.columns:
+        if column.name not in copy_from and column.name in old.c:
+            copy_from[column.name] = f'"{column.name}"'
+    return new_table, list(copy_from), list(copy_from.values()), indexes
+
+def _create_indexes(connection, table_name: str, indexes, prefix: str = ""):
+    preparer = connection.dialect.identifier_preparer
+    for index in indexes:
+        unique = "UNIQUE " if index.get("unique") else ""
+        columns = ", ".join(preparer.quote(name) for name in index["column_names"])
+        connection.exec_driver_sql(
+            f"CREATE {unique}INDEX {preparer.quote(prefix + index['name'])} "
+            f"ON {preparer.quote(table_name)} ({columns})"
+        )
+
+def _copy_rows(connection, source: str, target: str, copy_columns, copy_expressions, chunk_size: int, limit: int = None, progress=None):
+    """
+    Copy rows between tables in rowid ranges.
+
+    Returns:
+        The number of rows copied.
+    """
+    preparer = connection.dialect.identifier_preparer
+    low, high = connection.exec_driver_sql(f"SELECT min(rowid), max(rowid) FROM {preparer.quote(source)}").one()
+    total = connection.exec_driver_sql(f"SELECT count(*) FROM {preparer.quote(source)}").scalar()
+    if limit is not None:
+        total = min(total, limit)
+    statement = (
+        f"INSERT INTO {preparer.quote(target)} ({', '.join(preparer.quote(name) for name in copy_columns)}) "
+        f"SELECT {', '.join(copy_expressions)} FROM {preparer.quote(source)} "
+        f"WHERE rowid >= ? AND rowid < ? ORDER BY rowid"
+    )
+    if limit is not None:
+        statement += " LIMIT ?"
+    copied, start = 0, time.perf_counter()
+    while low is not None and low <= high and copied < total:
+        parameters = (low, low + chunk_size) if limit is None else (low, low + chunk_size, limit - copied)
+        copied += connection.exec_driver_sql(statement, parameters).rowcount
+        low += chunk_size
+        if progress is not None:
+            progress(copied, total, time.perf_counter() - start)
+    return copied
+
+def log_progress(table_name: str):
+    """
+    Return a progress callback that logs the rows copied, the rate and the time left.
+
+    Args:
+        table_name: The table named in the log lines.
+    """
+    def progress(copied: int, total: int, elapsed: float):
+        rate = copied / elapsed if elapsed else 0.0
+        remaining = (total - copied) / rate if rate else 0.0
+        logger.info(
+            "%s: copied %d/%d rows (%.0f%%, %.0f rows/s, ~%.0fs left)",
+            table_name, copied, total, 100 * copied / total if total else 100, rate, remaining,
+        )
+    return progress
+
+def rebuild_table(
+    connection,
+    table_name: str,
+    columns=None,
+    copy_from: dict = None,
+    indexes=None,
+    chunk_size: int = MIGRATION_CHUNK_SIZE,
+    progress=None,
+):
+    """
+    Rebuild a table with a new definition, copying its rows in chunks.
+
+    Args:
+        connection: The connection, e.g. `op.get_bind()` in a revision.
+        table_name: The table to rebuild.
+        columns: The new table's `Column`s and constraints; the table's
+            current definition if omitted.
+        copy_from: A mapping of new column name to the SQL expression over
+            the old table that fills it. Columns present in both tables are
+            copied as they are.
+        indexes: The indexes to create after the copy, as dictionaries with
+            "name", "column_names" and "unique" (the inspector's format). By
+            default the old indexes whose columns still exist.
+        chunk_size: The number of rowids copied per statement.
+        progress: Called as `progress(copied, total, elapsed_seconds)` after
+            every chunk; logs through `log_progress` if omitted.
+
+    Returns:
+        The number of rows copied.
+    """
+    new_name = f"_rebuild_{table_name}"
+    new_table, copy_columns, copy_expressions, indexes = _plan(
+        connection, table_name, columns, copy_from, indexes, new_name
+    )
+    triggers = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table_name,)
+    ).scalars().all()
+
+    new_table.create(connection)
+    copied = _copy_rows(
+        connection, table_name, new_name, copy_columns, copy_expressions, chunk_size,
+        progress=progress or log_progress(table_name),
+    )
+    preparer = connection.dialect.identifier_preparer
+    connection.exec_driver_sql(f"DROP TABLE {preparer.quote(table_name)}")
+    # Without the legacy behaviour the rename re-checks every trigger, and
+    # triggers on other tables that mention the dropped table would fail it.
+    connection.exec_driver_sql("PRAGMA legacy_alter_table=ON")
+    try:
+        connection.exec_driver_sql(f"ALTER TABLE {preparer.quote(new_name)} RENAME TO {preparer.quote(table_name)}")
+    finally:
+        connection.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+    start = time.perf_counter()
+    _create_indexes(connection, table_name, indexes)
+    for trigger in triggers:
+        connection.exec_driver_sql(trigger)
+    logger.info("%s: rebuilt %d rows, indexes built in %.1fs", table_name, copied, time.perf_counter() - start)
+    return copied
+
+def estimate_rebuild(
+    connection,
+    table_name: str,
+    columns=None,
+    copy_from: dict = None,
+    indexes=None,
+    sample_size: int = ESTIMATE_SAMPLE_SIZE,
+) -> dict:
+    """
+    Estimate how long `rebuild_table` would take, without changing the schema.
+
+    Copies up to `sample_size` rows into a scratch table, indexes it, drops
+    it again and scales the timings to the table's row count. Index builds
+    grow slightly faster than linearly, so treat the result as a lower bound
+    for very large tables.
+
+    Args:
+        connection: The database connection.
+        table_name: The table to rebuild.
+        columns: As for `rebuild_table`.
+        copy_from: As for `rebuild_table`.
+        indexes: As for `rebuild_table`.
+        sample_size: The number of rows to time.
+
+    Returns:
+        A dictionary with the table's "rows", the "sample_rows" timed and the
+        estimated "copy_seconds", "index_seconds" and "total_seconds".
+    """
+    scratch = f"_estimate_{table_name}"
+    new_table, copy_columns, copy_expressions, indexes = _plan(
+        connection, table_name, columns, copy_from, indexes, scratch
+    )
+    preparer = connection.dialect.identifier_preparer
+    rows = connection.exec_driver_sql(f"SELECT count(*) FROM {preparer.quote(table_name)}").scalar()
+    new_table.create(connection)
+    try:
+        start = time.perf_counter()
+        sampled = _copy_rows(
+            connection, table_name, scratch, copy_columns, copy_expressions,
+            MIGRATION_CHUNK_SIZE, limit=sample_size,
+        )
+        copy_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        _create_indexes(connection, scratch, indexes, prefix="_estimate_")
+        index_seconds = time.perf_counter() - start
+    finally:
+        connection.exec_driver_sql(f"DROP TABLE {preparer.quote(scratch)}")
+    scale = rows / sampled if sampled else 0.0
+    return {
+        "rows": rows,
+        "sample_rows": sampled,
+        "copy_seconds": copy_seconds * scale,
+        "index_seconds": index_seconds * scale,
+        "total_seconds": (copy_seconds + index_seconds) * scale,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate the time to rebuild tables during a migration.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    estimate = subparsers.add_parser("estimate", help="Time a rebuild of tables as they are on a sample of rows.")
+    estimate.add_argument("tables", nargs="+", help="The tables to estimate.")
+    estimate.add_argument("--sample-size", type=int, default=ESTIMATE_SAMPLE_SIZE)
+    args = parser.parse_args(argv)
+
+    from .database import engine
+
+    for table_name in args.tables:
+        with engine.begin() as connection:
+            result = estimate_rebuild(connection, table_name, sample_size=args.sample_size)
+        print(
+            f"{table_name}: {result['rows']} rows, ~{result['total_seconds']:.1f}s "
+            f"(copy {result['copy_seconds']:.1f}s, indexes {result['index_seconds']:.1f}s; "
+            f"timed on {result['sample_rows']} rows)"
+        )
+
+if __name__ == "__main__":
+    main()
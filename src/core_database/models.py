@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Table, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Float, Table, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -6,22 +6,22 @@ from .database import Base
 learning_pack_syllabus = Table(
     "learning_pack_syllabus",
     Base.metadata,
-    Column("learning_pack_id", Integer, ForeignKey("learning_packs.id")),
-    Column("syllabus_point_id", Integer, ForeignKey("syllabus_points.id")),
+    Column("learning_pack_id", Integer, ForeignKey("learning_packs.id"), primary_key=True),
+    Column("syllabus_point_id", Integer, ForeignKey("syllabus_points.id"), primary_key=True, index=True),
 )
 
 learning_pack_resources = Table(
     "learning_pack_resources",
     Base.metadata,
-    Column("learning_pack_id", Integer, ForeignKey("learning_packs.id")),
-    Column("resource_id", Integer, ForeignKey("resources.id")),
+    Column("learning_pack_id", Integer, ForeignKey("learning_packs.id"), primary_key=True),
+    Column("resource_id", Integer, ForeignKey("resources.id"), primary_key=True, index=True),
 )
 
 mock_exam_questions = Table(
     "mock_exam_questions",
     Base.metadata,
-    Column("mock_exam_id", Integer, ForeignKey("mock_exams.id")),
-    Column("question_id", Integer, ForeignKey("questions.id")),
+    Column("mock_exam_id", Integer, ForeignKey("mock_exams.id"), primary_key=True),
+    Column("question_id", Integer, ForeignKey("questions.id"), primary_key=True, index=True),
 )
 
 class Student(Base):
@@ -42,6 +42,13 @@ class Resource(Base):
     type = Column(String)
     path = Column(String, unique=True, index=True)
     last_seen = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    content_hash = Column(String, index=True) # SHA-256 of the file, see dedup.py
+    hashed_size = Column(BigInteger) # file size and mtime when content_hash was computed
+    hashed_mtime_ns = Column(BigInteger)
+
+    __table_args__ = (
+        Index("ix_resources_subject_year_paper_variant", "subject", "year", "paper", "variant"),
+    )
 
 class SyllabusPoint(Base):
     """A trackable item from a subject's syllabus."""
@@ -51,6 +58,35 @@ class SyllabusPoint(Base):
     code = Column(String, unique=True, index=True)
     description = Column(String)
 
+# Full-text index over syllabus_points, kept in sync by triggers. See search.py.
+SYLLABUS_POINTS_FTS = (
+"""
+CREATE VIRTUAL TABLE IF NOT EXISTS syllabus_points_fts USING fts5(
+    code, description, content='syllabus_points', content_rowid='id', tokenize='porter unicode61'
+)
+""",
+"""
+CREATE TRIGGER IF NOT EXISTS syllabus_points_fts_ai AFTER INSERT ON syllabus_points BEGIN
+    INSERT INTO syllabus_points_fts (rowid, code, description) VALUES (NEW.id, NEW.code, NEW.description);
+END
+""",
+"""
+CREATE TRIGGER IF NOT EXISTS syllabus_points_fts_ad AFTER DELETE ON syllabus_points BEGIN
+    INSERT INTO syllabus_points_fts (syllabus_points_fts, rowid, code, description)
+    VALUES ('delete', OLD.id, OLD.code, OLD.description);
+END
+""",
+"""
+CREATE TRIGGER IF NOT EXISTS syllabus_points_fts_au AFTER UPDATE OF code, description ON syllabus_points BEGIN
+    INSERT INTO syllabus_points_fts (syllabus_points_fts, rowid, code, description)
+    VALUES ('delete', OLD.id, OLD.code, OLD.description);
+    INSERT INTO syllabus_points_fts (rowid, code, description) VALUES (NEW.id, NEW.code, NEW.description);
+END
+""",
+)
+for _ddl in SYLLABUS_POINTS_FTS:
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+
 class LearningPack(Base):
     """A collection of resources for a study session."""
     __tablename__ = "learning_packs"
@@ -60,6 +96,10 @@ class LearningPack(Base):
     syllabus_points = relationship("SyllabusPoint", secondary=learning_pack_syllabus)
     resources = relationship("Resource", secondary=learning_pack_resources)
 
+    __table_args__ = (
+        Index("ix_learning_packs_student_id_created_at", "student_id", "created_at"),
+    )
+
 class Question(Base):
     """Represents a single question from a past paper."""
     __tablename__ = "questions"
@@ -68,6 +108,11 @@ class Question(Base):
     question_number = Column(String) # e.g., "1a", "2b(i)"
     max_marks = Column(Integer)
 
+    __table_args__ = (
+        # Covers the candidate reads of exam_generator.
+        Index("ix_questions_resource_id_max_marks", "resource_id", "max_marks"),
+    )
+
 class MockExam(Base):
     """A generated test paper for a student."""
     __tablename__ = "mock_exams"
@@ -77,20 +122,210 @@ class MockExam(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     questions = relationship("Question", secondary=mock_exam_questions)
 
+    __table_args__ = (
+        Index("ix_mock_exams_student_id_created_at", "student_id", "created_at"),
+    )
+
 class ExamAttempt(Base):
     """A student's submission for a mock exam."""
     __tablename__ = "exam_attempts"
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
-    mock_exam_id = Column(Integer, ForeignKey("mock_exams.id"))
+    mock_exam_id = Column(Integer, ForeignKey("mock_exams.id"), index=True)
     score = Column(Float)
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_exam_attempts_student_id_submitted_at", "student_id", "submitted_at"),
+    )
+
 class AttemptedQuestion(Base):
     """Represents a student's answer to a single question in an exam attempt."""
     __tablename__ = "attempted_questions"
     id = Column(Integer, primary_key=True, index=True)
-    exam_attempt_id = Column(Integer, ForeignKey("exam_attempts.id"))
-    question_id = Column(Integer, ForeignKey("questions.id"))
+    exam_attempt_id = Column(Integer, ForeignKey("exam_attempts.id"), index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), index=True)
     score = Column(Float)
     diagnosed_weakness = Column(String)
+
+class StudentWeakness(Base):
+    """Running totals of a student's attempts per subject and diagnosed weakness."""
+    __tablename__ = "student_weaknesses"
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    subject = Column(String, primary_key=True) # "" if the attempt has no subject
+    weakness = Column(String, primary_key=True)
+    attempt_count = Column(Integer, nullable=False, default=0)
+    scored_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+    last_seen = Column(DateTime(timezone=True))
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.scored_count if self.scored_count else None
+
+# Keeps student_weaknesses up to date for every insert into attempted_questions,
+# whichever code path writes the row.
+STUDENT_WEAKNESS_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS attempted_questions_weakness_ai
+AFTER INSERT ON attempted_questions
+WHEN NEW.diagnosed_weakness IS NOT NULL
+BEGIN
+    INSERT INTO student_weaknesses (student_id, subject, weakness, attempt_count, scored_count, score_sum, last_seen)
+    SELECT exam_attempts.student_id,
+           COALESCE(mock_exams.subject, resources.subject, ''),
+           NEW.diagnosed_weakness,
+           1,
+           NEW.score IS NOT NULL,
+           COALESCE(NEW.score, 0),
+           COALESCE(exam_attempts.submitted_at, CURRENT_TIMESTAMP)
+    FROM exam_attempts
+    LEFT JOIN mock_exams ON mock_exams.id = exam_attempts.mock_exam_id
+    LEFT JOIN questions ON questions.id = NEW.question_id
+    LEFT JOIN resources ON resources.id = questions.resource_id
+    WHERE exam_attempts.id = NEW.exam_attempt_id
+    ON CONFLICT (student_id, subject, weakness) DO UPDATE SET
+        attempt_count = attempt_count + 1,
+        scored_count = scored_count + excluded.scored_count,
+        score_sum = score_sum + excluded.score_sum,
+        last_seen = MAX(last_seen, excluded.last_seen);
+END
+"""
+event.listen(Base.metadata, "after_create", DDL(STUDENT_WEAKNESS_TRIGGER).execute_if(dialect="sqlite"))
+
+class ReviewState(Base):
+    """Spaced-repetition (SM-2) state of one question for one student. See scheduler.py."""
+    __tablename__ = "review_states"
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    subject = Column(String, nullable=False) # the question's resource subject, "" if none
+    ease = Column(Float, nullable=False, default=2.5)
+    interval_days = Column(Float, nullable=False, default=1)
+    repetitions = Column(Integer, nullable=False, default=0) # successful reviews in a row
+    last_quality = Column(Integer) # 0-5, from score / max_marks
+    last_reviewed_at = Column(DateTime(timezone=True))
+    due_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # "Next N due for a student in a subject" is one range scan of this index.
+        Index("ix_review_states_student_id_subject_due_at", "student_id", "subject", "due_at"),
+    )
+
+# SM-2 update of review_states from `{source}`, a SELECT of student_id,
+# question_id, subject, quality (0-5) and reviewed_at. SQLite applies an
+# upsert row by row in `{order}`, so replaying history in submission order
+# gives the same state as the trigger did. Reviews older than the stored one
+# are ignored.
+REVIEW_STATE_UPSERT = """
+INSERT INTO review_states (student_id, question_id, subject, ease, interval_days, repetitions, last_quality, last_reviewed_at, due_at)
+SELECT student_id, question_id, subject,
+       MAX(1.3, 2.6 - (5 - quality) * (0.08 + (5 - quality) * 0.02)),
+       1,
+       quality >= 3,
+       quality,
+       reviewed_at,
+       datetime(reviewed_at, '+1 days')
+FROM ({source}) AS reviews
+WHERE true
+ORDER BY {order}
+ON CONFLICT (student_id, question_id) DO UPDATE SET
+    ease = MAX(1.3, ease + 0.1 - (5 - excluded.last_quality) * (0.08 + (5 - excluded.last_quality) * 0.02)),
+    repetitions = CASE WHEN excluded.last_quality >= 3 THEN repetitions + 1 ELSE 0 END,
+    interval_days = CASE
+        WHEN excluded.last_quality < 3 OR repetitions = 0 THEN 1
+        WHEN repetitions = 1 THEN 6
+        ELSE ROUND(interval_days * ease)
+    END,
+    last_quality = excluded.last_quality,
+    last_reviewed_at = excluded.last_reviewed_at,
+    due_at = datetime(excluded.last_reviewed_at, '+' || CASE
+        WHEN excluded.last_quality < 3 OR repetitions = 0 THEN 1
+        WHEN repetitions = 1 THEN 6
+        ELSE ROUND(interval_days * ease)
+    END || ' days')
+WHERE excluded.last_reviewed_at >= review_states.last_reviewed_at"""
+
+# Keeps review_states up to date for every scored answer inserted into
+# attempted_questions. An answer's quality is its share of the question's marks.
+REVIEW_STATE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS attempted_questions_review_ai
+AFTER INSERT ON attempted_questions
+WHEN NEW.score IS NOT NULL AND NEW.question_id IS NOT NULL
+BEGIN
+""" + REVIEW_STATE_UPSERT.format(
+    source="""
+    SELECT exam_attempts.student_id AS student_id,
+           questions.id AS question_id,
+           COALESCE(resources.subject, '') AS subject,
+           MIN(5, MAX(0, CAST(ROUND(5.0 * NEW.score / questions.max_marks) AS INTEGER))) AS quality,
+           COALESCE(exam_attempts.submitted_at, CURRENT_TIMESTAMP) AS reviewed_at
+    FROM exam_attempts
+    JOIN questions ON questions.id = NEW.question_id AND questions.max_marks > 0
+    LEFT JOIN resources ON resources.id = questions.resource_id
+    WHERE exam_attempts.id = NEW.exam_attempt_id
+    """,
+    order="reviewed_at",
+) + """;
+END
+"""
+event.listen(Base.metadata, "after_create", DDL(REVIEW_STATE_TRIGGER).execute_if(dialect="sqlite"))
+
+class SyllabusCoverage(Base):
+    """A syllabus point covered by at least one of a student's learning packs. See coverage.py."""
+    __tablename__ = "syllabus_coverage"
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    syllabus_point_id = Column(Integer, ForeignKey("syllabus_points.id"), primary_key=True)
+    subject = Column(String, nullable=False) # the syllabus point's subject, "" if none
+    pack_count = Column(Integer, nullable=False, default=0) # learning packs covering the point
+    first_covered_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # Covered counts per subject are range scans of this index.
+        Index("ix_syllabus_coverage_student_id_subject", "student_id", "subject"),
+    )
+
+# Keeps syllabus_coverage up to date for every link written to or removed from
+# learning_pack_syllabus, e.g. by crud.create_learning_pack_with_syllabus.
+SYLLABUS_COVERAGE_TRIGGERS = (
+"""
+CREATE TRIGGER IF NOT EXISTS learning_pack_syllabus_coverage_ai
+AFTER INSERT ON learning_pack_syllabus
+BEGIN
+    INSERT INTO syllabus_coverage (student_id, syllabus_point_id, subject, pack_count, first_covered_at)
+    SELECT learning_packs.student_id,
+           NEW.syllabus_point_id,
+           COALESCE(syllabus_points.subject, ''),
+           1,
+           COALESCE(learning_packs.created_at, CURRENT_TIMESTAMP)
+    FROM learning_packs
+    JOIN syllabus_points ON syllabus_points.id = NEW.syllabus_point_id
+    WHERE learning_packs.id = NEW.learning_pack_id AND learning_packs.student_id IS NOT NULL
+    ON CONFLICT (student_id, syllabus_point_id) DO UPDATE SET
+        pack_count = pack_count + 1,
+        first_covered_at = MIN(first_covered_at, excluded.first_covered_at);
+END
+""",
+"""
+CREATE TRIGGER IF NOT EXISTS learning_pack_syllabus_coverage_ad
+AFTER DELETE ON learning_pack_syllabus
+BEGIN
+    UPDATE syllabus_coverage SET pack_count = pack_count - 1
+    WHERE syllabus_point_id = OLD.syllabus_point_id
+      AND student_id = (SELECT student_id FROM learning_packs WHERE id = OLD.learning_pack_id);
+    DELETE FROM syllabus_coverage
+    WHERE syllabus_point_id = OLD.syllabus_point_id
+      AND student_id = (SELECT student_id FROM learning_packs WHERE id = OLD.learning_pack_id)
+      AND pack_count <= 0;
+END
+""",
+)
+for _ddl in SYLLABUS_COVERAGE_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+
+class ScanDirectory(Base):
+    """The scanner's manifest entry for one directory of the resource archive."""
+    __tablename__ = "scan_directories"
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, unique=True, index=True)
+    mtime_ns = Column(BigInteger)
+    inode = Column(BigInteger)
+    entries = Column(Text) # JSON: {"dirs": [...], "files": {name: [size, mtime_ns, inode]}}
@@ -0,0 +1,241 @@
+"""
+A compact, array-backed index of questions for exam assembly.
+
+`QuestionBank` loads `questions` joined with their `resources` once into one
+NumPy array per column, about 24 bytes per question instead of a full ORM
+object, and answers filters (subject, year range, paper, mark range) and
+random samples with vectorised operations instead of a query each.
+
+`refresh` appends the questions whose id is above the highest id loaded, so a
+long-running planner stays current cheaply. Edits to existing questions or
+resources (e.g. a dedup merge) are only picked up by a fresh `load`.
+
+`save` writes the columns to a directory of `.npy` files and `open` maps them
+read-only, so worker processes share one copy of the pages through the OS
+page cache.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from . import models
+
+QUESTION_BANK_BATCH_SIZE = 50000
+MISSING = -1 # stored for NULL numbers
+
+_COLUMNS = {
+    "id": np.int64,
+    "resource_id": np.int64,
+    "max_marks": np.int16,
+    "subject": np.int16, # index into QuestionBank.subjects
+    "year": np.int16,
+    "paper": np.int8,
+    "variant": np.int8,
+}
+
+class QuestionBank:
+    """Column arrays of every question and its resource, ordered by question id."""
+
+    def __init__(self, columns: dict = None, subjects: list = None):
+        self.columns = columns or {name: np.empty(0, dtype) for name, dtype in _COLUMNS.items()}
+        self.subjects = list(subjects or [])
+        self._subject_codes = {subject: code for code, subject in enumerate(self.subjects)}
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the column arrays, in bytes."""
+        return sum(column.nbytes for column in self.columns.values())
+
+    @classmethod
+    def load(cls, db: Session, batch_size: int = QUESTION_BANK_BATCH_SIZE):
+        """
+        Load every question into a new bank.
+
+        Args:
+            db: The database session.
+            batch_size: The number of rows fetched per batch.
+
+        Returns:
+            The new QuestionBank.
+        """
+        bank = cls()
+        bank.refresh(db, batch_size)
+        return bank
+
+    def refresh(self, db: Session, batch_size: int = QUESTION_BANK_BATCH_SIZE) -> int:
+        """
+        Append the questions added since the bank was loaded or last refreshed.
+
+        Args:
+            db: The database session.
+            batch_size: The number of rows fetched per batch.
+
+        Returns:
+            The number of questions added.
+        """
+        after = int(self.columns["id"][-1]) if len(self) else 0
+        questions, resources = models.Question.__table__, models.Resource.__table__
+        # Core rows on the session's connection skip the ORM's per-row work;
+        # NULL numbers come back as MISSING so the arrays fill straight from them.
+        stmt = (
+            select(
+                questions.c.id,
+                func.coalesce(questions.c.resource_id, MISSING),
+                func.coalesce(questions.c.max_marks, MISSING),
+                resources.c.subject,
+                func.coalesce(resources.c.year, MISSING),
+                func.coalesce(resources.c.paper, MISSING),
+                func.coalesce(resources.c.variant, MISSING),
+            )
+            .select_from(questions.outerjoin(resources, resources.c.id == questions.c.resource_id))
+            .where(questions.c.id > after)
+            .order_by(questions.c.id)
+        )
+        parts = {name: [column] for name, column in self.columns.items()}
+        added = 0
+        result = db.connection().execution_options(yield_per=batch_size).execute(stmt)
+        for rows in result.partitions():
+            for name, values in zip(_COLUMNS, zip(*rows)):
+                if name == "subject":
+                    values = [self._subject_code(subject) for subject in values]
+                parts[name].append(np.fromiter(values, _COLUMNS[name], len(rows)))
+            added += len(rows)
+        if added:
+            self.columns = {name: np.concatenate(arrays) for name, arrays in parts.items()}
+        return added
+
+    def _subject_code(self, subject) -> int:
+        if subject is None:
+            return MISSING
+        code = self._subject_codes.get(subject)
+        if code is None:
+            code = self._subject_codes[subject] = len(self.subjects)
+            self.subjects.append(subject)
+        return code
+
+    def mask(
+        self,
+        subject: str = None,
+        year_from: int = None,
+        year_to: int = None,
+        paper: int = None,
+        min_marks: int = None,
+        max_marks: int = None,
+        exclude_ids=None,
+    ) -> np.ndarray:
+        """
+        Return a boolean mask of the questions matching every given filter.
+
+        Args:
+            subject: The resource's subject.
+            year_from: The earliest paper year, inclusive.
+            year_to: The latest paper year, inclusive.
+            paper: The paper number.
+            min_marks: The smallest `max_marks`, inclusive.
+            max_marks: The largest `max_marks`, inclusive.
+            exclude_ids: Question IDs to leave out.
+
+        Returns:
+            A boolean array aligned with the bank's columns.
+        """
+        columns = self.columns
+        mask = np.ones(len(self), dtype=bool)
+        if subject is not None:
+            mask &= columns["subject"] == self._subject_codes.get(subject, -2)
+        if year_from is not None:
+            mask &= columns["year"] >= year_from
+        if year_to is not None:
+            mask &= (columns["year"] <= year_to) & (columns["year"] != MISSING)
+        if paper is not None:
+            mask &= columns["paper"] == paper
+        if min_marks is not None:
+            mask &= columns["max_marks"] >= min_marks
+        if max_marks is not None:
+            mask &= (columns["max_marks"] <= max_marks) & (columns["max_marks"] != MISSING)
+        if exclude_ids is not None:
+            mask &= ~np.isin(columns["id"], np.fromiter(exclude_ids, np.int64))
+        return mask
+
+    def filter(self, **filters) -> np.ndarray:
+        """
+        Return the IDs of the questions matching the filters of `mask`.
+        """
+        return self.columns["id"][self.mask(**filters)]
+
+    def count_by_marks(self, **filters) -> dict:
+        """
+        Count the questions matching the filters of `mask` per `max_marks` value.
+
+        Returns:
+            A mapping of mark value to question count.
+        """
+        marks, counts = np.unique(self.columns["max_marks"][self.mask(**filters)], return_counts=True)
+        return {int(m): int(c) for m, c in zip(marks, counts) if m != MISSING}
+
+    def sample(self, n: int, rng: np.random.Generator = None, marks: int = None, **filters) -> np.ndarray:
+        """
+        Draw up to `n` distinct question IDs at random from those matching the filters.
+
+        Args:
+            n: The number of questions wanted.
+            rng: The NumPy random generator.
+            marks: Only draw questions worth exactly this many marks.
+            **filters: The filters of `mask`.
+
+        Returns:
+            An array of at most `n` question IDs.
+        """
+        rng = rng or np.random.default_rng()
+        if marks is not None:
+            filters["min_marks"] = filters["max_marks"] = marks
+        candidates = self.columns["id"][self.mask(**filters)]
+        return rng.choice(candidates, size=min(n, len(candidates)), replace=False)
+
+    def save(self, path: str):
+        """
+        Write the bank to a directory that `open` can memory-map.
+
+        The directory is written beside `path` and then swapped in, so readers
+        never see a half-written bank.
+
+        Args:
+            path: The directory to write.
+        """
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path)
+        for name, column in self.columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), column)
+        with open(os.path.join(tmp_path, "subjects.json"), "w") as f:
+            json.dump(self.subjects, f)
+        if os.path.exists(path):
+            old_path = f"{path}.old-{os.getpid()}"
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path)
+        else:
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path: str):
+        """
+        Map a saved bank read-only.
+
+        Args:
+            path: The directory written by `save`.
+
+        Returns:
+            A QuestionBank whose columns are read-only memory maps.
+        """
+        columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in _COLUMNS
+        }
+        with open(os.path.join(path, "subjects.json")) as f:
+            subjects = json.load(f)
+        return cls(columns, subjects)
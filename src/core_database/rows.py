@@ -0,0 +1,44 @@
+"""
+Lightweight read-only rows returned by the `lightweight=True` read APIs in
+`crud.py`.
+
+They are plain named tuples: no identity map, no change tracking and no lazy
+loading, at a fraction of the memory of the matching ORM objects.
+"""
+from datetime import datetime
+from typing import NamedTuple
+
+class SyllabusPointRow(NamedTuple):
+    id: int
+    subject: str
+    code: str
+    description: str
+
+class ResourceRow(NamedTuple):
+    id: int
+    subject: str
+    year: int
+    paper: int
+    variant: int
+    type: str
+    path: str
+
+class QuestionRow(NamedTuple):
+    id: int
+    resource_id: int
+    question_number: str
+    max_marks: int
+
+class LearningPackRow(NamedTuple):
+    id: int
+    student_id: int
+    created_at: datetime
+    syllabus_points: list
+    resources: list
+
+class MockExamRow(NamedTuple):
+    id: int
+    student_id: int
+    subject: str
+    created_at: datetime
+    questions: list
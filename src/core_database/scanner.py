@@ -0,0 +1,220 @@
+"""
+Incremental filesystem scanner that keeps the `resources` table in sync with
+a directory tree of Cambridge past papers.
+
+The scanner stores one `ScanDirectory` manifest row per directory holding the
+directory's mtime/inode and the stat of every resource file inside it. On a
+rescan each known directory is stat'ed once; only directories whose mtime or
+inode changed are listed again, and only files that were added, removed or
+changed in those directories are written to the database.
+
+Files rewritten in place do not change their directory's mtime, so they are
+only picked up by a `full=True` scan.
+
+Resources whose files have gone are deleted unless a question or learning
+pack still references them; those rows are kept, with a `last_seen` that no
+longer advances, and counted as "missing". A scan applies its upserts,
+deletes and manifest changes in one transaction.
+"""
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import Session
+from . import cache, crud, models
+
+RESOURCE_EXTENSIONS = (".pdf",)
+
+RESOURCE_TYPES = {
+    "qp": "Past Paper",
+    "ms": "Mark Scheme",
+    "er": "Examiner Report",
+    "gt": "Grade Thresholds",
+    "in": "Insert",
+    "sf": "Source Files",
+    "ci": "Confidential Instructions",
+    "pm": "Pre-release Material",
+    "sp": "Specimen Paper",
+    "sm": "Specimen Mark Scheme",
+}
+
+_FILENAME_PATTERN = re.compile(
+    r"^(?P<subject>\d{4})_(?P<session>[mswy])(?P<year>\d{2})_(?P<type>[a-z]{2,3})"
+    r"(?:_(?P<paper>\d)(?P<variant>\d)?)?\.[a-z0-9]+$",
+    re.IGNORECASE,
+)
+
+def parse_resource_filename(filename: str):
+    """
+    Parse a Cambridge resource filename such as `9709_s22_qp_12.pdf`.
+
+    Args:
+        filename: The file's base name.
+
+    Returns:
+        A dictionary with subject, year, paper, variant and type, or None if
+        the name does not follow the Cambridge naming scheme.
+    """
+    match = _FILENAME_PATTERN.match(filename)
+    if match is None:
+        return None
+    type_code = match.group("type").lower()
+    return {
+        "subject": match.group("subject"),
+        "year": 2000 + int(match.group("year")),
+        "paper": int(match.group("paper")) if match.group("paper") else None,
+        "variant": int(match.group("variant")) if match.group("variant") else None,
+        "type": RESOURCE_TYPES.get(type_code, type_code),
+    }
+
+def _list_directory(args):
+    """
+    List one directory, stat its resource files and parse their names.
+
+    Runs in a worker process when the scan uses a process pool.
+
+    Args:
+        args: A `(path, extensions)` tuple.
+
+    Returns:
+        A `(path, stat, subdirs, files, parsed)` tuple, where `stat` is None if
+        the directory has disappeared.
+    """
+    path, extensions = args
+    subdirs, files, parsed = [], {}, {}
+    try:
+        stat = os.stat(path)
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file() and entry.name.lower().endswith(extensions):
+                    st = entry.stat()
+                    files[entry.name] = [st.st_size, st.st_mtime_ns, st.st_ino]
+                    parsed[entry.name] = parse_resource_filename(entry.name)
+    except FileNotFoundError:
+        return path, None, [], {}, {}
+    return path, (stat.st_mtime_ns, stat.st_ino), sorted(subdirs), files, parsed
+
+def _load_manifest(db: Session, root: str):
+    """
+    Load the manifest rows for `root` and everything below it.
+
+    Returns:
+        A dictionary mapping directory path to its `ScanDirectory` row.
+    """
+    prefix = root.rstrip(os.sep) + os.sep
+    rows = db.query(models.ScanDirectory).filter(
+        (models.ScanDirectory.path == root)
+        | (models.ScanDirectory.path.startswith(prefix, autoescape=True))
+    )
+    return {row.path: row for row in rows}
+
+def scan_resources(db: Session, root: str, workers: int = 1, extensions=RESOURCE_EXTENSIONS, full: bool = False):
+    """
+    Scan a directory tree and bring the `resources` table up to date.
+
+    Args:
+        db: The database session.
+        root: The root directory of the resource archive.
+        workers: The number of worker processes used to list changed
+            directories. 1 lists them in the calling process.
+        extensions: The file extensions that count as resources.
+        full: If True, relist every directory even if its mtime is unchanged.
+
+    Returns:
+        A dictionary with the number of directories "scanned" and "skipped",
+        and of resources "inserted", "updated", "removed" and "missing"
+        (files gone but still referenced, so kept).
+    """
+    root = os.path.abspath(root)
+    extensions = tuple(ext.lower() for ext in extensions)
+    manifest = _load_manifest(db, root)
+    summary = {"scanned": 0, "skipped": 0, "inserted": 0, "updated": 0, "removed": 0, "missing": 0}
+    upserts, removed_paths, listed = [], [], []
+    visited = set()
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        frontier = [root]
+        while frontier:
+            changed, next_frontier = [], []
+            for path in frontier:
+                row = manifest.get(path)
+                if row is not None and not full:
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        st = None
+                    if st is not None and (st.st_mtime_ns, st.st_ino) == (row.mtime_ns, row.inode):
+                        summary["skipped"] += 1
+                        visited.add(path)
+                        next_frontier.extend(
+                            os.path.join(path, name) for name in json.loads(row.entries)["dirs"]
+                        )
+                        continue
+                changed.append((path, extensions))
+
+            if executor is not None:
+                results = executor.map(_list_directory, changed, chunksize=max(1, len(changed) // (workers * 4)))
+            else:
+                results = map(_list_directory, changed)
+
+            for path, stat, subdirs, files, parsed in results:
+                if stat is None:
+                    continue
+                row = manifest.get(path)
+                old = json.loads(row.entries) if row is not None else {"dirs": [], "files": {}}
+                summary["scanned"] += 1
+                visited.add(path)
+                for name, file_stat in files.items():
+                    if old["files"].get(name) != file_stat:
+                        upserts.append({**(parsed[name] or {}), "path": os.path.join(path, name)})
+                removed_paths.extend(
+                    os.path.join(path, name) for name in old["files"] if name not in files
+                )
+                listed.append((path, stat, {"dirs": subdirs, "files": files}))
+                next_frontier.extend(os.path.join(path, name) for name in subdirs)
+            frontier = next_frontier
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Manifest directories the walk never reached have been removed.
+    stale = [row for path, row in manifest.items() if path not in visited]
+    for row in stale:
+        removed_paths.extend(
+            os.path.join(row.path, name) for name in json.loads(row.entries)["files"]
+        )
+
+    referenced = or_(
+        exists().where(models.Question.resource_id == models.Resource.id),
+        exists().where(models.learning_pack_resources.c.resource_id == models.Resource.id),
+    )
+    counts = crud.upsert_resources(db, upserts, commit=False)
+    summary["inserted"] = counts["inserted"]
+    summary["updated"] = counts["updated"]
+    for start in range(0, len(removed_paths), crud.RESOURCE_UPSERT_CHUNK_SIZE):
+        chunk = removed_paths[start:start + crud.RESOURCE_UPSERT_CHUNK_SIZE]
+        in_chunk = models.Resource.path.in_(chunk)
+        summary["removed"] += (
+            db.query(models.Resource)
+            .filter(in_chunk, ~referenced)
+            .delete(synchronize_session=False)
+        )
+        summary["missing"] += db.query(models.Resource).filter(in_chunk).count()
+        cache.invalidate_on_commit(db, "resource_by_path", *chunk)
+
+    for row in stale:
+        db.delete(row)
+    for path, stat, entries in listed:
+        row = manifest.get(path)
+        if row is None:
+            row = models.ScanDirectory(path=path)
+            db.add(row)
+        row.mtime_ns, row.inode = stat
+        row.entries = json.dumps(entries, separators=(",", ":"))
+    db.commit()
+    return summary
@@ -0,0 +1,107 @@
+"""
+Spaced-repetition scheduling of questions per student.
+
+`review_states` holds one row per student and question with SM-2 state: the
+ease factor, the current interval, the number of successful reviews in a row
+and when the question is next due. The `attempted_questions_review_ai`
+trigger (see `models.py`) applies every scored answer as it is inserted,
+grading it 0-5 by its share of the question's marks, so planning never
+rereads the attempt history. `get_due_questions` is a single range scan of
+the `(student_id, subject, due_at)` index.
+
+`rebuild_review_states` replays the history from scratch, e.g. after
+importing attempts with the trigger missing, including archived attempts
+when the archive is attached (see `archive.py`). Run
+`python -m src.core_database.scheduler rebuild` to rebuild from the command
+line.
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from . import models
+from .archive import union_sql
+
+DEFAULT_DUE_LIMIT = 20
+
+_REPLAY_SOURCE = """
+SELECT exam_attempts.student_id AS student_id,
+       questions.id AS question_id,
+       COALESCE(resources.subject, '') AS subject,
+       MIN(5, MAX(0, CAST(ROUND(5.0 * attempted_questions.score / questions.max_marks) AS INTEGER))) AS quality,
+       COALESCE(exam_attempts.submitted_at, CURRENT_TIMESTAMP) AS reviewed_at,
+       attempted_questions.id AS answer_id
+FROM {attempted_questions} AS attempted_questions
+JOIN {exam_attempts} AS exam_attempts ON exam_attempts.id = attempted_questions.exam_attempt_id
+JOIN questions ON questions.id = attempted_questions.question_id AND questions.max_marks > 0
+LEFT JOIN resources ON resources.id = questions.resource_id
+WHERE attempted_questions.score IS NOT NULL
+"""
+
+def get_due_questions(db: Session, student_id: int, subject: str, limit: int = DEFAULT_DUE_LIMIT, due_by: datetime = None):
+    """
+    Get the questions a student should review next in a subject, soonest due first.
+
+    Args:
+        db: The database session.
+        student_id: The ID of the student.
+        subject: The subject of the questions.
+        limit: The maximum number of questions to return.
+        due_by: Only return questions due at or before this time, e.g. now;
+            the next `limit` questions whenever they are due if omitted.
+
+    Returns:
+        A list of ReviewState objects ordered by `due_at`.
+    """
+    query = db.query(models.ReviewState).filter(
+        models.ReviewState.student_id == student_id,
+        models.ReviewState.subject == subject,
+    )
+    if due_by is not None:
+        query = query.filter(models.ReviewState.due_at <= due_by)
+    return query.order_by(models.ReviewState.due_at).limit(limit).all()
+
+def rebuild_review_states(db: Session, student_id: int = None):
+    """
+    Recompute the review states by replaying `attempted_questions` in submission order.
+
+    Args:
+        db: The database session.
+        student_id: Only rebuild this student's rows; all students if omitted.
+
+    Returns:
+        The number of review state rows after the rebuild.
+    """
+    source = _REPLAY_SOURCE.format(
+        attempted_questions=union_sql(db, "attempted_questions"),
+        exam_attempts=union_sql(db, "exam_attempts"),
+    )
+    params = {}
+    delete = db.query(models.ReviewState)
+    if student_id is not None:
+        source += "AND exam_attempts.student_id = :student_id\n"
+        params["student_id"] = student_id
+        delete = delete.filter(models.ReviewState.student_id == student_id)
+
+    delete.delete(synchronize_session=False)
+    db.execute(text(models.REVIEW_STATE_UPSERT.format(source=source, order="reviewed_at, answer_id")), params)
+    count = delete.count()
+    db.commit()
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the spaced-repetition review states.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Replay attempted_questions into review_states.")
+    rebuild.add_argument("--student-id", type=int, help="Only rebuild this student.")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        rows = rebuild_review_states(db, student_id=args.student_id)
+    print(f"Rebuilt {rows} review states.")
+
+if __name__ == "__main__":
+    main()
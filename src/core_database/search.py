@@ -0,0 +1,89 @@
+"""
+Full-text search over syllabus points.
+
+`syllabus_points_fts` is an SQLite FTS5 index over the `code` and
+`description` of `syllabus_points`, kept in sync by triggers (see
+`models.py` and the Alembic revision that adds them). Results are ranked by
+BM25 and stemmed with the Porter tokenizer, so "integrating" also matches
+"integration".
+
+Run `python -m src.core_database.search rebuild` to rebuild the index, e.g.
+after loading a syllabus with the triggers missing.
+"""
+import argparse
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from . import models
+
+DEFAULT_SEARCH_LIMIT = 20
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+def _match_expression(query: str, match_all: bool):
+    """Turn free text into an FTS5 MATCH expression of quoted terms."""
+    terms = [f'"{term}"' for term in _TERM.findall(query)]
+    return (" AND " if match_all else " OR ").join(terms)
+
+def search_syllabus_points(db: Session, query: str, subject: str = None, limit: int = DEFAULT_SEARCH_LIMIT, match_all: bool = False):
+    """
+    Search syllabus points by code and description, best match first.
+
+    Args:
+        db: The database session.
+        query: Free text; punctuation is ignored and each word is a term.
+        subject: Only return syllabus points of this subject.
+        limit: The maximum number of results.
+        match_all: Require every term to match instead of any.
+
+    Returns:
+        A list of syllabus point objects ordered by BM25 rank.
+    """
+    expression = _match_expression(query, match_all)
+    if not expression:
+        return []
+    sql = (
+        "SELECT syllabus_points_fts.rowid FROM syllabus_points_fts"
+        " JOIN syllabus_points ON syllabus_points.id = syllabus_points_fts.rowid"
+        " WHERE syllabus_points_fts MATCH :expression"
+    )
+    params = {"expression": expression, "limit": limit}
+    if subject is not None:
+        sql += " AND syllabus_points.subject = :subject"
+        params["subject"] = subject
+    sql += " ORDER BY bm25(syllabus_points_fts) LIMIT :limit"
+    ids = [row[0] for row in db.execute(text(sql), params)]
+    if not ids:
+        return []
+    points = {
+        point.id: point
+        for point in db.query(models.SyllabusPoint).filter(models.SyllabusPoint.id.in_(ids))
+    }
+    return [points[point_id] for point_id in ids if point_id in points]
+
+def rebuild_syllabus_search_index(db: Session):
+    """
+    Rebuild the full-text index from the `syllabus_points` table.
+
+    Args:
+        db: The database session.
+    """
+    db.execute(text("INSERT INTO syllabus_points_fts (syllabus_points_fts) VALUES ('rebuild')"))
+    db.execute(text("INSERT INTO syllabus_points_fts (syllabus_points_fts) VALUES ('optimize')"))
+    db.commit()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the syllabus point full-text index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="Rebuild the index from syllabus_points.")
+    parser.parse_args(argv)
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        rebuild_syllabus_search_index(db)
+    print("Rebuilt the syllabus point search index.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Bulk loading of syllabus definitions from CSV or JSON.
+
+Each definition has a `subject`, `code` and `description`. CSV files need a
+header row naming those columns; JSON files hold an array of objects, and
+`.jsonl` files one object per line. A file may leave out `subject` if it is
+passed to the loader instead.
+
+Points are upserted on `code` with `crud.upsert_syllabus_points`, so a load
+can be re-run after a syllabus revision and reports which descriptions
+changed. `load_syllabus_files` loads several files (typically one per
+subject) in parallel worker processes, each with its own engine and
+connection; SQLite serialises their write transactions through the busy
+timeout.
+
+Run `python -m src.core_database.syllabus_loader FILE [FILE ...]` to load
+from the command line.
+"""
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, TextIO
+
+from sqlalchemy.orm import Session
+from . import crud
+from .database import DatabaseConfig, create_db_engine
+
+SYLLABUS_FORMATS = {".csv": "csv", ".json": "json", ".jsonl": "jsonl"}
+
+def read_syllabus(stream: TextIO, format: str, subject: str = None) -> Iterable[dict]:
+    """
+    Read syllabus point definitions from a text stream.
+
+    Args:
+        stream: The open text stream.
+        format: "csv", "json" (an array of objects) or "jsonl" (one object per line).
+        subject: The subject for definitions that do not name one.
+
+    Returns:
+        An iterator of dictionaries with "subject", "code" and "description".
+
+    Raises:
+        ValueError: If the format is unknown or a definition has no code.
+    """
+    if format == "csv":
+        records = csv.DictReader(stream)
+    elif format == "json":
+        records = json.load(stream)
+    elif format == "jsonl":
+        records = (json.loads(line) for line in stream if line.strip())
+    else:
+        raise ValueError(f"Unknown syllabus format {format!r}; expected one of {tuple(SYLLABUS_FORMATS.values())}")
+    for number, record in enumerate(records, 1):
+        code = (record.get("code") or "").strip()
+        if not code:
+            raise ValueError(f"Syllabus definition {number} has no code")
+        yield {
+            "subject": record.get("subject") or subject,
+            "code": code,
+            "description": record.get("description"),
+        }
+
+def load_syllabus(db: Session, stream: TextIO, format: str, subject: str = None, chunk_size: int = crud.SYLLABUS_UPSERT_CHUNK_SIZE):
+    """
+    Upsert the syllabus points read from a stream.
+
+    Args:
+        db: The database session.
+        stream: The open text stream.
+        format: "csv", "json" or "jsonl", see `read_syllabus`.
+        subject: The subject for definitions that do not name one.
+        chunk_size: The number of rows written per transaction.
+
+    Returns:
+        The report of `crud.upsert_syllabus_points`.
+    """
+    return crud.upsert_syllabus_points(db, read_syllabus(stream, format, subject), chunk_size=chunk_size)
+
+def _load_file(args):
+    """
+    Load one syllabus file with a fresh engine.
+
+    Runs in a worker process when the load uses a process pool.
+
+    Args:
+        args: A `(path, subject, config, chunk_size)` tuple.
+
+    Returns:
+        A `(path, report)` tuple.
+    """
+    path, subject, config, chunk_size = args
+    format = SYLLABUS_FORMATS.get(os.path.splitext(path)[1].lower())
+    if format is None:
+        raise ValueError(f"Cannot tell the syllabus format of {path!r} from its extension")
+    engine = create_db_engine(config)
+    try:
+        with Session(engine) as db, open(path, newline="", encoding="utf-8") as stream:
+            return path, load_syllabus(db, stream, format, subject, chunk_size)
+    finally:
+        engine.dispose()
+
+def load_syllabus_files(
+    paths: Iterable[str],
+    workers: int = 1,
+    config: DatabaseConfig = None,
+    subject: str = None,
+    chunk_size: int = crud.SYLLABUS_UPSERT_CHUNK_SIZE,
+) -> dict:
+    """
+    Load syllabus files, one worker process per file at a time.
+
+    The format of each file comes from its extension (.csv, .json or .jsonl).
+
+    Args:
+        paths: The files to load.
+        workers: The number of worker processes. 1 loads in the calling process.
+        config: The database config; read from the environment if omitted.
+            Workers need a file database, not an in-memory one.
+        subject: The subject for definitions that do not name one.
+        chunk_size: The number of rows written per transaction.
+
+    Returns:
+        A mapping of each path to its `crud.upsert_syllabus_points` report.
+    """
+    config = DatabaseConfig.from_env() if config is None else config
+    tasks = [(path, subject, config, chunk_size) for path in paths]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return dict(executor.map(_load_file, tasks))
+    return dict(map(_load_file, tasks))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load syllabus points from CSV or JSON files.")
+    parser.add_argument("paths", nargs="+", help="The .csv, .json or .jsonl files to load.")
+    parser.add_argument("--workers", type=int, default=1, help="The number of worker processes.")
+    parser.add_argument("--subject", help="The subject for definitions that do not name one.")
+    args = parser.parse_args(argv)
+
+    reports = load_syllabus_files(args.paths, workers=args.workers, subject=args.subject)
+    for path, report in reports.items():
+        print(f"{path}: {report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged")
+        for code, old, new in report["changed"]:
+            print(f"  {code}: {old!r} -> {new!r}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Per-student weakness aggregates.
+
+`student_weaknesses` holds one row per student, subject and diagnosed
+weakness with the attempt count, score total and last time it was seen. The
+`attempted_questions_weakness_ai` trigger (see `models.py`) updates it on
+every insert into `attempted_questions`, so reads never touch the attempts
+tables. `rebuild_weakness_aggregates` recomputes it from scratch, e.g. after
+importing data with the trigger missing, including archived attempts when
+the archive is attached (see `archive.py`).
+
+Run `python -m src.core_database.weaknesses rebuild` to rebuild from the
+command line.
+"""
+import argparse
+
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from . import models
+from .archive import archive_attached, with_archive
+
+def get_student_weaknesses(db: Session, student_id: int, subject: str = None, limit: int = None):
+    """
+    Get a student's weaknesses, weakest (lowest mean score) first.
+
+    Args:
+        db: The database session.
+        student_id: The ID of the student.
+        subject: Only return weaknesses in this subject.
+        limit: The maximum number of weaknesses to return.
+
+    Returns:
+        A list of StudentWeakness objects.
+    """
+    query = db.query(models.StudentWeakness).filter(models.StudentWeakness.student_id == student_id)
+    if subject is not None:
+        query = query.filter(models.StudentWeakness.subject == subject)
+    mean_score = models.StudentWeakness.score_sum / func.nullif(models.StudentWeakness.scored_count, 0)
+    query = query.order_by(mean_score.asc().nulls_last(), models.StudentWeakness.attempt_count.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def rebuild_weakness_aggregates(db: Session, student_id: int = None):
+    """
+    Recompute the weakness aggregates from `attempted_questions`.
+
+    Args:
+        db: The database session.
+        student_id: Only rebuild this student's rows; all students if omitted.
+
+    Returns:
+        The number of aggregate rows written.
+    """
+    attempt, answer = models.ExamAttempt, models.AttemptedQuestion
+    if archive_attached(db):
+        attempt, answer = with_archive(attempt), with_archive(answer)
+    subject = func.coalesce(models.MockExam.subject, models.Resource.subject, literal(""))
+    select_rows = (
+        db.query(
+            attempt.student_id,
+            subject,
+            answer.diagnosed_weakness,
+            func.count(),
+            func.count(answer.score),
+            func.coalesce(func.sum(answer.score), 0),
+            func.max(func.coalesce(attempt.submitted_at, func.current_timestamp())),
+        )
+        .select_from(answer)
+        .join(attempt, attempt.id == answer.exam_attempt_id)
+        .outerjoin(models.MockExam, models.MockExam.id == attempt.mock_exam_id)
+        .outerjoin(models.Question, models.Question.id == answer.question_id)
+        .outerjoin(models.Resource, models.Resource.id == models.Question.resource_id)
+        .filter(answer.diagnosed_weakness.isnot(None))
+        .group_by(attempt.student_id, subject, answer.diagnosed_weakness)
+    )
+    delete = db.query(models.StudentWeakness)
+    if student_id is not None:
+        select_rows = select_rows.filter(attempt.student_id == student_id)
+        delete = delete.filter(models.StudentWeakness.student_id == student_id)
+
+    delete.delete(synchronize_session=False)
+    table = models.StudentWeakness.__table__
+    result = db.execute(
+        sqlite_insert(table).from_select(
+            ["student_id", "subject", "weakness", "attempt_count", "scored_count", "score_sum", "last_seen"],
+            select_rows.statement,
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the student weakness aggregates.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Recompute the aggregates from attempted_questions.")
+    rebuild.add_argument("--student-id", type=int, help="Only rebuild this student.")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        rows = rebuild_weakness_aggregates(db, student_id=args.student_id)
+    print(f"Rebuilt {rows} weakness aggregate rows.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Write-behind buffering for frequent, loss-tolerant row updates.
+
+Touching a row, e.g. bumping `Resource.last_seen` for every file a scan or a
+learning-pack build sees, would otherwise be one UPDATE and one commit per
+touch, each waiting for SQLite's single write lock. `WriteBehindBuffer`
+collects the updates in memory instead, keyed by table and primary key so
+repeated touches of one row collapse into its latest values, and writes
+them as one `executemany` UPDATE per column set in a single transaction.
+
+A background thread flushes the buffer every `flush_interval` seconds, or
+as soon as it holds `max_size` rows. Call `close()` (or leave the `with`
+block) at shutdown to stop the thread and flush what is left; updates still
+buffered when the process dies are lost, so only buffer values that the
+next touch would rewrite anyway. Updates are applied to existing rows only.
+The UPDATEs bypass the ORM flush, so after each commit the flush evicts the
+rows it wrote from the lookup caches in `cache.py` itself.
+
+    with WriteBehindBuffer() as buffer:
+        for resource_id in seen:
+            buffer.touch_resource(resource_id)
+
+`depth` is the number of rows waiting to be written; `stats()` adds the
+flush counters and `prometheus_text()` renders them for scraping.
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import Table, and_, bindparam, select, update
+from . import cache, crud, models
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_MAX_SIZE = 1000
+WRITE_BEHIND_FLUSH_INTERVAL = 1.0 # seconds
+
+class WriteBehindBuffer:
+    """Deduplicated, batched row updates flushed from a background thread."""
+
+    def __init__(self, session_factory=None, max_size: int = WRITE_BEHIND_MAX_SIZE, flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL):
+        """
+        Args:
+            session_factory: Called with no arguments for the session each
+                flush writes through; `database.SessionLocal` if omitted.
+            max_size: Flush as soon as this many rows are buffered.
+            flush_interval: Flush at least this often, in seconds.
+        """
+        if session_factory is None:
+            from .database import SessionLocal as session_factory
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.touches = 0
+        self.errors = 0
+        self._pending = {} # (table, primary key) -> column values
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def depth(self) -> int:
+        """The number of rows waiting to be written."""
+        with self._lock:
+            return len(self._pending)
+
+    def update(self, table, primary_key, **values):
+        """
+        Buffer an update of one row, merged into any update already buffered for it.
+
+        Args:
+            table: The model class or `Table` of the row.
+            primary_key: The row's primary key value, or a tuple of values in
+                the order of the table's primary key columns.
+            **values: The columns to set.
+
+        Raises:
+            RuntimeError: If the buffer has been closed.
+        """
+        table = table if isinstance(table, Table) else table.__table__
+        if not isinstance(primary_key, tuple):
+            primary_key = (primary_key,)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WriteBehindBuffer is closed")
+            self._pending.setdefault((table, primary_key), {}).update(values)
+            self.touches += 1
+            full = len(self._pending) >= self.max_size
+        if full:
+            self._wake.set()
+
+    def touch_resource(self, resource_id: int, at: datetime = None):
+        """
+        Buffer setting a resource's `last_seen`.
+
+        Args:
+            resource_id: The ID of the resource.
+            at: The time it was seen; now if omitted.
+        """
+        at = at or datetime.now(timezone.utc)
+        if at.tzinfo is not None: # SQLite stores naive UTC timestamps
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        self.update(models.Resource, resource_id, last_seen=at)
+
+    def flush(self) -> int:
+        """
+        Write every buffered update in one transaction.
+
+        If the transaction fails the updates are put back, under any newer
+        values buffered for the same rows meanwhile, and the error is raised.
+
+        Returns:
+            The number of rows updated.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            groups = {}
+            for (table, primary_key), values in pending.items():
+                groups.setdefault((table, tuple(sorted(values))), []).append((primary_key, values))
+            try:
+                with self.session_factory() as db:
+                    cached_keys = self._cached_keys(db, pending)
+                    for (table, columns), rows in groups.items():
+                        keys = list(table.primary_key.columns)
+                        stmt = (
+                            update(table)
+                            .where(and_(*(key == bindparam(f"_pk_{key.name}") for key in keys)))
+                            .values({name: bindparam(name) for name in columns})
+                        )
+                        db.execute(stmt, [
+                            {**values, **{f"_pk_{key.name}": value for key, value in zip(keys, primary_key)}}
+                            for primary_key, values in rows
+                        ])
+                    db.commit()
+                for name, keys in cached_keys.items():
+                    cache.invalidate(name, *keys)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                    for key, values in pending.items():
+                        self._pending[key] = {**values, **self._pending.get(key, {})}
+                raise
+            with self._lock:
+                self.flushes += 1
+                self.rows_flushed += len(pending)
+            return len(pending)
+
+    def _cached_keys(self, db, pending: dict) -> dict:
+        """
+        Return the lookup cache keys of the buffered rows, before and after the update.
+
+        Returns:
+            A mapping of lookup name to a set of keys, for enabled lookups only.
+        """
+        keys = {}
+        for name, (model, attr) in cache.LOOKUPS.items():
+            table = model.__table__
+            rows = [(primary_key, values) for (row_table, primary_key), values in pending.items() if row_table is table]
+            if not rows or not cache.is_enabled(name):
+                continue
+            (key,) = table.primary_key.columns
+            ids = [primary_key[0] for primary_key, _ in rows]
+            found = keys[name] = {values[attr] for _, values in rows if attr in values}
+            for start in range(0, len(ids), crud.IN_CLAUSE_CHUNK_SIZE):
+                chunk = ids[start:start + crud.IN_CLAUSE_CHUNK_SIZE]
+                found.update(db.execute(select(table.c[attr]).where(key.in_(chunk))).scalars())
+        return keys
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed; %d rows kept for the next attempt", self.depth)
+
+    def close(self):
+        """Stop the background thread and flush the remaining updates."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        """Return the current "depth" and the "touches", "flushes", "rows_flushed" and "errors" counters."""
+        with self._lock:
+            return {
+                "depth": len(self._pending),
+                "touches": self.touches,
+                "flushes": self.flushes,
+                "rows_flushed": self.rows_flushed,
+                "errors": self.errors,
+            }
+
+    def prometheus_text(self) -> str:
+        """Return `stats()` in the Prometheus text exposition format."""
+        stats = self.stats()
+        lines = [
+            "# HELP core_database_write_behind_depth Rows waiting in the write-behind buffer.",
+            "# TYPE core_database_write_behind_depth gauge",
+            f"core_database_write_behind_depth {stats['depth']}",
+        ]
+        for name, help_text in (
+            ("touches", "Updates buffered, before deduplication."),
+            ("flushes", "Successful write-behind flushes."),
+            ("rows_flushed", "Rows written by write-behind flushes."),
+            ("errors", "Failed write-behind flushes."),
+        ):
+            lines.append(f"# HELP core_database_write_behind_{name}_total {help_text}")
+            lines.append(f"# TYPE core_database_write_behind_{name}_total counter")
+            lines.append(f"core_database_write_behind_{name}_total {stats[name]}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+from src.core_database.database import Base, DatabaseConfig, create_db_engine
+from src.core_database import models  # registers the tables on Base.metadata
+
+# Use an in-memory SQLite database for testing
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+engine = create_db_engine(DatabaseConfig(url=SQLALCHEMY_DATABASE_URL))
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Create the database tables
+Base.metadata.create_all(bind=engine)
+
+@pytest.fixture(scope="function")
+def db_session():
+    """
+    Create a new database session for each test function.
+    Rollback changes after each test.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = TestingSessionLocal(bind=connection)
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+from src.core_database import crud, models
+from src.core_database.archive import archive_attempts, list_exam_attempts
+from src.core_database.database import Base, DatabaseConfig, create_db_engine
+from src.core_database.exam_generator import generate_mock_exam
+from src.core_database.scheduler import rebuild_review_states
+from src.core_database.weaknesses import get_student_weaknesses, rebuild_weakness_aggregates
+
+def test_archive_moves_old_attempts_and_keeps_aggregates(tmp_path):
+    """
+    Test that archiving moves old attempts in chunks, that reads can include the archive and that rebuilds still see it.
+    """
+    config = DatabaseConfig(url=f"sqlite:///{tmp_path / 'live.db'}", archive_path=str(tmp_path / "archive.db"))
+    engine = create_db_engine(config)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    day = datetime(2024, 1, 1, 9, 0, 0)
+    with Session() as db:
+        old = crud.create_student(db, username="graduated")
+        current = crud.create_student(db, username="current")
+        crud.upsert_resources(db, [{"subject": "9709", "path": "/maths.pdf"}])
+        question = models.Question(resource_id=crud.get_resource_by_path(db, "/maths.pdf").id, max_marks=4)
+        db.add(question)
+        db.commit()
+        for offset in range(5):
+            crud.submit_exam_attempt(db, {
+                "student_id": old.id,
+                "submitted_at": day + timedelta(days=offset),
+                "answers": [{"question_id": question.id, "score": offset % 5, "diagnosed_weakness": "vectors"}],
+            })
+        crud.submit_exam_attempt(db, {
+            "student_id": current.id,
+            "submitted_at": day + timedelta(days=400),
+            "answers": [{"question_id": question.id, "score": 4}],
+        })
+        weaknesses = [(w.attempt_count, w.score_sum) for w in get_student_weaknesses(db, old.id)]
+        states = sorted((s.student_id, s.question_id, s.repetitions, s.due_at) for s in db.query(models.ReviewState))
+
+        with pytest.raises(ValueError):
+            archive_attempts(db)
+        assert archive_attempts(db, before=day + timedelta(days=3), chunk_size=2) == {"attempts": 3, "answers": 3}
+        assert archive_attempts(db, inactive_since=day + timedelta(days=100), chunk_size=2) == {"attempts": 2, "answers": 2}
+
+        assert list_exam_attempts(db, old.id) == []
+        archived = list_exam_attempts(db, old.id, include_archive=True)
+        assert [a.submitted_at.replace(tzinfo=None) for a in archived] == [day + timedelta(days=n) for n in (4, 3, 2, 1, 0)]
+        assert len(list_exam_attempts(db, current.id, include_archive=True)) == 1
+        assert db.query(models.AttemptedQuestion).count() == 1
+
+        # The trigger-maintained aggregates are untouched and the rebuilds read the archive.
+        assert [(w.attempt_count, w.score_sum) for w in get_student_weaknesses(db, old.id)] == weaknesses
+        rebuild_weakness_aggregates(db)
+        rebuild_review_states(db)
+        db.expire_all()
+        assert [(w.attempt_count, w.score_sum) for w in get_student_weaknesses(db, old.id)] == weaknesses
+        assert sorted((s.student_id, s.question_id, s.repetitions, s.due_at) for s in db.query(models.ReviewState)) == states
+    engine.dispose()
+
+def test_generated_exams_skip_archived_attempts(tmp_path):
+    """
+    Test that a question answered in an archived attempt is still excluded from the student's new exams.
+    """
+    config = DatabaseConfig(url=f"sqlite:///{tmp_path / 'live.db'}", archive_path=str(tmp_path / "archive.db"))
+    engine = create_db_engine(config)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    day = datetime(2024, 1, 1, 9, 0, 0)
+    with Session() as db:
+        student = crud.create_student(db, username="returning")
+        other = crud.create_student(db, username="other")
+        crud.upsert_resources(db, [{"subject": "9709", "year": 2023, "path": "/maths.pdf"}])
+        resource_id = crud.get_resource_by_path(db, "/maths.pdf").id
+        answered, fresh = models.Question(resource_id=resource_id, max_marks=4), models.Question(resource_id=resource_id, max_marks=4)
+        db.add_all([answered, fresh])
+        db.commit()
+        crud.submit_exam_attempt(db, {"student_id": student.id, "submitted_at": day, "answers": [{"question_id": answered.id, "score": 4}]})
+        crud.submit_exam_attempt(db, {"student_id": other.id, "submitted_at": day + timedelta(days=400), "answers": [{"question_id": fresh.id}]})
+        assert archive_attempts(db, before=day + timedelta(days=1)) == {"attempts": 1, "answers": 1}
+
+        exam = generate_mock_exam(db, student.id, "9709", max_marks=8)
+        assert [question.id for question in exam.questions] == [fresh.id]
+    engine.dispose()
+
+def test_read_only_engine_attaches_archive_with_special_characters(tmp_path):
+    """
+    Test that an archive path containing URI metacharacters is attached as that exact file.
+    """
+    from src.core_database.database import create_read_only_engine
+
+    directory = tmp_path / "exams ?#%20"
+    directory.mkdir()
+    config = DatabaseConfig(url=f"sqlite:///{tmp_path / 'live.db'}", archive_path=str(directory / "archive.db"))
+    engine = create_db_engine(config)
+    with engine.connect(): # creates the archive file and tables
+        pass
+    engine.dispose()
+
+    read_only = create_read_only_engine(config)
+    with read_only.connect() as connection:
+        databases = {name: path for _, name, path in connection.exec_driver_sql("PRAGMA database_list")}
+        assert connection.exec_driver_sql("SELECT count(*) FROM archive.exam_attempts").scalar() == 0
+    read_only.dispose()
+    assert databases["archive"] == str(directory / "archive.db")
@@ -0,0 +1,60 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.core_database.database import Base, DatabaseConfig, create_async_db_engine
+from src.core_database import async_crud, models
+
+def test_async_crud_round_trip(tmp_path):
+    """
+    Test the async CRUD functions against a file-backed aiosqlite database.
+    """
+    async def run():
+        engine = create_async_db_engine(DatabaseConfig(url=f"sqlite:///{tmp_path / 'async.db'}"))
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with AsyncSessionLocal() as db:
+            student = await async_crud.create_student(db, username="asyncuser")
+            counts = await async_crud.upsert_resources(
+                db, [{"subject": "9709", "path": "/a.pdf"}, {"subject": "9709", "path": "/b.pdf"}]
+            )
+            sp = await async_crud.create_syllabus_point(
+                db, {"subject": "9706", "code": "9706/1.1", "description": "The accounting cycle"}
+            )
+            pack = await async_crud.create_learning_pack_with_syllabus(db, student.id, [sp.id])
+
+        async def lookup(username):
+            async with AsyncSessionLocal() as db:
+                return await async_crud.get_student_by_username(db, username)
+
+        found = await asyncio.gather(*(lookup("asyncuser") for _ in range(20)))
+        await engine.dispose()
+        return counts, pack, found
+
+    counts, pack, found = asyncio.run(run())
+    assert counts == {"inserted": 2, "updated": 0}
+    assert [sp.code for sp in pack.syllabus_points] == ["9706/1.1"]
+    assert all(student.username == "asyncuser" for student in found)
+
+def test_async_engine_applies_connect_hooks(tmp_path):
+    """
+    Test that the async engine attaches the archive and honours begin_immediate like the sync one.
+    """
+    from sqlalchemy import text
+
+    async def run():
+        engine = create_async_db_engine(DatabaseConfig(
+            url=f"sqlite:///{tmp_path / 'async.db'}", archive_path=str(tmp_path / "archive.db"), begin_immediate=True,
+        ))
+        async with engine.connect() as connection:
+            databases = (await connection.execute(text("PRAGMA database_list"))).all()
+            journal_mode = (await connection.execute(text("PRAGMA journal_mode"))).scalar()
+            archived = (await connection.execute(text("SELECT count(*) FROM archive.exam_attempts"))).scalar()
+        await engine.dispose()
+        return [name for _, name, _ in databases], journal_mode, archived
+
+    databases, journal_mode, archived = asyncio.run(run())
+    assert databases == ["main", "archive"]
+    assert journal_mode == "wal"
+    assert archived == 0
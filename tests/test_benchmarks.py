@@ -0,0 +1,35 @@
+from benchmarks.bench_core_database import compare_reports, run_benchmarks
+
+def test_benchmark_suite_runs_at_small_scale():
+    """
+    Test that every benchmark runs against a tiny dataset and the report compares with itself.
+    """
+    report = run_benchmarks(scale=200, repeat=1, backends=("memory",))
+    benchmarks = report["results"]["memory"]["benchmarks"]
+    assert "get_resource_by_path" in benchmarks
+    assert all(stats["runs"] == 1 for stats in benchmarks.values())
+    assert all(ratio == 1 and not regressed for *_, ratio, regressed in compare_reports(report, report))
+
+def test_compare_reports_applies_threshold():
+    """
+    Test that only benchmarks slower than the threshold ratio are flagged as regressions.
+    """
+    def report(**medians):
+        return {"results": {"file": {"benchmarks": {name: {"median_ms": ms} for name, ms in medians.items()}}}}
+
+    baseline = report(fast=10.0, slow=10.0, removed=1.0)
+    current = report(fast=11.0, slow=13.0, added=5.0)
+    rows = {name: (ratio, regressed) for _, name, _, _, ratio, regressed in compare_reports(baseline, current, threshold=1.2)}
+    assert rows == {"fast": (1.1, False), "slow": (1.3, True)}
+    assert not any(regressed for *_, regressed in compare_reports(baseline, current, threshold=1.5))
+
+def test_startup_benchmark_measures_a_cold_lookup():
+    """
+    Test that a fresh process can look up a resource through the lazily created default engine and that import times are parsed.
+    """
+    from benchmarks.bench_startup import run_startup_benchmark
+
+    report = run_startup_benchmark(repeat=1)
+    assert set(report["median"]) == {"import_ms", "first_call_ms", "process_ms"}
+    assert "src.core_database.crud" in report["imports"]
+    assert "numpy" not in report["imports"]
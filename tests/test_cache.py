@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy.orm import Session
+from src.core_database import cache, crud, models
+
+@pytest.fixture
+def lookup_cache():
+    cache.enable_cache(maxsize=2, ttl=60)
+    yield
+    cache.disable_cache()
+
+def test_lru_cache_evicts_and_expires():
+    """
+    Test the LRU bound, TTL expiry and counters of LRUCache.
+    """
+    lru = cache.LRUCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.stats() == {"hits": 1, "misses": 1, "evictions": 1, "size": 2}
+
+    lru.ttl = -1
+    lru.set("d", 4)
+    assert lru.get("d") is None
+
+def test_cached_lookup_skips_query_and_sees_writes(db_session, lookup_cache):
+    """
+    Test that a cached student lookup avoids SQL and is invalidated by a write.
+    """
+    from sqlalchemy import event
+
+    student = crud.create_student(db_session, username="cached")
+    assert crud.get_student_by_username(db_session, "cached").id == student.id
+    db_session.expunge_all()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        hit = crud.get_student_by_username(db_session, "cached")
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert hit.username == "cached"
+    assert statements == []
+    assert cache.cache_stats()["student_by_username"]["hits"] == 1
+
+    hit.username = "renamed"
+    db_session.commit()
+    assert crud.get_student_by_username(db_session, "cached") is None
+    assert crud.get_student_by_username(db_session, "renamed").id == student.id
+
+def test_cached_lookup_keeps_pending_edits(db_session, lookup_cache):
+    """
+    Test that a cache hit neither replaces nor is replaced by a session's unflushed edit.
+    """
+    resource = crud.create_resource(db_session, {"subject": "9709", "path": "/cached.pdf"})
+    db_session.expunge_all()
+    crud.get_resource_by_path(db_session, "/cached.pdf") # caches the row
+    resource = crud.get_resource_by_path(db_session, "/cached.pdf")
+
+    resource.subject = "9231"
+    assert crud.get_resource_by_path(db_session, "/cached.pdf") is resource
+    db_session.commit()
+    db_session.expunge_all()
+    assert crud.get_resource_by_path(db_session, "/cached.pdf").subject == "9231"
+
+def test_flushed_keys_are_invalidated_again_on_commit(db_session, lookup_cache):
+    """
+    Test that a row cached between a flush and its commit is dropped by the commit.
+    """
+    student = crud.create_student(db_session, username="before")
+    crud.get_student_by_username(db_session, "before")
+    student.username = "after"
+    db_session.flush()
+    assert crud.get_student_by_username(db_session, "before") is None # bypasses the cache
+    with Session() as reader: # another session re-caching the committed row
+        cache.store(reader, "student_by_username", "before", models.Student(id=student.id, username="before"))
+    assert cache.cache_stats()["student_by_username"]["size"] == 1
+
+    db_session.commit()
+    assert cache.cache_stats()["student_by_username"]["size"] == 0
+    assert crud.get_student_by_username(db_session, "after").id == student.id
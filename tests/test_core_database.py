@@ -1,33 +1,6 @@
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from src.core_database.database import Base
 from src.core_database import crud, models
 
-# Use an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Create the database tables
-Base.metadata.create_all(bind=engine)
-
-@pytest.fixture(scope="function")
-def db_session():
-    """
-    Create a new database session for each test function.
-    Rollback changes after each test.
-    """
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
-    yield session
-    session.close()
-    transaction.rollback()
-    connection.close()
-
 def test_create_and_get_resource(db_session):
     """
     Test creating a new resource and retrieving it from the database.
@@ -98,3 +71,182 @@ def test_create_learning_pack(db_session):
     assert len(learning_pack.syllabus_points) == 2
     assert sp1 in learning_pack.syllabus_points
     assert sp2 in learning_pack.syllabus_points
+
+def test_upsert_resources_inserts_and_updates(db_session):
+    """
+    Test that bulk upserting resources inserts new paths and updates existing ones.
+    """
+    crud.create_resource(db=db_session, resource={"subject": "9709", "year": 2022, "path": "/a/9709_s22_qp_12.pdf"})
+
+    resources = (
+        {"subject": "9709", "year": 2022, "paper": 1, "variant": 2, "type": "qp", "path": f"/a/9709_s22_qp_1{i}.pdf"}
+        for i in range(1, 6)
+    )
+    counts = crud.upsert_resources(db=db_session, resources=resources, chunk_size=2)
+
+    assert counts == {"inserted": 4, "updated": 1}
+    assert db_session.query(models.Resource).count() == 5
+    updated = crud.get_resource_by_path(db=db_session, path="/a/9709_s22_qp_12.pdf")
+    db_session.refresh(updated)
+    assert updated.paper == 1
+    assert updated.type == "qp"
+
+def test_parse_resource_filename():
+    """
+    Test parsing Cambridge resource filenames.
+    """
+    from src.core_database.scanner import parse_resource_filename
+
+    assert parse_resource_filename("9709_s22_qp_12.pdf") == {
+        "subject": "9709", "year": 2022, "paper": 1, "variant": 2, "type": "Past Paper",
+    }
+    assert parse_resource_filename("9706_w19_er.pdf")["type"] == "Examiner Report"
+    assert parse_resource_filename("notes.pdf") is None
+
+def test_scan_resources_is_incremental(db_session, tmp_path):
+    """
+    Test that a rescan skips unchanged directories and applies added and removed files.
+    """
+    from src.core_database.scanner import scan_resources
+
+    (tmp_path / "9709" / "2022").mkdir(parents=True)
+    (tmp_path / "9706").mkdir()
+    (tmp_path / "9709" / "2022" / "9709_s22_qp_12.pdf").write_bytes(b"qp")
+    (tmp_path / "9709" / "2022" / "9709_s22_ms_12.pdf").write_bytes(b"ms")
+    (tmp_path / "9706" / "9706_w19_qp_21.pdf").write_bytes(b"qp")
+
+    summary = scan_resources(db_session, str(tmp_path))
+    assert summary["scanned"] == 4
+    assert summary["inserted"] == 3
+
+    summary = scan_resources(db_session, str(tmp_path))
+    assert summary == {"scanned": 0, "skipped": 4, "inserted": 0, "updated": 0, "removed": 0, "missing": 0}
+
+    (tmp_path / "9709" / "2022" / "9709_s22_ms_12.pdf").unlink()
+    (tmp_path / "9706" / "9706_w19_qp_22.pdf").write_bytes(b"qp")
+    summary = scan_resources(db_session, str(tmp_path))
+    assert summary["scanned"] == 2
+    assert summary["inserted"] == 1
+    assert summary["removed"] == 1
+
+    resource = crud.get_resource_by_path(db_session, str(tmp_path / "9706" / "9706_w19_qp_22.pdf"))
+    assert (resource.subject, resource.year, resource.paper, resource.variant) == ("9706", 2019, 2, 2)
+    assert crud.get_resource_by_path(db_session, str(tmp_path / "9709" / "2022" / "9709_s22_ms_12.pdf")) is None
+
+def test_scan_resources_keeps_referenced_resources(db_session, tmp_path):
+    """
+    Test that a scan keeps the row of a removed file that questions still reference.
+    """
+    from src.core_database.scanner import scan_resources
+
+    (tmp_path / "9709_s22_qp_12.pdf").write_bytes(b"qp")
+    (tmp_path / "9709_s22_ms_12.pdf").write_bytes(b"ms")
+    scan_resources(db_session, str(tmp_path))
+    paper = crud.get_resource_by_path(db_session, str(tmp_path / "9709_s22_qp_12.pdf"))
+    db_session.add(models.Question(resource_id=paper.id, question_number="1", max_marks=4))
+    db_session.commit()
+
+    (tmp_path / "9709_s22_qp_12.pdf").unlink()
+    (tmp_path / "9709_s22_ms_12.pdf").unlink()
+    summary = scan_resources(db_session, str(tmp_path))
+    assert (summary["removed"], summary["missing"]) == (1, 1)
+    assert crud.get_resource_by_path(db_session, str(tmp_path / "9709_s22_qp_12.pdf")).id == paper.id
+    assert crud.get_resource_by_path(db_session, str(tmp_path / "9709_s22_ms_12.pdf")) is None
+
+def test_create_db_engine_applies_pragmas(tmp_path):
+    """
+    Test that the engine factory reads its config from the environment and applies the pragmas.
+    """
+    from sqlalchemy import text
+    from src.core_database.database import DatabaseConfig, create_db_engine
+
+    config = DatabaseConfig.from_env(
+        environ={"ALEVEL_DB_URL": f"sqlite:///{tmp_path / 'test.db'}", "ALEVEL_DB_BUSY_TIMEOUT": "1234"}
+    )
+    engine = create_db_engine(config)
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+    engine.dispose()
+
+def test_submit_exam_attempts(db_session):
+    """
+    Test submitting attempts with their answers and totalling the score in the database.
+    """
+    student = crud.create_student(db_session, username="submitter")
+    attempt = crud.submit_exam_attempt(db_session, {
+        "student_id": student.id,
+        "answers": [
+            {"question_id": 1, "score": 3, "diagnosed_weakness": "algebra"},
+            {"question_id": 2, "score": 4.5},
+        ],
+    })
+    assert attempt.score == 7.5
+    assert db_session.query(models.AttemptedQuestion).filter_by(exam_attempt_id=attempt.id).count() == 2
+
+    attempt_ids = crud.submit_exam_attempts(db_session, [
+        {"student_id": student.id, "answers": [{"question_id": 1, "score": 1}]},
+        {"student_id": student.id, "answers": []},
+    ])
+    scores = [db_session.get(models.ExamAttempt, attempt_id).score for attempt_id in attempt_ids]
+    assert scores == [1, None]
+
+def test_list_learning_packs_for_student_pages_in_fixed_queries(db_session):
+    """
+    Test keyset pagination and eager loading of a student's learning packs.
+    """
+    from datetime import datetime
+    from sqlalchemy import event
+    from src.core_database import rows
+
+    student_id = crud.create_student(db_session, username="historian").id
+    points = [models.SyllabusPoint(subject="9709", code=f"9709/{i}", description=str(i)) for i in range(3)]
+    db_session.add_all(points)
+    db_session.add_all(
+        models.LearningPack(student_id=student_id, created_at=datetime(2026, 1, 1 + i // 2), syllabus_points=points)
+        for i in range(5)
+    )
+    db_session.commit()
+    db_session.expunge_all()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        first = crud.list_learning_packs_for_student(db_session, student_id, limit=3)
+        assert [len(pack.syllabus_points) for pack in first] == [3, 3, 3]
+        assert all(pack.resources == [] for pack in first)
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert len(statements) == 3
+
+    last = first[-1]
+    second = crud.list_learning_packs_for_student(
+        db_session, student_id, limit=3, after=(last.created_at, last.id), lightweight=True
+    )
+    assert all(isinstance(pack, rows.LearningPackRow) for pack in second)
+    assert len(second) == 2
+    assert {pack.id for pack in first}.isdisjoint(pack.id for pack in second)
+    assert [p.code for p in second[0].syllabus_points] == ["9709/0", "9709/1", "9709/2"]
+
+def test_get_mock_exam_with_questions(db_session):
+    """
+    Test loading a mock exam with its questions, as ORM objects and as lightweight rows.
+    """
+    from src.core_database import rows
+
+    questions = [models.Question(question_number=str(i), max_marks=i) for i in range(1, 4)]
+    db_session.add_all(questions)
+    db_session.commit()
+    exam = crud.create_mock_exam(db_session, 1, "9709", [q.id for q in questions])
+    db_session.expunge_all()
+
+    loaded = crud.get_mock_exam_with_questions(db_session, exam.id)
+    assert "questions" in loaded.__dict__
+    assert len(loaded.questions) == 3
+
+    row = crud.get_mock_exam_with_questions(db_session, exam.id, lightweight=True)
+    assert isinstance(row, rows.MockExamRow)
+    assert [q.max_marks for q in row.questions] == [1, 2, 3]
+    assert crud.get_mock_exam_with_questions(db_session, -1, lightweight=True) is None
@@ -0,0 +1,40 @@
+from src.core_database import crud, models
+from src.core_database.coverage import get_coverage, get_uncovered_syllabus_points, rebuild_coverage
+
+def test_coverage_follows_learning_packs_and_rebuild(db_session):
+    """
+    Test that creating and deleting learning packs maintains coverage and that a rebuild reproduces it.
+    """
+    student = crud.create_student(db_session, username="coverer")
+    other = crud.create_student(db_session, username="other")
+    crud.upsert_syllabus_points(db_session, [
+        {"subject": "9709", "code": f"9709/{n}", "description": f"point {n}"} for n in range(1, 5)
+    ] + [{"subject": "9702", "code": "9702/1", "description": "forces"}])
+    p1, p2, p3, p4, forces = (crud.get_syllabus_point_by_code(db_session, code) for code in (
+        "9709/1", "9709/2", "9709/3", "9709/4", "9702/1",
+    ))
+
+    crud.create_learning_pack_with_syllabus(db_session, student.id, [p1.id, p2.id])
+    second = crud.create_learning_pack_with_syllabus(db_session, student.id, [p2.id, forces.id])
+    crud.create_learning_pack_with_syllabus(db_session, other.id, [p3.id])
+
+    assert [p.code for p in get_uncovered_syllabus_points(db_session, student.id, "9709")] == ["9709/3", "9709/4"]
+    assert [p.code for p in get_uncovered_syllabus_points(db_session, student.id, "9709", limit=1)] == ["9709/3"]
+    coverage = get_coverage(db_session, student.id)
+    assert coverage == {
+        "9709": {"covered": 2, "total": 4, "percent": 50.0},
+        "9702": {"covered": 1, "total": 1, "percent": 100.0},
+    }
+    assert get_coverage(db_session, other.id, subject="9709") == {"9709": {"covered": 1, "total": 4, "percent": 25.0}}
+
+    # p2 stays covered by the first pack; forces is no longer covered.
+    db_session.delete(second)
+    db_session.commit()
+    assert get_coverage(db_session, student.id)["9702"]["covered"] == 0
+    assert [p.code for p in get_uncovered_syllabus_points(db_session, student.id, "9709")] == ["9709/3", "9709/4"]
+
+    summary = sorted((c.student_id, c.syllabus_point_id, c.pack_count) for c in db_session.query(models.SyllabusCoverage))
+    db_session.query(models.SyllabusCoverage).delete()
+    assert rebuild_coverage(db_session) == 3
+    db_session.expire_all()
+    assert sorted((c.student_id, c.syllabus_point_id, c.pack_count) for c in db_session.query(models.SyllabusCoverage)) == summary
@@ -0,0 +1,43 @@
+import os
+
+from src.core_database import crud, models
+from src.core_database.dedup import hash_file, hash_resources, merge_duplicate_resources
+
+def test_hash_resources_is_lazy_and_merge_repoints_references(db_session, tmp_path):
+    """
+    Test that only changed files are re-hashed and that merging duplicates re-points questions and learning packs.
+    """
+    paper = b"%PDF-1.4 9709 s22 qp 12" * 10000
+    paths = []
+    for mirror in ("a", "b", "c"):
+        (tmp_path / mirror).mkdir()
+        path = tmp_path / mirror / "9709_s22_qp_12.pdf"
+        path.write_bytes(paper if mirror != "c" else b"another paper")
+        paths.append(str(path))
+    crud.upsert_resources(db_session, [{"subject": "9709", "path": path} for path in paths])
+    original, mirrored, other = (crud.get_resource_by_path(db_session, path) for path in paths)
+
+    assert hash_resources(db_session, workers=2, batch_size=2, chunk_size=4096) == {"hashed": 3, "skipped": 0, "missing": 0}
+    assert original.content_hash == mirrored.content_hash == hash_file(paths[0]) != other.content_hash
+    assert hash_resources(db_session, workers=2) == {"hashed": 0, "skipped": 3, "missing": 0}
+    with open(paths[2], "ab") as f:
+        f.write(b" revised")
+    os.utime(paths[2], ns=(0, 1))
+    os.remove(paths[1])
+    assert hash_resources(db_session, workers=2) == {"hashed": 1, "skipped": 1, "missing": 1}
+
+    question = models.Question(resource_id=mirrored.id, question_number="1", max_marks=4)
+    both = models.LearningPack(resources=[original, mirrored])
+    one = models.LearningPack(resources=[mirrored])
+    db_session.add_all([question, both, one])
+    db_session.commit()
+    original_id, mirrored_id = original.id, mirrored.id
+
+    totals = merge_duplicate_resources(db_session)
+    assert totals == {"groups": 1, "questions": 1, "learning_packs": 1, "resources": 1}
+    db_session.expire_all()
+    assert db_session.get(models.Resource, mirrored_id) is None
+    assert question.resource_id == original_id
+    assert [r.id for r in both.resources] == [original_id]
+    assert [r.id for r in one.resources] == [original_id]
+    assert crud.get_resource_by_path(db_session, paths[1]) is None
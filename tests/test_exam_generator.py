@@ -0,0 +1,84 @@
+import random
+
+import pytest
+from src.core_database import models
+from src.core_database.exam_generator import generate_mock_exam
+from src.core_database.question_bank import QuestionBank
+
+def _add_paper(db_session, subject, year, marks):
+    resource = models.Resource(subject=subject, year=year, path=f"/{subject}_{year}_{len(marks)}.pdf")
+    db_session.add(resource)
+    db_session.flush()
+    questions = [
+        models.Question(resource_id=resource.id, question_number=str(i + 1), max_marks=m)
+        for i, m in enumerate(marks)
+    ]
+    db_session.add_all(questions)
+    db_session.flush()
+    return questions
+
+@pytest.mark.parametrize("use_bank", [False, True])
+def test_generate_mock_exam_hits_target_and_filters(db_session, use_bank):
+    """
+    Test that a generated exam sums to the target and respects subject, years and past attempts, with and without a question bank.
+    """
+    student = models.Student(username="examinee")
+    db_session.add(student)
+    recent = _add_paper(db_session, "9709", 2022, [3, 4, 5, 6, 7, 8])
+    old = _add_paper(db_session, "9709", 2015, [10, 10, 10])
+    _add_paper(db_session, "9706", 2022, [5, 5, 5])
+    db_session.flush()
+    attempt = models.ExamAttempt(student_id=student.id, score=5)
+    db_session.add(attempt)
+    db_session.flush()
+    db_session.add(models.AttemptedQuestion(exam_attempt_id=attempt.id, question_id=recent[4].id, score=5))
+    db_session.commit()
+
+    exam = generate_mock_exam(
+        db_session, student.id, "9709", max_marks=20, year_from=2020, rng=random.Random(1),
+        bank=QuestionBank.load(db_session) if use_bank else None,
+    )
+
+    assert sum(q.max_marks for q in exam.questions) == 20
+    assert all(q.id in {r.id for r in recent} for q in exam.questions)
+    assert recent[4] not in exam.questions
+    assert old[0] not in exam.questions
+
+def test_generate_mock_exam_without_questions(db_session):
+    """
+    Test that generation fails clearly when no question is eligible.
+    """
+    with pytest.raises(ValueError):
+        generate_mock_exam(db_session, 1, "0000", max_marks=20)
+
+def test_generate_mock_exam_reads_papers_in_batches(db_session, monkeypatch):
+    """
+    Test that sampling keeps reading papers, past the SQL-drawn sample, until the target is reachable.
+    """
+    from src.core_database import exam_generator
+
+    monkeypatch.setattr(exam_generator, "PAPER_BATCH_SIZE", 1)
+    monkeypatch.setattr(exam_generator, "PAPER_SAMPLE_SIZE", 1)
+    questions = [question for year in range(2016, 2022) for question in _add_paper(db_session, "9709", year, [5])]
+    db_session.commit()
+
+    exam = generate_mock_exam(db_session, 1, "9709", max_marks=25, rng=random.Random(3))
+
+    assert len(exam.questions) == 5
+    assert set(exam.questions) <= set(questions)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_generate_mock_exam_reads_past_saturated_marks(db_session, monkeypatch, seed):
+    """
+    Test that papers keep being read while the mark values seen are saturated but cannot reach the target.
+    """
+    from src.core_database import exam_generator
+
+    monkeypatch.setattr(exam_generator, "PAPER_BATCH_SIZE", 1)
+    _add_paper(db_session, "9709", 2020, [7, 7])
+    _add_paper(db_session, "9709", 2021, [6])
+    db_session.commit()
+
+    exam = generate_mock_exam(db_session, 1, "9709", max_marks=20, rng=random.Random(seed))
+
+    assert sum(question.max_marks for question in exam.questions) == 20
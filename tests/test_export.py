@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from src.core_database import models
+from src.core_database.export import export_history
+
+def _attempt(db_session, student, exam, submitted_at, weakness):
+    attempt = models.ExamAttempt(student_id=student.id, mock_exam_id=exam.id, score=3, submitted_at=submitted_at)
+    db_session.add(attempt)
+    db_session.flush()
+    db_session.add(models.AttemptedQuestion(exam_attempt_id=attempt.id, score=3, diagnosed_weakness=weakness))
+    db_session.commit()
+    return attempt
+
+def test_export_history_partitions_by_subject_and_exports_increments(db_session, tmp_path):
+    """
+    Test that a subject-partitioned export writes each subject's rows and that an incremental export only adds new attempts.
+    """
+    t0 = datetime(2026, 1, 1, 9, 0, 0)
+    student = models.Student(username="exporter", created_at=t0)
+    db_session.add(student)
+    db_session.flush()
+    maths = models.MockExam(student_id=student.id, subject="9709", created_at=t0)
+    physics = models.MockExam(student_id=student.id, subject="9702", created_at=t0)
+    db_session.add_all([maths, physics])
+    db_session.flush()
+    _attempt(db_session, student, maths, t0, "vectors")
+    _attempt(db_session, student, physics, t0 + timedelta(hours=1), "circuits")
+
+    until = t0 + timedelta(days=1)
+    report = export_history(db_session, str(tmp_path / "full"), partition_by="subject", until=until, batch_size=1)
+    assert report["tables"]["students"]["rows"] == 1
+    assert report["tables"]["exam_attempts"]["rows"] == 2
+    assert len(report["tables"]["attempted_questions"]["files"]) == 2
+    maths_answers = pq.read_table(tmp_path / "full" / "attempted_questions" / "subject=9709").to_pylist()
+    assert [row["diagnosed_weakness"] for row in maths_answers] == ["vectors"]
+
+    late = _attempt(db_session, student, maths, until + timedelta(minutes=5), "integration")
+    increment = export_history(
+        db_session, str(tmp_path / "increment"), format="arrow", since=until, until=until + timedelta(days=1),
+        tables=["exam_attempts", "attempted_questions"],
+    )
+    (attempts_file,) = increment["tables"]["exam_attempts"]["files"]
+    with pyarrow.ipc.open_file(attempts_file) as reader:
+        assert reader.read_all().column("id").to_pylist() == [late.id]
+    assert increment["tables"]["attempted_questions"]["rows"] == 1
+
+def test_chained_exports_keep_rows_from_the_boundary_second(db_session, tmp_path):
+    """
+    Test that rows stamped by the server default in the second an export ends at are picked up by the next export.
+    """
+    first = models.Student(username="boundary-first")
+    db_session.add(first)
+    db_session.commit()
+    stamp = db_session.execute(text("SELECT created_at FROM students WHERE id = :id"), {"id": first.id}).scalar_one()
+    until = datetime.fromisoformat(stamp)
+
+    before = export_history(db_session, str(tmp_path / "before"), until=until, tables=["students"])
+    second = models.Student(username="boundary-second")
+    db_session.add(second)
+    db_session.commit()
+    db_session.execute(text("UPDATE students SET created_at = :stamp WHERE id = :id"), {"stamp": stamp, "id": second.id})
+    db_session.commit()
+    after = export_history(
+        db_session, str(tmp_path / "after"), since=until, until=until + timedelta(seconds=1), tables=["students"],
+    )
+
+    exported = [
+        row["id"]
+        for report in (before, after)
+        for path in report["tables"]["students"]["files"]
+        for row in pq.read_table(path).to_pylist()
+    ]
+    assert sorted(exported) == sorted([first.id, second.id])
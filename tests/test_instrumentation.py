@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+from src.core_database import crud, instrumentation, models
+
+@pytest.fixture
+def instrumented(db_session):
+    active = instrumentation.enable_instrumentation(
+        db_session.get_bind().engine, slow_query_threshold=0, n_plus_one_threshold=3
+    )
+    yield active
+    instrumentation.disable_instrumentation()
+
+def test_fingerprint_collapses_literals_and_lists():
+    """
+    Test that statements differing only in literals and list lengths share a fingerprint.
+    """
+    assert instrumentation.fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?) AND x = 'a'") == \
+        instrumentation.fingerprint("SELECT * FROM t\n WHERE id IN (?) AND x = 'bb'")
+
+def test_instrumentation_records_latency_sessions_and_slow_queries(db_session, instrumented, caplog):
+    """
+    Test histograms, per-session counts, N+1 warnings and slow query attribution.
+    """
+    caplog.set_level(logging.WARNING, logger=instrumentation.__name__)
+    for i in range(3):
+        crud.get_student_by_username(db_session, f"user{i}")
+
+    snapshot = instrumentation.snapshot()
+    (stats,) = [s for key, s in snapshot["statements"].items() if "FROM students" in key]
+    assert stats["count"] == 3
+    assert stats["buckets"][float("inf")] == 3
+    assert db_session.info["query_count"] == 3
+    assert snapshot["n_plus_one_warnings"] == 1
+    assert "src.core_database.crud.get_student_by_username" in caplog.text
+    assert "core_database_query_duration_seconds_count" in instrumentation.prometheus_text()
+
+    instrumentation.disable_instrumentation()
+    crud.get_student_by_username(db_session, "after")
+    assert instrumentation.snapshot() is None
+
+def test_instrumentation_ignores_other_engines_and_failed_statements(db_session, instrumented):
+    """
+    Test that sessions on other engines are not counted and a failing statement leaves no timing behind.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Session
+    from src.core_database.database import DatabaseConfig, create_db_engine
+
+    other = create_db_engine(DatabaseConfig(url="sqlite:///:memory:"))
+    with Session(other) as other_session:
+        other_session.execute(text("SELECT 1"))
+        assert "query_count" not in other_session.info
+    other.dispose()
+    assert instrumentation.snapshot()["session_queries"] == 0
+
+    with pytest.raises(OperationalError):
+        db_session.execute(text("SELECT * FROM no_such_table"))
+    assert db_session.connection().info["query_start_times"] == {}
+    crud.get_student_by_username(db_session, "after_error")
+    assert instrumentation.snapshot()["session_queries"] == 2
@@ -0,0 +1,63 @@
+import sqlalchemy as sa
+from src.core_database import models
+from src.core_database.migrations import estimate_rebuild, rebuild_table
+
+def test_rebuild_table_copies_rows_in_chunks_and_restores_indexes_and_triggers(db_session):
+    """
+    Test that a chunked rebuild adding a column keeps the rows, indexes and triggers of the table.
+    """
+    db_session.add_all(models.SyllabusPoint(subject="9709", code=f"9709/{i}", description=f"Point {i}") for i in range(25))
+    db_session.commit()
+    connection = db_session.connection()
+
+    estimate = estimate_rebuild(connection, "syllabus_points", sample_size=10)
+    assert (estimate["rows"], estimate["sample_rows"]) == (25, 10)
+    assert estimate["total_seconds"] > 0
+    assert "_estimate_syllabus_points" not in sa.inspect(connection).get_table_names()
+
+    calls = []
+    copied = rebuild_table(
+        connection, "syllabus_points",
+        columns=[
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("subject", sa.String),
+            sa.Column("code", sa.String),
+            sa.Column("description", sa.String),
+            sa.Column("tier", sa.String, nullable=False, server_default="core"),
+        ],
+        copy_from={"tier": "'extension'"},
+        chunk_size=10,
+        progress=lambda copied, total, elapsed: calls.append((copied, total)),
+    )
+    assert copied == 25
+    assert calls == [(10, 25), (20, 25), (25, 25)]
+
+    inspector = sa.inspect(connection)
+    assert {index["name"] for index in inspector.get_indexes("syllabus_points")} >= {
+        "ix_syllabus_points_code", "ix_syllabus_points_subject",
+    }
+    rows = connection.exec_driver_sql("SELECT count(*), min(tier), max(tier) FROM syllabus_points").one()
+    assert tuple(rows) == (25, "extension", "extension")
+    triggers = connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'syllabus_points'"
+    ).scalars().all()
+    assert len(triggers) == 3
+
+def test_rebuild_table_referenced_by_another_tables_trigger(db_session):
+    """
+    Test that a table named in another table's trigger can be rebuilt and the trigger still works.
+    """
+    student = models.Student(username="rebuild")
+    point = models.SyllabusPoint(subject="9709", code="9709/rebuild", description="Point")
+    db_session.add_all([student, point])
+    db_session.flush()
+    db_session.add(models.LearningPack(student_id=student.id))
+    db_session.commit()
+    connection = db_session.connection()
+
+    assert rebuild_table(connection, "learning_packs", progress=lambda *args: None) == 1
+
+    pack_id = connection.exec_driver_sql("SELECT id FROM learning_packs").scalar()
+    connection.execute(models.learning_pack_syllabus.insert().values(learning_pack_id=pack_id, syllabus_point_id=point.id))
+    coverage = connection.exec_driver_sql("SELECT student_id, pack_count FROM syllabus_coverage").all()
+    assert [tuple(row) for row in coverage] == [(student.id, 1)]
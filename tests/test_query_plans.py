@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import event
+from src.core_database import crud, models
+from src.core_database.coverage import get_coverage, get_uncovered_syllabus_points
+from src.core_database.scheduler import get_due_questions
+from src.core_database.weaknesses import get_student_weaknesses
+
+@pytest.fixture
+def captured_selects(db_session):
+    """
+    Record every SELECT the session runs, with its parameters.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    bind = db_session.get_bind()
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+def _full_scans(db_session, statement, parameters):
+    plan = db_session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return [detail for *_, detail in plan if detail.startswith("SCAN ") and "USING" not in detail]
+
+def test_main_crud_queries_use_indexes(db_session, captured_selects):
+    """
+    Test that the main CRUD lookups and relationship loads are index searches, not table scans.
+    """
+    student = crud.create_student(db_session, username="planner")
+    sp = crud.create_syllabus_point(db_session, {"subject": "9706", "code": "9706/1.1", "description": "x"})
+    crud.upsert_resources(db_session, [{"subject": "9706", "year": 2020, "path": "/p.pdf"}])
+    resource = crud.get_resource_by_path(db_session, "/p.pdf")
+    question = models.Question(resource_id=resource.id, max_marks=4)
+    db_session.add(question)
+    db_session.commit()
+
+    del captured_selects[:]
+    crud.get_student_by_username(db_session, "planner")
+    crud.get_resource_by_path(db_session, "/p.pdf")
+    crud.get_syllabus_point_by_code(db_session, "9706/1.1")
+    pack = crud.create_learning_pack_with_syllabus(db_session, student.id, [sp.id])
+    exam = crud.create_mock_exam(db_session, student.id, "9706", [question.id])
+    db_session.expire_all()
+    pack.syllabus_points, pack.resources, exam.questions
+    db_session.query(models.LearningPack).filter(models.LearningPack.student_id == student.id).all()
+    db_session.query(models.ExamAttempt).filter(models.ExamAttempt.student_id == student.id).all()
+    db_session.query(models.Resource).filter_by(subject="9706", year=2020, paper=1).all()
+    get_student_weaknesses(db_session, student.id)
+    crud.list_learning_packs_for_student(db_session, student.id, after=(pack.created_at, pack.id))
+    crud.list_learning_packs_for_student(db_session, student.id, lightweight=True)
+    crud.get_mock_exam_with_questions(db_session, exam.id)
+    get_due_questions(db_session, student.id, "9706")
+    get_uncovered_syllabus_points(db_session, student.id, "9706")
+    get_coverage(db_session, student.id, "9706")
+
+    assert captured_selects
+    for statement, parameters in captured_selects:
+        assert _full_scans(db_session, statement, parameters) == [], statement
@@ -0,0 +1,40 @@
+import numpy as np
+from src.core_database import models
+from src.core_database.question_bank import QuestionBank
+
+def test_question_bank_filters_samples_refreshes_and_maps(db_session, tmp_path):
+    """
+    Test that the bank filters and samples like the database, picks up new questions and reopens memory-mapped.
+    """
+    maths = models.Resource(subject="9709", year=2021, paper=1, path="/m.pdf")
+    physics = models.Resource(subject="9702", year=2018, paper=2, path="/p.pdf")
+    db_session.add_all([maths, physics])
+    db_session.flush()
+    db_session.add_all(
+        [models.Question(resource_id=maths.id, max_marks=m) for m in (2, 4, 4, 8)]
+        + [models.Question(resource_id=physics.id, max_marks=5), models.Question(resource_id=None, max_marks=None)]
+    )
+    db_session.commit()
+
+    bank = QuestionBank.load(db_session, batch_size=4)
+    assert len(bank) == 6
+    assert bank.nbytes == 6 * 24
+    maths_ids = [q.id for q in db_session.query(models.Question).filter_by(resource_id=maths.id)]
+    assert bank.filter(subject="9709").tolist() == maths_ids
+    assert bank.count_by_marks(subject="9709", max_marks=5) == {2: 1, 4: 2}
+    assert bank.filter(year_to=2020).tolist() == bank.filter(subject="9702").tolist()
+    assert bank.filter(subject="9709", exclude_ids=maths_ids[:3]).tolist() == maths_ids[3:]
+    assert bank.filter(subject="0000").size == 0
+    sample = bank.sample(5, np.random.default_rng(0), marks=4, subject="9709")
+    assert sorted(sample.tolist()) == maths_ids[1:3]
+
+    db_session.add(models.Question(resource_id=physics.id, max_marks=3))
+    db_session.commit()
+    assert bank.refresh(db_session) == 1
+    assert bank.count_by_marks(subject="9702") == {3: 1, 5: 1}
+
+    bank.save(str(tmp_path / "bank"))
+    bank.save(str(tmp_path / "bank"))
+    mapped = QuestionBank.open(str(tmp_path / "bank"))
+    assert isinstance(mapped.columns["id"], np.memmap) and not mapped.columns["id"].flags.writeable
+    assert mapped.filter(subject="9702").tolist() == bank.filter(subject="9702").tolist()
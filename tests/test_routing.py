@@ -0,0 +1,39 @@
+from sqlalchemy import event
+from src.core_database import crud, models
+from src.core_database.database import Base, DatabaseConfig, create_db_engine, create_routing_sessionmaker, use_primary
+
+def test_routing_session_reads_from_read_only_engine_and_sees_own_writes(tmp_path):
+    """
+    Test that reads go to the read-only engine, writes to the primary, and a session always sees its own writes.
+    """
+    config = DatabaseConfig(url=f"sqlite:///{tmp_path / 'routing.db'}")
+    primary = create_db_engine(config)
+    Base.metadata.create_all(bind=primary)
+    RoutingSessionLocal = create_routing_sessionmaker(config, primary=primary)
+
+    used = []
+    for name, engine in (("primary", primary), ("read", RoutingSessionLocal.kw["read_bind"])):
+        event.listen(engine, "before_cursor_execute", lambda *args, name=name: used.append(name))
+
+    with RoutingSessionLocal() as db:
+        crud.create_student(db, username="routed")
+        del used[:]
+        student = crud.get_student_by_username(db, "routed")
+        assert student is not None
+        assert set(used) == {"read"}
+
+        del used[:]
+        db.add(models.Student(username="pending"))
+        db.flush()
+        assert db.query(models.Student).filter_by(username="pending").one() is not None
+        assert set(used) == {"primary"}
+        db.rollback()
+
+        del used[:]
+        assert db.query(models.Student).count() == 1
+        with use_primary(db):
+            assert db.query(models.Student).count() == 1
+        assert used == ["read", "primary"]
+
+    for engine in (primary, RoutingSessionLocal.kw["read_bind"]):
+        engine.dispose()
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from src.core_database import crud, models
+from src.core_database.scheduler import get_due_questions, rebuild_review_states
+
+def test_review_states_follow_submissions_and_rebuild(db_session):
+    """
+    Test that submitted answers update the SM-2 state incrementally and that a replay rebuild reproduces it.
+    """
+    student = crud.create_student(db_session, username="reviewer")
+    crud.upsert_resources(db_session, [
+        {"subject": "9709", "path": "/maths.pdf"},
+        {"subject": "9702", "path": "/physics.pdf"},
+    ])
+    maths = crud.get_resource_by_path(db_session, "/maths.pdf")
+    physics = crud.get_resource_by_path(db_session, "/physics.pdf")
+    easy, hard, other = (
+        models.Question(resource_id=maths.id, max_marks=10),
+        models.Question(resource_id=maths.id, max_marks=10),
+        models.Question(resource_id=physics.id, max_marks=4),
+    )
+    db_session.add_all([easy, hard, other])
+    db_session.commit()
+
+    day = datetime(2026, 3, 1, 9, 0, 0)
+    for offset, answers in enumerate([
+        [(easy, 10), (hard, 2), (other, 4)],
+        [(easy, 9), (hard, 3)],
+        [(easy, 10)],
+    ]):
+        crud.submit_exam_attempt(db_session, {
+            "student_id": student.id,
+            "submitted_at": day + timedelta(days=offset),
+            "answers": [{"question_id": q.id, "score": score} for q, score in answers],
+        })
+
+    due = get_due_questions(db_session, student.id, "9709")
+    summary = [(s.question_id, s.repetitions, s.interval_days, s.due_at) for s in due]
+    assert summary == [
+        (hard.id, 0, 1, day + timedelta(days=2)),
+        (easy.id, 3, 16, day + timedelta(days=18)), # intervals 1, 6, round(6 * 2.7)
+    ]
+    assert [s.question_id for s in get_due_questions(db_session, student.id, "9709", due_by=day + timedelta(days=3))] == [hard.id]
+    assert [s.question_id for s in get_due_questions(db_session, student.id, "9702")] == [other.id]
+
+    db_session.query(models.ReviewState).delete()
+    assert rebuild_review_states(db_session) == 3
+    db_session.expire_all()
+    rebuilt = [(s.question_id, s.repetitions, s.interval_days, s.due_at) for s in get_due_questions(db_session, student.id, "9709")]
+    assert rebuilt == summary
@@ -0,0 +1,31 @@
+from src.core_database import models
+from src.core_database.search import rebuild_syllabus_search_index, search_syllabus_points
+
+def test_search_syllabus_points_ranks_and_stays_in_sync(db_session):
+    """
+    Test that the full-text index follows inserts, updates and deletes and ranks by relevance.
+    """
+    points = [
+        models.SyllabusPoint(subject="9709", code="9709/1.7", description="Integration as the reverse of differentiation"),
+        models.SyllabusPoint(subject="9709", code="9709/3.5", description="Integration by parts and integration by substitution"),
+        models.SyllabusPoint(subject="9709", code="9709/1.3", description="Trigonometric identities"),
+        models.SyllabusPoint(subject="9231", code="9231/4.1", description="Integrating reduction formulae"),
+    ]
+    db_session.add_all(points)
+    db_session.commit()
+
+    results = search_syllabus_points(db_session, "integration")
+    assert results[0].code == "9709/3.5"
+    assert sorted(p.code for p in results) == ["9231/4.1", "9709/1.7", "9709/3.5"] # "integrating" is stemmed
+    assert [p.code for p in search_syllabus_points(db_session, "integration", subject="9231")] == ["9231/4.1"]
+    assert [p.code for p in search_syllabus_points(db_session, "integration parts", match_all=True)] == ["9709/3.5"]
+    assert search_syllabus_points(db_session, "  \"*-  ") == []
+
+    points[2].description = "Integration of trigonometric functions"
+    db_session.delete(points[0])
+    db_session.commit()
+    codes = [p.code for p in search_syllabus_points(db_session, "integration", subject="9709")]
+    assert sorted(codes) == ["9709/1.3", "9709/3.5"]
+
+    rebuild_syllabus_search_index(db_session)
+    assert [p.code for p in search_syllabus_points(db_session, "integration", subject="9709")] == codes
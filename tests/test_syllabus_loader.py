@@ -0,0 +1,48 @@
+import io
+import json
+
+from sqlalchemy.orm import Session
+from src.core_database import crud, models
+from src.core_database.database import Base, DatabaseConfig, create_db_engine
+from src.core_database.syllabus_loader import load_syllabus, load_syllabus_files
+
+def test_load_syllabus_is_idempotent_and_reports_changes(db_session):
+    """
+    Test that loading a syllabus upserts on code and that a revised load reports the changed descriptions.
+    """
+    first = "subject,code,description\n9709,9709/1.1,Quadratics\n9709,9709/1.2,Functions\n"
+    report = load_syllabus(db_session, io.StringIO(first), "csv", chunk_size=1)
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (2, 0, 0)
+
+    revised = [
+        {"code": "9709/1.1", "description": "Quadratics"},
+        {"code": "9709/1.2", "description": "Functions and their inverses"},
+        {"code": "9709/1.3", "description": "Coordinate geometry"},
+    ]
+    report = load_syllabus(db_session, io.StringIO(json.dumps(revised)), "json", subject="9709")
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (1, 1, 1)
+    assert report["changed"] == [("9709/1.2", "Functions", "Functions and their inverses")]
+    assert crud.get_syllabus_point_by_code(db_session, "9709/1.2").description == "Functions and their inverses"
+    assert db_session.query(models.SyllabusPoint).count() == 3
+
+def test_load_syllabus_files_in_parallel_workers(tmp_path):
+    """
+    Test that several syllabus files load in worker processes into a file database.
+    """
+    config = DatabaseConfig(url=f"sqlite:///{tmp_path / 'syllabus.db'}")
+    engine = create_db_engine(config)
+    Base.metadata.create_all(bind=engine)
+    paths = []
+    for subject in ("9702", "9709"):
+        path = tmp_path / f"{subject}.jsonl"
+        path.write_text("\n".join(
+            json.dumps({"code": f"{subject}/{i}", "description": f"Point {i}"}) for i in range(50)
+        ))
+        paths.append(str(path))
+
+    reports = load_syllabus_files(paths, workers=2, config=config)
+    assert [reports[path]["inserted"] for path in paths] == [50, 50]
+    with Session(engine) as db:
+        assert db.query(models.SyllabusPoint).count() == 100
+        assert db.query(models.SyllabusPoint).filter_by(code="9702/7").one().description == "Point 7"
+    engine.dispose()
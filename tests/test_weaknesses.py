@@ -0,0 +1,36 @@
+from src.core_database import models
+from src.core_database.weaknesses import get_student_weaknesses, rebuild_weakness_aggregates
+
+def _record_attempt(db_session, student, mock_exam, answers):
+    attempt = models.ExamAttempt(student_id=student.id, mock_exam_id=mock_exam.id)
+    db_session.add(attempt)
+    db_session.flush()
+    db_session.add_all(
+        models.AttemptedQuestion(exam_attempt_id=attempt.id, score=score, diagnosed_weakness=weakness)
+        for score, weakness in answers
+    )
+    db_session.commit()
+
+def test_weakness_aggregates_follow_attempts_and_rebuild(db_session):
+    """
+    Test that recording attempts maintains the aggregates and that a rebuild reproduces them.
+    """
+    student = models.Student(username="weak")
+    db_session.add(student)
+    db_session.flush()
+    exam = models.MockExam(student_id=student.id, subject="9709")
+    db_session.add(exam)
+    db_session.flush()
+
+    _record_attempt(db_session, student, exam, [(1, "integration"), (4, "vectors"), (None, None)])
+    _record_attempt(db_session, student, exam, [(2, "integration")])
+
+    weaknesses = get_student_weaknesses(db_session, student.id, subject="9709")
+    summary = [(w.weakness, w.attempt_count, w.mean_score) for w in weaknesses]
+    assert summary == [("integration", 2, 1.5), ("vectors", 1, 4.0)]
+
+    db_session.query(models.StudentWeakness).delete()
+    assert rebuild_weakness_aggregates(db_session) == 2
+    db_session.expire_all()
+    rebuilt = [(w.weakness, w.attempt_count, w.mean_score) for w in get_student_weaknesses(db_session, student.id)]
+    assert rebuilt == summary
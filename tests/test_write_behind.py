@@ -0,0 +1,74 @@
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+from src.core_database import models
+from src.core_database.database import Base, DatabaseConfig, create_db_engine
+from src.core_database.write_behind import WriteBehindBuffer
+
+def test_write_behind_buffer_dedupes_and_flushes_in_batches(tmp_path):
+    """
+    Test that repeated touches collapse per row, flush on the size threshold and on close.
+    """
+    engine = create_db_engine(DatabaseConfig(url=f"sqlite:///{tmp_path / 'touch.db'}"))
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all(models.Resource(subject="9709", path=f"/r{n}.pdf") for n in range(5))
+        db.commit()
+        ids = [r.id for r in db.query(models.Resource).order_by(models.Resource.id)]
+
+    first, later = datetime(2026, 1, 1), datetime(2026, 2, 1)
+    buffer = WriteBehindBuffer(Session, max_size=3, flush_interval=3600)
+    buffer.touch_resource(ids[0], at=first)
+    buffer.touch_resource(ids[0], at=later)
+    buffer.update(models.Resource, ids[1], last_seen=first, type="qp")
+    assert buffer.depth == 2
+    assert buffer.flush() == 2
+    with Session() as db:
+        rows = {r.id: (r.last_seen.replace(tzinfo=None), r.type) for r in db.query(models.Resource)}
+    assert rows[ids[0]] == (later, None)
+    assert rows[ids[1]] == (first, "qp")
+
+    # Reaching max_size wakes the background thread.
+    for resource_id in ids[2:]:
+        buffer.touch_resource(resource_id, at=later)
+    deadline = time.monotonic() + 5
+    while buffer.stats()["flushes"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert buffer.stats() == {"depth": 0, "touches": 6, "flushes": 2, "rows_flushed": 5, "errors": 0}
+
+    buffer.touch_resource(ids[4], at=first)
+    buffer.close()
+    assert buffer.depth == 0
+    assert "core_database_write_behind_depth 0" in buffer.prometheus_text()
+    with Session() as db:
+        assert db.get(models.Resource, ids[4]).last_seen.replace(tzinfo=None) == first
+    engine.dispose()
+
+def test_write_behind_flush_evicts_cached_lookups(tmp_path):
+    """
+    Test that a cached resource lookup sees the values written by a flush.
+    """
+    from src.core_database import cache, crud
+
+    engine = create_db_engine(DatabaseConfig(url=f"sqlite:///{tmp_path / 'touch.db'}"))
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    cache.enable_cache(ttl=3600)
+    try:
+        with Session() as db:
+            resource_id = crud.create_resource(db, {"subject": "9709", "path": "/cached.pdf"}).id
+            crud.get_resource_by_path(db, "/cached.pdf") # caches the row
+
+        seen = datetime(2026, 3, 1)
+        with WriteBehindBuffer(Session, flush_interval=3600) as buffer:
+            buffer.update(models.Resource, resource_id, last_seen=seen, type="qp")
+            buffer.flush()
+
+        with Session() as db:
+            resource = crud.get_resource_by_path(db, "/cached.pdf")
+            assert (resource.last_seen.replace(tzinfo=None), resource.type) == (seen, "qp")
+    finally:
+        cache.disable_cache()
+        engine.dispose()